@@ -1,25 +1,17 @@
-import os
-from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from dotenv import load_dotenv
 
 from database.database import get_db
 from database.models import User
-from schemas.auth import TokenData
 
-# Cargar variables de entorno
-load_dotenv()
-
-# Configuración de seguridad
-SECRET_KEY = os.getenv("JWT_SECRET", "fallback_secret_key_change_in_production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
-REFRESH_TOKEN_EXPIRE_DAYS = 7  # 7 días
+# Configuración de seguridad y funciones JWT (auth/tokens.py, sin base de datos)
+from auth.tokens import (  # noqa: F401
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS,
+    create_access_token, create_refresh_token, decode_token
+)
 
 # Security scheme para Bearer token
 security = HTTPBearer()
@@ -40,71 +32,6 @@ def get_password_hash(password: str) -> str:
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
-# ===== FUNCIONES DE JWT =====
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Crear un token de acceso JWT"""
-    to_encode = data.copy()
-    
-    # Asegurar que 'sub' sea string
-    if 'sub' in to_encode:
-        to_encode['sub'] = str(to_encode['sub'])
-    
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def create_refresh_token(data: dict) -> str:
-    """Crear un token de refresco JWT"""
-    to_encode = data.copy()
-    
-    # Asegurar que 'sub' sea string
-    if 'sub' in to_encode:
-        to_encode['sub'] = str(to_encode['sub'])
-    
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def decode_token(token: str) -> TokenData:
-    """Decodificar y validar un token JWT"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_raw = payload.get("sub")
-        username: str = payload.get("username")
-        
-        if user_id_raw is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido: falta el ID de usuario",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Convertir a int si viene como string o número
-        user_id = int(user_id_raw) if user_id_raw else None
-        
-        return TokenData(user_id=user_id, username=username)
-    
-    except JWTError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Token inválido: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except (ValueError, TypeError) as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido: formato de ID incorrecto",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
 # ===== DEPENDENCIAS PARA OBTENER USUARIO ACTUAL =====
 
 async def get_current_user(
@@ -0,0 +1,246 @@
+"""
+Prueba de carga de la API AgroMind con concurrencia controlada.
+
+Arranca benchmarks/bench_app.py con uvicorn en un subproceso (SQLite y clima
+simulado), crea un usuario y un cultivo de prueba y recorre cada escenario con
+varios niveles de concurrencia. Por escenario registra throughput, latencias
+p50/p95/p99, errores y RSS del servidor, y guarda todo en
+benchmarks/results/api_<fecha>_<commit>.json.
+
+Uso (desde back-end/):
+    python -m benchmarks.api_bench
+    python -m benchmarks.api_bench --concurrency 1 8 32 --duration 15
+    python -m benchmarks.api_bench --scenarios generate_recipe predict
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.results import percentiles, save_results, run_metadata
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGES_DIR = os.path.join(BACKEND_DIR, "imagenes_entrenamiento")
+
+
+def _find_sample_image():
+    for root, _, files in os.walk(IMAGES_DIR):
+        for name in sorted(files):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                return os.path.join(root, name)
+    return None
+
+
+# ===== ESCENARIOS =====
+# Cada escenario recibe (session, base_url, ctx) y devuelve el Response.
+
+def _generate_recipe(session, url, ctx):
+    return session.post(f"{url}/generate-recipe", json={
+        "crop": "lettuce", "week": 3, "tank_liters": 100, "ph_water": 6.0, "lat": -0.18, "long": -78.47
+    })
+
+
+def _predict(session, url, ctx):
+    return session.post(f"{url}/predict", json={"crop": "maiz", "ph": 6.5, "latitud": -0.18, "longitud": -78.47})
+
+
+def _predict_image(session, url, ctx):
+    with open(ctx["image_path"], "rb") as f:
+        return session.post(f"{url}/predict-image", files={"file": ("hoja.jpg", f, "image/jpeg")})
+
+
+def _crops_list(session, url, ctx):
+    return session.get(f"{url}/crops", headers=ctx["auth"])
+
+
+def _crop_stats(session, url, ctx):
+    return session.get(f"{url}/crops/{ctx['crop_id']}/stats", headers=ctx["auth"])
+
+
+def _auth_me(session, url, ctx):
+    return session.get(f"{url}/auth/me", headers=ctx["auth"])
+
+
+def _auth_login(session, url, ctx):
+    return session.post(f"{url}/auth/login", json=ctx["credentials"])
+
+
+SCENARIOS = {
+    "generate_recipe": _generate_recipe,
+    "predict": _predict,
+    "predict_image": _predict_image,
+    "crops_list": _crops_list,
+    "crop_stats": _crop_stats,
+    "auth_me": _auth_me,
+    "auth_login": _auth_login,
+}
+
+
+# ===== SERVIDOR =====
+
+def _rss_kb(pid):
+    """(VmRSS, VmHWM) en KB del proceso del servidor."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":", 1)
+                    values[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+def start_server(port, db_path):
+    env = dict(os.environ)
+    env["BENCH_DB_URL"] = f"sqlite:///{db_path}"
+    env.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("El servidor terminó durante el arranque")
+        try:
+            if requests.get(f"{url}/health/ready", timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError("El servidor no respondió en 180 s")
+
+
+def prepare_context(url):
+    """Usuario, token y cultivo de prueba para las rutas autenticadas."""
+    suffix = uuid.uuid4().hex[:8]
+    credentials = {"username": f"bench_{suffix}", "password": "bench-password"}
+    requests.post(f"{url}/auth/register", json={
+        **credentials, "email": f"bench_{suffix}@example.com", "full_name": "Benchmark"
+    }).raise_for_status()
+    token = requests.post(f"{url}/auth/login", json=credentials).json()["access_token"]
+    auth = {"Authorization": f"Bearer {token}"}
+
+    crop = requests.post(f"{url}/crops", headers=auth, json={
+        "name": "tomate", "crop_type": "hydroponic", "location_lat": -0.18, "location_long": -78.47, "area": 50
+    })
+    crop.raise_for_status()
+
+    return {
+        "credentials": credentials,
+        "auth": auth,
+        "crop_id": crop.json()["id"],
+        "image_path": _find_sample_image(),
+    }
+
+
+# ===== GENERADOR DE CARGA =====
+
+def run_level(scenario, url, ctx, concurrency, duration, pid):
+    latencies, errors, statuses = [], 0, {}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+    peak_rss = 0
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        local = []
+        local_errors = 0
+        local_status = {}
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = SCENARIOS[scenario](session, url, ctx)
+                code = response.status_code
+            except requests.RequestException:
+                code = "connection_error"
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            local.append(elapsed_ms)
+            local_status[code] = local_status.get(code, 0) + 1
+            if code == "connection_error" or code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+            for code, n in local_status.items():
+                statuses[str(code)] = statuses.get(str(code), 0) + n
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker) for _ in range(concurrency)]
+        while any(not f.done() for f in futures):
+            rss, _ = _rss_kb(pid)
+            peak_rss = max(peak_rss, rss or 0)
+            time.sleep(0.25)
+        for f in futures:
+            f.result()
+    elapsed = time.perf_counter() - start
+
+    rss, hwm = _rss_kb(pid)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        **percentiles(latencies),
+        "server_rss_mb": round((rss or 0) / 1024, 1),
+        "server_peak_rss_mb": round(max(peak_rss, hwm or 0) / 1024, 1),
+    }
+
+
+def run(scenarios, concurrency_levels, duration, port):
+    db_path = os.path.join(BACKEND_DIR, "benchmarks", f"bench_{os.getpid()}.db")
+    process, url = start_server(port, db_path)
+    try:
+        ctx = prepare_context(url)
+        rss, _ = _rss_kb(process.pid)
+        results = {"meta": {**run_metadata(), "duration_s": duration, "idle_rss_mb": round((rss or 0) / 1024, 1)},
+                   "results": []}
+
+        for scenario in scenarios:
+            if scenario == "predict_image" and not ctx["image_path"]:
+                print("⚠️  Sin imágenes de ejemplo; se omite predict_image")
+                continue
+            for concurrency in concurrency_levels:
+                row = run_level(scenario, url, ctx, concurrency, duration, process.pid)
+                results["results"].append(row)
+                print(f"{scenario:<16} c={concurrency:<3} {row['throughput_rps']:>8.1f} req/s  "
+                      f"p50={row['p50_ms']} p95={row['p95_ms']} p99={row['p99_ms']} ms  "
+                      f"err={row['errors']}  rss={row['server_rss_mb']} MB")
+
+        results["server_metrics"] = requests.get(f"{url}/metrics").text
+        path = save_results("api", results)
+        print(f"\nResultados guardados en {path}")
+        return path
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API AgroMind")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por escenario y nivel")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    run(args.scenarios, args.concurrency, args.duration, args.port)
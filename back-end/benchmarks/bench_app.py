@@ -0,0 +1,47 @@
+"""
+Aplicación AgroMind preparada para benchmarks.
+
+- Base de datos SQLite local (BENCH_DB_URL, por defecto benchmarks/bench.db).
+- Límite de peticiones por cliente desactivado por defecto.
+- Clima simulado: get_weather devuelve valores fijos sin llamar a OpenWeatherMap.
+- Incluye las rutas /auth, /crops, /regions, /sync y /admin/models sobre la
+  app de model/integrate_all_api.py.
+
+Se arranca con uvicorn desde back-end/:
+    uvicorn benchmarks.bench_app:app --port 8765
+"""
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ["DB_URL"] = os.getenv("BENCH_DB_URL", f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}")
+# Todas las peticiones del generador de carga llegan desde la misma IP: sin
+# límite por cliente salvo que se pida (AGROMIND_RATE_LIMIT_BACKEND=memory)
+os.environ.setdefault("AGROMIND_RATE_LIMIT_BACKEND", "off")
+
+import model.integrate_all_api as api
+from database.database import Base, engine
+from database import models  # noqa: F401  (registra las tablas)
+from routes.auth import router as auth_router
+from routes.crops import router as crops_router
+from routes.regions import router as regions_router
+from routes.sync import router as sync_router
+from routes.admin_models import router as admin_models_router
+
+
+STUB_WEATHER = {"temperature": 22.5, "humidity": 65.0, "rainfall": 120.0}
+
+
+def stub_weather(lat, lon):
+    return dict(STUB_WEATHER)
+
+
+api.get_weather = stub_weather
+
+Base.metadata.create_all(bind=engine)
+
+app = api.app
+app.include_router(auth_router)
+app.include_router(crops_router)
+app.include_router(regions_router)
+app.include_router(sync_router)
+app.include_router(admin_models_router)
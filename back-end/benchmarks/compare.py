@@ -0,0 +1,52 @@
+"""
+Compara dos archivos de resultados (api_*.json, micro_*.json o startup_*.json).
+
+Uso (desde back-end/):
+    python -m benchmarks.compare benchmarks/results/api_A.json benchmarks/results/api_B.json
+"""
+import argparse
+
+from benchmarks.results import load_results
+
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "server_peak_rss_mb", "value_ms")
+
+
+def _key(row):
+    if "benchmark" in row:
+        return (row["benchmark"],)
+    return (row["scenario"], row["concurrency"])
+
+
+def _delta(old, new):
+    if old in (None, 0) or new is None:
+        return "   n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def compare(base_path, new_path):
+    base, new = load_results(base_path), load_results(new_path)
+    print(f"base: {base['meta'].get('git_commit')} ({base['meta'].get('timestamp')})")
+    print(f"new:  {new['meta'].get('git_commit')} ({new['meta'].get('timestamp')})\n")
+
+    base_rows = {_key(r): r for r in base["results"]}
+    for row in new["results"]:
+        key = _key(row)
+        old = base_rows.get(key)
+        label = " c=".join(str(k) for k in key)
+        if old is None:
+            print(f"{label:<24} (nuevo)")
+            continue
+        parts = [
+            f"{m}: {old[m]} -> {row[m]} ({_delta(old[m], row[m])})"
+            for m in METRICS if m in row
+        ]
+        print(f"{label:<24} " + " | ".join(parts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dos ejecuciones de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    args = parser.parse_args()
+    compare(args.base, args.new)
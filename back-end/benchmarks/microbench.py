@@ -0,0 +1,112 @@
+"""
+Microbenchmarks de las funciones calientes de la API.
+
+- HydroOptimizer.calculate_recipe (programa lineal con HiGHS)
+- fertilizer_blend_batch (planes de fertilización de 1000 campos en un LP)
+- prepare_input_normal (preprocesado del modelo de suelo)
+- drift_observe (registro de una petición en el monitor de deriva)
+- predict_disease (preprocesado de imagen + CNN), si el modelo está disponible
+
+Guarda los tiempos en benchmarks/results/micro_<fecha>_<commit>.json.
+
+Uso (desde back-end/):
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --repeats 500
+"""
+import os
+import time
+import argparse
+
+from benchmarks.results import percentiles, save_results
+from benchmarks.api_bench import _find_sample_image
+
+
+def measure(fn, repeats, warmup=5):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"repeats": repeats, **percentiles(timings)}
+
+
+def bench_calculate_recipe(repeats):
+    from model.hydro_optimizer import HydroOptimizer
+
+    optimizer = HydroOptimizer()
+    targets = {"N": 160.0, "P": 50.0, "K": 200.0, "EC": 0.8}
+    return measure(lambda: optimizer.calculate_recipe(targets=targets, water_liters=100), repeats)
+
+
+def bench_fertilizer_blend_batch(repeats):
+    import numpy as np
+    from model.fertilizer_recommendation import BLENDER
+
+    rng = np.random.default_rng(0)
+    requirements = rng.uniform(0, 140, (1000, 3))
+    areas = rng.uniform(0.5, 10, 1000)
+    return measure(lambda: BLENDER.blend_batch(requirements, areas), repeats, warmup=1)
+
+
+def bench_prepare_input_normal(repeats):
+    import model.integrate_all_api as api
+
+    api.load_artifacts()
+    return measure(lambda: api.prepare_input_normal("maize", 22.5, 65.0, 6.5, 120.0), repeats)
+
+
+def bench_drift_observe(repeats):
+    from model import drift
+
+    drift.load_reference()
+    if drift.MONITORS["soil"] is None:
+        return None
+    return measure(lambda: drift.observe("soil", 22.5, 65.0, 6.5, 120.0, "maize"), repeats)
+
+
+def bench_predict_disease(repeats):
+    from model import plant_classifier
+
+    image_path = _find_sample_image()
+    plant_classifier.load_image_model()
+    if plant_classifier.model is None or image_path is None:
+        return None
+    return measure(lambda: plant_classifier.predict_disease(image_path), repeats)
+
+
+BENCHMARKS = {
+    "calculate_recipe": bench_calculate_recipe,
+    "fertilizer_blend_batch": bench_fertilizer_blend_batch,
+    "prepare_input_normal": bench_prepare_input_normal,
+    "drift_observe": bench_drift_observe,
+    "predict_disease": bench_predict_disease,
+}
+
+
+def run(names, repeats):
+    results = {"results": []}
+    for name in names:
+        # La CNN es mucho más lenta: menos repeticiones
+        n = max(10, repeats // 10) if name in ("predict_disease", "fertilizer_blend_batch") else repeats
+        row = BENCHMARKS[name](n)
+        if row is None:
+            print(f"⚠️  {name}: modelo, imagen o referencia no disponible, se omite")
+            continue
+        results["results"].append({"benchmark": name, **row})
+        print(f"{name:<22} p50={row['p50_ms']} ms  p95={row['p95_ms']} ms  p99={row['p99_ms']} ms  (n={n})")
+
+    path = save_results("micro", results)
+    print(f"\nResultados guardados en {path}")
+    return path
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    parser = argparse.ArgumentParser(description="Microbenchmarks de AgroMind")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    run(args.only, args.repeats)
@@ -0,0 +1,166 @@
+"""
+Tamaño de respuesta y tiempo de serialización por endpoint y formato.
+
+Obtiene respuestas reales de la app de benchmarks (SQLite temporal, clima
+simulado) para las rutas de inferencia y de historial, y para cada una mide
+bytes y tiempo de serialización + compresión en cada combinación que sirve
+model/negotiation.py: json (orjson), msgpack y cbor, sin comprimir y con
+gzip / br.
+Comprueba además que la negociación por cabeceras devuelve cada formato.
+
+Guarda los resultados en benchmarks/results/payload_<fecha>_<commit>.json.
+
+Uso (desde back-end/):
+    python -m benchmarks.payload_bench
+    python -m benchmarks.payload_bench --history 50 --repeats 500
+"""
+import os
+import time
+import tempfile
+import argparse
+
+from benchmarks.results import percentiles, save_results
+
+
+VARIANTS = [
+    ("json", "identity"),
+    ("json", "gzip"),
+    ("json", "br"),
+    ("msgpack", "identity"),
+    ("msgpack", "gzip"),
+    ("msgpack", "br"),
+    ("cbor", "identity"),
+    ("cbor", "gzip"),
+]
+
+ACCEPT = {"json": "application/json", "msgpack": "application/msgpack", "cbor": "application/cbor"}
+
+
+def _client(db_path):
+    os.environ["BENCH_DB_URL"] = f"sqlite:///{db_path}"
+    os.environ["AGROMIND_BLOCKING_STARTUP"] = "1"
+    from fastapi.testclient import TestClient
+    import benchmarks.bench_app as bench_app
+
+    return TestClient(bench_app.app)
+
+
+def _seed_history(client, auth, history):
+    """Cultivo hidropónico y de suelo con `history` recetas/predicciones cada uno."""
+    from database.database import SessionLocal
+    from database.models import HydroRecipe, Prediction
+
+    hydro = client.post("/crops", headers=auth, json={
+        "name": "lechuga", "crop_type": "hydroponic", "location_lat": -0.18, "location_long": -78.47, "area": 20
+    }).json()
+    soil = client.post("/crops", headers=auth, json={
+        "name": "maiz", "crop_type": "soil", "location_lat": -0.18, "location_long": -78.47, "area": 5000
+    }).json()
+
+    recipe = client.post("/generate-recipe", json={
+        "crop": "lettuce", "week": 3, "tank_liters": 100, "ph_water": 6.0, "lat": -0.18, "long": -78.47
+    }).json()
+    advice = client.post("/predict", json={"crop": "maiz", "ph": 6.5, "latitud": -0.18, "longitud": -78.47}).json()
+
+    db = SessionLocal()
+    try:
+        for week in range(1, history + 1):
+            db.add(HydroRecipe(
+                user_id=hydro["user_id"], crop_id=hydro["id"], crop_name="lechuga", week=week,
+                tank_liters=100, ph_water=6.0, latitude=-0.18, longitude=-78.47,
+                temperature=22.5, humidity=65.0,
+                target_nitrogen=recipe["meta"]["target_ppm"]["N"], target_phosphorus=recipe["meta"]["target_ppm"]["P"],
+                target_potassium=recipe["meta"]["target_ppm"]["K"], target_ec=recipe["meta"]["target_ec"],
+                recipe_data={"mix_A": recipe["mix_A"], "mix_B": recipe["mix_B"]},
+            ))
+            db.add(Prediction(
+                user_id=soil["user_id"], crop_id=soil["id"], crop_name="maiz", ph=6.5,
+                latitude=-0.18, longitude=-78.47, temperature=22.5, humidity=65.0, rainfall=120.0,
+                nitrogen=advice["nutrientes_requeridos"]["N"], phosphorus=advice["nutrientes_requeridos"]["P"],
+                potassium=advice["nutrientes_requeridos"]["K"], recommendation=advice["recomendacion"],
+            ))
+        db.commit()
+    finally:
+        db.close()
+    return hydro["id"], soil["id"]
+
+
+def _requests(auth, hydro_id, soil_id):
+    return {
+        "/generate-recipe": ("post", "/generate-recipe", {"json": {
+            "crop": "lettuce", "week": 3, "tank_liters": 100, "ph_water": 6.0, "lat": -0.18, "long": -78.47}}),
+        "/predict": ("post", "/predict", {"json": {"crop": "maiz", "ph": 6.5, "latitud": -0.18, "longitud": -78.47}}),
+        "/crops": ("get", "/crops", {"headers": auth}),
+        "/crops/{crop_id}/hydro-recipes": ("get", f"/crops/{hydro_id}/hydro-recipes", {"headers": auth}),
+        "/crops/{crop_id}/predictions": ("get", f"/crops/{soil_id}/predictions", {"headers": auth}),
+    }
+
+
+def _measure(content, fmt, encoding, repeats):
+    from model.negotiation import serialize, compress
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = compress(serialize(content, fmt), encoding)
+        timings.append((time.perf_counter() - start) * 1000)
+    return len(body), percentiles(timings)
+
+
+def _check_negotiation(client, method, path, kwargs, fmt, encoding):
+    headers = dict(kwargs.get("headers", {}))
+    headers["Accept"] = ACCEPT[fmt]
+    headers["Accept-Encoding"] = encoding
+    response = getattr(client, method)(path, **{**kwargs, "headers": headers})
+    return response.headers.get("content-type", "").split(";")[0], response.headers.get("content-encoding", "identity")
+
+
+def run(history, repeats):
+    from model import negotiation
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with _client(os.path.join(tmp, "payload.db")) as client:
+            suffix = str(int(time.time()))
+            credentials = {"username": f"payload_{suffix}", "password": "bench-password"}
+            client.post("/auth/register", json={
+                **credentials, "email": f"payload_{suffix}@example.com", "full_name": "Payload"})
+            token = client.post("/auth/login", json=credentials).json()["access_token"]
+            auth = {"Authorization": f"Bearer {token}"}
+            hydro_id, soil_id = _seed_history(client, auth, history)
+
+            results = {"results": [], "formats_available": negotiation.available_formats()}
+            for endpoint, (method, path, kwargs) in _requests(auth, hydro_id, soil_id).items():
+                headers = {**kwargs.get("headers", {}), "Accept": "application/json", "Accept-Encoding": "identity"}
+                content = getattr(client, method)(path, **{**kwargs, "headers": headers}).json()
+
+                baseline = None
+                for fmt, encoding in VARIANTS:
+                    if fmt not in negotiation.available_formats():
+                        continue
+                    if encoding == "br" and negotiation.brotli is None:
+                        continue
+                    size, timing = _measure(content, fmt, encoding, repeats)
+                    baseline = baseline or size
+                    served = _check_negotiation(client, method, path, kwargs, fmt, encoding)
+                    row = {
+                        "endpoint": endpoint, "format": fmt, "encoding": encoding,
+                        "bytes": size, "ratio_vs_json": round(size / baseline, 3),
+                        "served_as": list(served), **timing,
+                    }
+                    results["results"].append(row)
+                    print(f"{endpoint:<34} {fmt:<8} {encoding:<9} {size:>8} B  x{row['ratio_vs_json']:<6} "
+                          f"p50={timing['p50_ms']} ms  (servido: {served[0]}, {served[1]})")
+
+    path = save_results("payload", results)
+    print(f"\nResultados guardados en {path}")
+    return path
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    parser = argparse.ArgumentParser(description="Tamaño y serialización de respuestas por formato")
+    parser.add_argument("--history", type=int, default=20, help="Registros de historial por cultivo")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    run(args.history, args.repeats)
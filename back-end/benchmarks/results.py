@@ -0,0 +1,60 @@
+"""Utilidades comunes para guardar y leer resultados de benchmarks en JSON."""
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata():
+    """Datos para comparar ejecuciones entre commits y máquinas."""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git("rev-parse", "--short", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def percentiles(values_ms):
+    if not values_ms:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    ordered = sorted(values_ms)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+    }
+
+
+def save_results(kind, payload):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    meta = payload.setdefault("meta", run_metadata())
+    stamp = meta["timestamp"].replace(":", "").replace("-", "")
+    path = os.path.join(RESULTS_DIR, f"{kind}_{stamp}_{meta['git_commit'] or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
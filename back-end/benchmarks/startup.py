@@ -0,0 +1,162 @@
+"""
+Perfil de arranque de la API: tiempo de importación y tiempo hasta "ready".
+
+1. Importación: ejecuta `python -X importtime -c "import <módulo>"` en un
+   proceso limpio y agrupa el tiempo propio por paquete raíz (fastapi, numpy,
+   tensorflow...), para ver qué se cuela en el import.
+2. Arranque en frío: en otro proceso limpio importa la app y ejecuta
+   warm_start() (artefactos + modelos + warmup), y mide cada fase y el tiempo
+   total desde el lanzamiento del proceso.
+
+Compara contra un presupuesto y termina con código 1 si se supera, para
+poder usarlo en CI. Guarda los números en benchmarks/results/startup_<fecha>_<commit>.json
+(comparables con benchmarks/compare.py).
+
+Uso (desde back-end/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --import-budget-ms 800 --ready-budget-s 20
+    python -m benchmarks.startup --top 30 --no-ready
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from benchmarks.results import save_results
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READY_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import {module} as app_module
+t1 = time.perf_counter()
+app_module.warm_start()
+t2 = time.perf_counter()
+print("@@STARTUP@@" + json.dumps({{
+    "import_s": t1 - t0, "warm_start_s": t2 - t1,
+    "status": app_module.STARTUP["status"], "phases": app_module.STARTUP["phases"],
+}}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def parse_importtime(stderr):
+    """[(self_us, cumulative_us, nivel, nombre)] a partir de la salida de -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((int(self_us), int(cumulative_us), level, name.strip()))
+    return rows
+
+
+def import_profile(module, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    rows = parse_importtime(result.stderr)
+    total_us = next((cum for _, cum, level, name in rows if name == module and level <= 1), None)
+    if total_us is None:
+        total_us = sum(self_us for self_us, _, _, _ in rows)
+
+    by_package = {}
+    for self_us, _, _, name in rows:
+        root = name.split(".", 1)[0]
+        by_package[root] = by_package.get(root, 0) + self_us
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "modules_imported": len(rows),
+        "top_packages_ms": [[name, round(us / 1000, 1)] for name, us in packages],
+    }
+
+
+def ready_profile(module):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", READY_SCRIPT.format(module=module)],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    marker = [line for line in result.stdout.splitlines() if line.startswith("@@STARTUP@@")]
+    if result.returncode != 0 or not marker:
+        raise RuntimeError(f"El arranque de {module} falló:\n{result.stderr[-2000:]}")
+
+    data = json.loads(marker[-1][len("@@STARTUP@@"):])
+    data["process_to_ready_s"] = wall
+    return data
+
+
+def run(module, top, import_budget_ms, ready_budget_s, check_ready):
+    failures = []
+    rows = []
+
+    profile = import_profile(module, top)
+    print(f"\n⏱️  import {module}: {profile['total_ms']} ms ({profile['modules_imported']} módulos)")
+    print(f"{'paquete':<28} {'ms (propio)':>12}")
+    for name, ms in profile["top_packages_ms"]:
+        print(f"{name:<28} {ms:>12.1f}")
+    rows.append({"benchmark": "import_app", "value_ms": profile["total_ms"]})
+    if profile["total_ms"] > import_budget_ms:
+        failures.append(f"import {profile['total_ms']} ms > presupuesto {import_budget_ms} ms")
+
+    ready = None
+    if check_ready:
+        ready = ready_profile(module)
+        print(f"\n🚦 Arranque en frío hasta ready: {ready['process_to_ready_s']:.2f} s (estado: {ready['status']})")
+        for phase, seconds in ready["phases"].items():
+            print(f"   {phase:<12} {seconds:8.3f} s")
+            rows.append({"benchmark": f"phase_{phase}", "value_ms": round(seconds * 1000, 1)})
+        rows.append({"benchmark": "process_to_ready", "value_ms": round(ready["process_to_ready_s"] * 1000, 1)})
+        if ready["status"] != "ready":
+            failures.append(f"estado final '{ready['status']}'")
+        if ready["process_to_ready_s"] > ready_budget_s:
+            failures.append(f"ready {ready['process_to_ready_s']:.2f} s > presupuesto {ready_budget_s} s")
+
+    results = {
+        "results": rows,
+        "import_profile": profile,
+        "ready_profile": ready,
+        "budgets": {"import_ms": import_budget_ms, "ready_s": ready_budget_s},
+        "failures": failures,
+    }
+    path = save_results("startup", results)
+    print(f"\nResultados guardados en {path}")
+
+    if failures:
+        print("❌ Presupuesto de arranque superado: " + "; ".join(failures))
+        return 1
+    print("✅ Arranque dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfil de arranque de AgroMind")
+    parser.add_argument("--module", default="model.integrate_all_api")
+    parser.add_argument("--top", type=int, default=15, help="Paquetes a mostrar en el perfil de import")
+    parser.add_argument("--import-budget-ms", type=float,
+                        default=float(os.getenv("AGROMIND_IMPORT_BUDGET_MS", 1000)))
+    parser.add_argument("--ready-budget-s", type=float,
+                        default=float(os.getenv("AGROMIND_READY_BUDGET_S", 30)))
+    parser.add_argument("--no-ready", action="store_true", help="Solo perfil de import, sin cargar modelos")
+    args = parser.parse_args()
+
+    sys.exit(run(args.module, args.top, args.import_budget_ms, args.ready_budget_s, not args.no_ready))
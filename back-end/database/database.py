@@ -14,12 +14,19 @@ if not DATABASE_URL:
     raise ValueError("❌ DB_URL no está configurada en el archivo .env")
 
 # Crear engine de SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verificar conexión antes de usar
-    pool_size=10,        # Número de conexiones en el pool
-    max_overflow=20      # Conexiones adicionales permitidas
-)
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite (benchmarks y pruebas locales): FastAPI usa la sesión desde otros hilos
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False}
+    )
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_pre_ping=True,  # Verificar conexión antes de usar
+        pool_size=10,        # Número de conexiones en el pool
+        max_overflow=20      # Conexiones adicionales permitidas
+    )
 
 # Crear sesión local
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,69 @@
+"""
+Listeners de SQLAlchemy sobre los modelos.
+
+Se registran al importar database.models (import al final de ese módulo).
+"""
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database.geohash import encode
+from database.models import User, Crop, Prediction, HydroRecipe, ImagePrediction, ChangeLog
+
+
+def _set_geohash(mapper, connection, crop):
+    if crop.location_lat is None or crop.location_long is None:
+        crop.geohash = None
+    else:
+        crop.geohash = encode(crop.location_lat, crop.location_long)
+
+
+event.listen(Crop, "before_insert", _set_geohash)
+event.listen(Crop, "before_update", _set_geohash)
+
+
+# Modelos cuyo cambio invalida las respuestas GET de /crops del usuario dueño y
+# se registra en change_log para GET /sync
+VERSIONED_MODELS = (Crop, Prediction, HydroRecipe, ImagePrediction)
+
+
+def _changed_objects(session):
+    """[(objeto, op)] de los modelos versionados que cambian en este flush."""
+    changed = [(obj, "upsert") for obj in session.new]
+    changed += [(obj, "upsert") for obj in session.dirty if session.is_modified(obj)]
+    changed += [(obj, "delete") for obj in session.deleted]
+    return [(obj, op) for obj, op in changed
+            if isinstance(obj, VERSIONED_MODELS) and obj.user_id is not None]
+
+
+def _record_changes(session, flush_context):
+    """
+    En la misma transacción que el flush:
+      - incrementa users.data_version de los usuarios afectados (ETag de /crops);
+      - añade una fila a change_log por objeto cambiado (GET /sync).
+    Cubre las rutas, el programador nocturno y los avisos regionales
+    (cualquier proceso que escriba con el ORM).
+    """
+    changed = _changed_objects(session)
+    if not changed:
+        return
+
+    user_ids = {obj.user_id for obj, _ in changed}
+    users = User.__table__
+    connection = session.connection()
+    connection.execute(
+        users.update().where(users.c.id.in_(user_ids)).values(data_version=users.c.data_version + 1)
+    )
+    connection.execute(ChangeLog.__table__.insert(), [
+        {"user_id": obj.user_id, "entity": obj.__tablename__, "entity_id": obj.id, "op": op,
+         "created_at": datetime.utcnow()}
+        for obj, op in changed
+    ])
+
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, User) and obj.id in user_ids:
+            session.expire(obj, ["data_version"])
+
+
+event.listen(Session, "after_flush", _record_changes)
@@ -0,0 +1,133 @@
+"""
+Geohash para indexar la ubicación de los cultivos.
+
+Un geohash codifica (lat, lon) en una cadena base32 donde cada carácter
+refina la celda anterior: las ubicaciones cercanas comparten prefijo. Con un
+índice B-tree normal sobre la columna `crops.geohash` (SQLite y PostgreSQL),
+una consulta por prefijo es un rango `geohash >= p AND geohash < p + '{'`, sin
+necesitar PostGIS ni el módulo R-tree de SQLite.
+
+Tamaño aproximado de celda por precisión (en el ecuador):
+    4 → 39 x 20 km   5 → 4.9 x 4.9 km   6 → 1.2 x 0.6 km   7 → 153 x 153 m
+"""
+import math
+
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(BASE32)}
+
+# Precisión que se guarda en la base de datos (≈ 4.8 m)
+STORED_PRECISION = 9
+
+# Carácter mayor que cualquiera del alfabeto: límite superior de los rangos por prefijo
+PREFIX_END = "{"
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode(lat, lon, precision=STORED_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # los bits pares son de longitud
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def bounds(geohash):
+    """(min_lat, min_lon, max_lat, max_lon) de la celda."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash):
+    """Centro (lat, lon) de la celda."""
+    min_lat, min_lon, max_lat, max_lon = bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def cell_size(precision):
+    """(alto en grados de latitud, ancho en grados de longitud) de una celda."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def cover_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=32):
+    """
+    Prefijos geohash que cubren el rectángulo. Usa la mayor precisión con la
+    que no se superan `max_cells` celdas: más precisión = menos filas
+    candidatas, pero más rangos en la consulta.
+    No maneja rectángulos que crucen el antimeridiano.
+    """
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+
+    precision = 1
+    for p in range(1, STORED_PRECISION + 1):
+        height, width = cell_size(p)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * cols > max_cells:
+            break
+        precision = p
+
+    height, width = cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(encode(min(lat, 90.0 - 1e-9), min(lon, 180.0 - 1e-9), precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + width, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return sorted(cells)
+
+
+def radius_bbox(lat, lon, radius_km):
+    """Rectángulo que contiene el círculo de radio `radius_km` alrededor de (lat, lon)."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database.database import Base
@@ -14,6 +14,9 @@ class User(Base):
     full_name = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # Se incrementa con cada cambio en los cultivos o el historial del usuario
+    # (database/events.py); es el ETag de las rutas GET de /crops
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -37,6 +40,8 @@ class Crop(Base):
     crop_type = Column(String(50), nullable=False)  # 'hydroponic' o 'soil'
     location_lat = Column(Float, nullable=True)
     location_long = Column(Float, nullable=True)
+    # Geohash de (location_lat, location_long); lo mantiene database/events.py
+    geohash = Column(String(12), nullable=True)
     area = Column(Float, nullable=True)  # Área en m² o hectáreas
     planting_date = Column(DateTime, nullable=True)
     harvest_date = Column(DateTime, nullable=True)
@@ -51,6 +56,11 @@ class Crop(Base):
     hydro_recipes = relationship("HydroRecipe", back_populates="crop", cascade="all, delete-orphan")
     image_predictions = relationship("ImagePrediction", back_populates="crop", cascade="all, delete-orphan")
     
+    # Consultas regionales: cultivos activos por prefijo de geohash
+    __table_args__ = (
+        Index("ix_crops_status_geohash", "status", "geohash"),
+    )
+
     def __repr__(self):
         return f"<Crop {self.name} - {self.crop_type}>"
 
@@ -116,6 +126,10 @@ class HydroRecipe(Base):
     
     # Receta completa (JSON con mix_A y mix_B)
     recipe_data = Column(JSON, nullable=False)
+
+    # Recetas precalculadas por model/recipe_scheduler.py para la semana siguiente
+    scheduled = Column(Boolean, default=False, nullable=False)
+    valid_from = Column(DateTime, nullable=True)  # Inicio de la semana de la receta
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -123,6 +137,11 @@ class HydroRecipe(Base):
     user = relationship("User", back_populates="hydro_recipes")
     crop = relationship("Crop", back_populates="hydro_recipes")
     
+    # Lectura de la receta programada de un cultivo: una búsqueda en este índice
+    __table_args__ = (
+        Index("ix_hydro_recipes_crop_scheduled_week", "crop_id", "scheduled", "week"),
+    )
+
     def __repr__(self):
         return f"<HydroRecipe {self.crop_name} - Week {self.week}>"
 
@@ -150,3 +169,31 @@ class ImagePrediction(Base):
     
     def __repr__(self):
         return f"<ImagePrediction {self.predicted_class} - {self.confidence}>"
+
+
+class ChangeLog(Base):
+    """
+    Registro de cambios (solo se añaden filas) de los cultivos y el historial de
+    cada usuario. Lo escribe database/events.py en cada flush; el id es la
+    marca de agua de GET /sync.
+    """
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    entity = Column(String(30), nullable=False)  # nombre de la tabla: crops, predictions, ...
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # 'upsert' o 'delete'
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # GET /sync lee un rango de este índice: user_id = ? AND id > marca
+    __table_args__ = (
+        Index("ix_change_log_user_id_id", "user_id", "id"),
+    )
+
+    def __repr__(self):
+        return f"<ChangeLog {self.id} {self.op} {self.entity}:{self.entity_id}>"
+
+
+# Listeners de SQLAlchemy (geohash, versión de datos y registro de cambios)
+from database import events  # noqa: E402,F401
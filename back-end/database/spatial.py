@@ -0,0 +1,46 @@
+"""
+Consultas espaciales sobre cultivos usando la columna indexada `crops.geohash`.
+
+Cada consulta se resuelve en dos pasos:
+  1. Filtro grueso por rangos de prefijo geohash (usa ix_crops_status_geohash).
+  2. Filtro exacto: rectángulo en SQL y, para radios, distancia haversine.
+"""
+from sqlalchemy import and_, or_
+
+from database.geohash import PREFIX_END, cover_bbox, radius_bbox, haversine_km
+from database.models import Crop
+
+
+def _prefix_filter(prefixes):
+    return or_(*[and_(Crop.geohash >= p, Crop.geohash < p + PREFIX_END) for p in prefixes])
+
+
+def crops_in_bbox_query(db, min_lat, min_lon, max_lat, max_lon, status="active", crop_type=None, max_cells=32):
+    query = db.query(Crop).filter(
+        _prefix_filter(cover_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=max_cells)),
+        Crop.location_lat.between(min_lat, max_lat),
+        Crop.location_long.between(min_lon, max_lon),
+    )
+    if status:
+        query = query.filter(Crop.status == status)
+    if crop_type:
+        query = query.filter(Crop.crop_type == crop_type)
+    return query
+
+
+def crops_in_bbox(db, min_lat, min_lon, max_lat, max_lon, status="active", crop_type=None, max_cells=32):
+    """Cultivos dentro del rectángulo [min_lat, max_lat] x [min_lon, max_lon]."""
+    return crops_in_bbox_query(db, min_lat, min_lon, max_lat, max_lon, status, crop_type, max_cells).all()
+
+
+def crops_within_radius(db, lat, lon, radius_km, status="active", crop_type=None, max_cells=32):
+    """[(cultivo, distancia_km)] a menos de `radius_km` de (lat, lon), de más cercano a más lejano."""
+    candidates = crops_in_bbox(db, *radius_bbox(lat, lon, radius_km), status=status, crop_type=crop_type,
+                               max_cells=max_cells)
+    found = []
+    for crop in candidates:
+        distance = haversine_km(lat, lon, crop.location_lat, crop.location_long)
+        if distance <= radius_km:
+            found.append((crop, distance))
+    found.sort(key=lambda item: item[1])
+    return found
@@ -2,8 +2,89 @@
 Script para inicializar la base de datos.
 Crea todas las tablas definidas en los modelos.
 """
-from database.database import Base, engine
-from database.models import User, Crop, Prediction, HydroRecipe, ImagePrediction
+from sqlalchemy import inspect, text, select, literal
+
+from database.database import Base, SessionLocal, engine
+from database.models import User, Crop, Prediction, HydroRecipe, ImagePrediction, ChangeLog
+from database.geohash import encode
+
+
+def _add_column(conn, table, column, ddl, existing):
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        print(f"   + columna {table}.{column}")
+
+
+def _create_index(conn, table, name, columns, existing):
+    if name not in existing:
+        conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+        print(f"   + índice {name}")
+
+
+def migrate_schema():
+    """
+    Añade a bases ya creadas las columnas e índices nuevos que create_all no
+    toca en tablas existentes. Se puede ejecutar varias veces.
+    """
+    inspector = inspect(engine)
+    users_columns = {c["name"] for c in inspector.get_columns("users")}
+    crops_columns = {c["name"] for c in inspector.get_columns("crops")}
+    crops_indexes = {i["name"] for i in inspector.get_indexes("crops")}
+    recipes_columns = {c["name"] for c in inspector.get_columns("hydro_recipes")}
+    recipes_indexes = {i["name"] for i in inspector.get_indexes("hydro_recipes")}
+
+    with engine.begin() as conn:
+        _add_column(conn, "users", "data_version", "INTEGER NOT NULL DEFAULT 0", users_columns)
+
+        _add_column(conn, "crops", "geohash", "VARCHAR(12)", crops_columns)
+        _create_index(conn, "crops", "ix_crops_status_geohash", ["status", "geohash"], crops_indexes)
+
+        _add_column(conn, "hydro_recipes", "scheduled", "BOOLEAN NOT NULL DEFAULT FALSE", recipes_columns)
+        _add_column(conn, "hydro_recipes", "valid_from", "TIMESTAMP", recipes_columns)
+        _create_index(conn, "hydro_recipes", "ix_hydro_recipes_crop_scheduled_week",
+                      ["crop_id", "scheduled", "week"], recipes_indexes)
+
+    backfill_crops_geohash()
+    backfill_change_log()
+
+
+def backfill_crops_geohash():
+    """Calcula el geohash de los cultivos creados antes de la columna."""
+    db = SessionLocal()
+    try:
+        pending = db.query(Crop.id, Crop.location_lat, Crop.location_long).filter(
+            Crop.geohash.is_(None), Crop.location_lat.isnot(None), Crop.location_long.isnot(None)
+        ).all()
+        if pending:
+            db.bulk_update_mappings(Crop, [
+                {"id": crop_id, "geohash": encode(lat, lon)} for crop_id, lat, lon in pending
+            ])
+            db.commit()
+            print(f"   + geohash calculado para {len(pending)} cultivos")
+    finally:
+        db.close()
+
+
+def backfill_change_log():
+    """
+    Si change_log está vacío, registra como 'upsert' todas las filas ya
+    existentes para que la primera sincronización (since=0) las incluya.
+    """
+    log = ChangeLog.__table__
+    with engine.begin() as conn:
+        if conn.execute(select(log.c.id).limit(1)).first() is not None:
+            return
+        total = 0
+        for model in (Crop, Prediction, HydroRecipe, ImagePrediction):
+            table = model.__table__
+            rows = select(
+                table.c.user_id, literal(model.__tablename__), table.c.id, literal("upsert"), table.c.created_at
+            ).order_by(table.c.id)
+            result = conn.execute(log.insert().from_select(
+                ["user_id", "entity", "entity_id", "op", "created_at"], rows))
+            total += result.rowcount or 0
+        if total:
+            print(f"   + {total} filas existentes añadidas a change_log")
 
 def init_db():
     """Crear todas las tablas en la base de datos"""
@@ -12,12 +93,14 @@ def init_db():
     try:
         # Crear todas las tablas
         Base.metadata.create_all(bind=engine)
+        migrate_schema()
         print("✅ Tablas creadas exitosamente:")
         print("   - users")
         print("   - crops")
         print("   - predictions")
         print("   - hydro_recipes")
         print("   - image_predictions")
+        print("   - change_log")
         print("\n🎉 Base de datos inicializada correctamente")
         
     except Exception as e:
@@ -0,0 +1,349 @@
+"""
+Artefactos de preprocesado en un solo fichero de arrays sin comprimir (.agma).
+
+Los transformadores de scikit-learn que usa la API solo guardan unos pocos
+arrays (lambdas y media/escala de Yeo-Johnson, escala/mínimo de MinMax,
+clases y categorías). Este módulo los guarda crudos en un fichero mapeable
+en memoria y los aplica con numpy:
+
+  - cargar no importa scikit-learn, joblib ni pandas (cientos de ms por worker);
+  - los arrays se leen con np.memmap: los workers de serve.py comparten las
+    páginas de la caché del sistema en vez de tener cada uno su copia;
+  - la salida es la misma que la de scikit-learn (el conversor lo comprueba).
+
+Formato (little endian):
+    b"AGMA1\\0\\0\\0" | u64 longitud de la cabecera | cabecera JSON | arrays
+La cabecera describe cada array (dtype, shape, offset alineado a 64 bytes) y
+los metadatos (tipo de transformador, nombres de columnas, clases...).
+
+Los pesos de los modelos Keras no se incluyen: TensorFlow copia los pesos a
+sus variables al cargar, así que mapearlos no ahorraría memoria.
+
+Uso (desde back-end/):
+    python -m model.array_artifacts convert                  # Artifacts/*.joblib -> Artifacts/{hydro,soil}.agma
+    python -m model.array_artifacts convert --bundle hydro v2   # dentro de un paquete de model/bundles.py
+    python -m model.array_artifacts inspect Artifacts/soil.agma
+"""
+import os
+import json
+import time
+import struct
+import argparse
+
+import numpy as np
+
+
+MAGIC = b"AGMA1\0\0\0"
+ALIGN = 64
+EXTENSION = ".agma"
+
+
+# ===== TRANSFORMADORES (numpy) =====
+
+class YeoJohnson:
+    """PowerTransformer(method='yeo-johnson', standardize=True/False) ya ajustado."""
+
+    def __init__(self, lambdas, mean=None, scale=None):
+        self.lambdas_ = lambdas
+        self.mean = mean
+        self.scale = scale
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty_like(X)
+        eps = np.spacing(1.0)
+        for j, lmbda in enumerate(self.lambdas_):
+            x = X[:, j]
+            pos = x >= 0
+            col = np.empty_like(x)
+            if abs(lmbda) < eps:
+                col[pos] = np.log1p(x[pos])
+            else:
+                col[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+            if abs(lmbda - 2) > eps:
+                col[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+            else:
+                col[~pos] = -np.log1p(-x[~pos])
+            out[:, j] = col
+        if self.mean is not None:
+            out = (out - self.mean) / self.scale
+        return out
+
+
+class MinMax:
+    """MinMaxScaler ya ajustado (transform e inverse_transform)."""
+
+    def __init__(self, scale, min_):
+        self.scale_ = scale
+        self.min_ = min_
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+class Labels:
+    """LabelEncoder ya ajustado. Etiquetas desconocidas -> ValueError, como scikit-learn."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._index = {name: i for i, name in enumerate(classes)}
+
+    def transform(self, values):
+        try:
+            return np.array([self._index[v] for v in values], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e}") from None
+
+
+class OneHot:
+    """OneHotEncoder(handle_unknown='error', sparse_output=False) de una columna."""
+
+    def __init__(self, categories):
+        self.categories_ = [np.asarray(categories, dtype=object)]
+        self._index = {name: i for i, name in enumerate(categories)}
+
+    def transform(self, values):
+        values = list(values)
+        out = np.zeros((len(values), len(self._index)), dtype=np.float64)
+        try:
+            out[np.arange(len(values)), [self._index[v] for v in values]] = 1.0
+        except KeyError as e:
+            raise ValueError(f"Found unknown categories [{e}] in column 0 during transform") from None
+        return out
+
+
+class ColumnPreprocessor:
+    """
+    ColumnTransformer [('num', Yeo-Johnson, columnas numéricas), ('cat', one-hot, 1 columna)].
+    transform acepta un dict de columnas (lo que construye la API) o un DataFrame.
+    """
+
+    # prepare_inputs_normal puede pasar un dict y no construir un DataFrame
+    accepts_columns = True
+
+    def __init__(self, num, num_columns, cat, cat_column):
+        self.num_columns = list(num_columns)
+        self.cat_column = cat_column
+        # Misma forma que ColumnTransformer para el código que consulta las categorías
+        self.named_transformers_ = {"num": num, "cat": cat}
+
+    def transform(self, X):
+        num = np.column_stack([np.asarray(X[c], dtype=np.float64) for c in self.num_columns])
+        return np.hstack([self.named_transformers_["num"].transform(num),
+                          self.named_transformers_["cat"].transform(X[self.cat_column])])
+
+
+# ===== FICHERO =====
+
+def write(path, arrays, meta):
+    """Escribe `arrays` ({nombre: ndarray numérico}) y `meta` (JSON) en `path`."""
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise TypeError(f"'{name}': solo arrays numéricos (las cadenas van en meta)")
+        offset = -(-offset // ALIGN) * ALIGN
+        layout[name] = {"dtype": array.dtype.newbyteorder("<").str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({"arrays": layout, "meta": meta}, ensure_ascii=False).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).astype(layout[name]["dtype"], copy=False).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+
+def read(path):
+    """({nombre: array de solo lectura mapeado del fichero}, meta)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} no es un fichero {EXTENSION}")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+
+    arrays = {}
+    if header["arrays"]:
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count,
+                                         offset=data_start + spec["offset"]).reshape(spec["shape"])
+    return arrays, header["meta"]
+
+
+# ===== (DE)SERIALIZACIÓN DE TRANSFORMADORES =====
+
+def _export(prefix, obj, arrays):
+    """Guarda en `arrays` los parámetros de `obj` (scikit-learn) y devuelve su descripción."""
+    kind = type(obj).__name__
+    if kind == "PowerTransformer":
+        if obj.method != "yeo-johnson":
+            raise TypeError(f"PowerTransformer(method={obj.method!r}) no soportado")
+        arrays[f"{prefix}.lambdas"] = obj.lambdas_
+        spec = {"type": "yeo_johnson", "standardize": bool(obj.standardize)}
+        if obj.standardize:
+            arrays[f"{prefix}.mean"] = obj._scaler.mean_
+            arrays[f"{prefix}.scale"] = obj._scaler.scale_
+        return spec
+    if kind == "MinMaxScaler":
+        if obj.clip:
+            raise TypeError("MinMaxScaler(clip=True) no soportado")
+        arrays[f"{prefix}.scale"] = obj.scale_
+        arrays[f"{prefix}.min"] = obj.min_
+        return {"type": "minmax"}
+    if kind == "LabelEncoder":
+        return {"type": "labels", "classes": [str(c) for c in obj.classes_]}
+    if kind == "ColumnTransformer":
+        transformers = {name: (t, cols) for name, t, cols in obj.transformers_ if name != "remainder"}
+        num, num_columns = transformers["num"]
+        cat, cat_columns = transformers["cat"]
+        if (type(cat).__name__ != "OneHotEncoder" or cat.handle_unknown != "error" or cat.drop is not None
+                or len(cat_columns) != 1 or set(transformers) != {"num", "cat"}):
+            raise TypeError("ColumnTransformer no soportado: se espera [num: PowerTransformer, cat: OneHotEncoder]")
+        return {
+            "type": "columns",
+            "num": _export(f"{prefix}.num", num, arrays), "num_columns": list(num_columns),
+            "categories": [str(c) for c in cat.categories_[0]], "cat_column": cat_columns[0],
+        }
+    raise TypeError(f"Transformador no soportado: {kind}")
+
+
+def _build(prefix, spec, arrays):
+    kind = spec["type"]
+    if kind == "yeo_johnson":
+        if spec["standardize"]:
+            return YeoJohnson(arrays[f"{prefix}.lambdas"], arrays[f"{prefix}.mean"], arrays[f"{prefix}.scale"])
+        return YeoJohnson(arrays[f"{prefix}.lambdas"])
+    if kind == "minmax":
+        return MinMax(arrays[f"{prefix}.scale"], arrays[f"{prefix}.min"])
+    if kind == "labels":
+        return Labels(spec["classes"])
+    if kind == "columns":
+        return ColumnPreprocessor(_build(f"{prefix}.num", spec["num"], arrays), spec["num_columns"],
+                                  OneHot(spec["categories"]), spec["cat_column"])
+    raise ValueError(f"Tipo de transformador desconocido: {kind}")
+
+
+class StaleArtifacts(ValueError):
+    """El .agma se generó a partir de otros joblib (reentrenamiento sin convertir)."""
+
+
+def save_parts(path, parts, sources=None):
+    """
+    Guarda {rol: transformador de scikit-learn} en un fichero .agma.
+    `sources` ({fichero: sha256} de los joblib de origen) permite detectar luego si quedó obsoleto.
+    """
+    arrays = {}
+    meta = {"parts": {role: _export(role, obj, arrays) for role, obj in parts.items()},
+            "sources": sources or {}}
+    write(path, arrays, meta)
+
+
+def load_parts(path, sources=None):
+    """{rol: transformador numpy} desde un fichero .agma; StaleArtifacts si `sources` no coincide."""
+    arrays, meta = read(path)
+    if sources is not None and meta.get("sources") != sources:
+        raise StaleArtifacts(f"{path} no corresponde a los joblib actuales; vuelve a ejecutar el conversor")
+    return {role: _build(role, spec, arrays) for role, spec in meta["parts"].items()}
+
+
+# ===== CONVERSOR =====
+
+def _sample_inputs(system, parts, n=256, seed=0):
+    """Entradas aleatorias con la forma que usa la API, para comparar con scikit-learn."""
+    rng = np.random.default_rng(seed)
+    if system == "hydro":
+        X = np.column_stack([rng.uniform(10, 35, n), rng.uniform(30, 95, n), rng.uniform(4.5, 7.5, n),
+                             rng.integers(1, 12, n), np.zeros(n)])
+        X[:, 4] = X[:, 0] * X[:, 1]
+        return {"scaler_num": X, "scaler_y": rng.uniform(0, 1, (n, 4)),
+                "encoder": list(rng.choice(parts["encoder"].classes_, n))}
+    categories = parts["preprocessor"].named_transformers_["cat"].categories_[0]
+    columns = {"temperature": rng.uniform(10, 35, n), "humidity": rng.uniform(30, 95, n),
+               "ph": rng.uniform(4.5, 8.5, n), "rainfall": rng.uniform(20, 300, n),
+               "label": list(rng.choice(categories, n))}
+    return {"preprocessor": columns, "scaler_y": rng.uniform(0, 1, (n, 3))}
+
+
+def compare(system, sk_parts, np_parts):
+    """Máxima diferencia absoluta entre scikit-learn y numpy por rol (y por sentido en MinMax)."""
+    import warnings
+    import pandas as pd
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    diffs = {}
+    for role, X in _sample_inputs(system, sk_parts).items():
+        sk, mine = sk_parts[role], np_parts[role]
+        sk_input = pd.DataFrame(X) if isinstance(X, dict) else X
+        diffs[role] = float(np.max(np.abs(np.asarray(sk.transform(sk_input), dtype=float) - mine.transform(X))))
+        if hasattr(sk, "inverse_transform") and role == "scaler_y":
+            diffs[f"{role}.inverse"] = float(np.max(np.abs(sk.inverse_transform(X) - mine.inverse_transform(X))))
+    return diffs
+
+
+def convert(system, version, tolerance=1e-9):
+    """Convierte los joblib de system@version a .agma y lo registra. Devuelve (ruta, diferencias)."""
+    from model import bundles
+
+    manifest = bundles.verify(system, version)
+    sk_parts = bundles.load_parts(system, version, manifest, prefer_arrays=False)
+    sources = bundles.part_checksums(system, version, manifest)
+    if version == bundles.LEGACY_VERSION:
+        path = bundles.legacy_arrays_path(system)
+    else:
+        path = os.path.join(bundles.bundle_dir(system, version), f"{system}{EXTENSION}")
+
+    save_parts(path, sk_parts, sources)
+    diffs = compare(system, sk_parts, load_parts(path))
+    worst = max(diffs.values())
+    if worst > tolerance:
+        os.remove(path)
+        raise ValueError(f"{system}@{version}: diferencia {worst:.3g} con scikit-learn (> {tolerance:g})")
+
+    if version != bundles.LEGACY_VERSION:
+        bundles.add_file(system, version, "arrays", path)
+    return path, diffs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Artefactos de preprocesado mapeables en memoria (.agma)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("convert", help="joblib -> .agma (comprueba que la salida coincide)")
+    p.add_argument("--bundle", nargs=2, metavar=("SISTEMA", "VERSION"),
+                   help="Convertir un paquete (por defecto, los ficheros legacy de hydro y soil)")
+    p.add_argument("--tolerance", type=float, default=1e-9)
+
+    p = commands.add_parser("inspect", help="Mostrar la cabecera de un fichero .agma")
+    p.add_argument("path")
+
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        arrays, meta = read(args.path)
+        print(json.dumps(meta, indent=2, ensure_ascii=False))
+        for name, array in arrays.items():
+            print(f"  {name:<24} {array.dtype} {array.shape}")
+    else:
+        from model import bundles
+
+        targets = [tuple(args.bundle)] if args.bundle else [("hydro", bundles.LEGACY_VERSION),
+                                                           ("soil", bundles.LEGACY_VERSION)]
+        for system, version in targets:
+            path, diffs = convert(system, version, args.tolerance)
+            start = time.perf_counter()
+            load_parts(path)
+            load_ms = (time.perf_counter() - start) * 1000
+            print(f"✅ {system}@{version} -> {path} ({os.path.getsize(path)} bytes, carga {load_ms:.2f} ms)")
+            print(f"   diferencia máxima con scikit-learn: {diffs}")
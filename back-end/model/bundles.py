@@ -0,0 +1,401 @@
+"""
+Paquetes versionados de artefactos de cada sistema de la API.
+
+Un paquete reúne el modelo y sus transformadores, que siempre deben cambiar
+juntos:
+
+    training_models/bundles/<sistema>/<versión>/
+        manifest.json
+        hydro_model.keras, scaler_num_hydro.joblib, ...
+
+    manifest.json = {
+        "system": "hydro", "version": "2026-10-19.1", "created_at": "...",
+        "files": {"model": "hydro_model.keras", "scaler_num": "...", ...},
+        "sha256": {"hydro_model.keras": "...", ...},
+        "warmup": [{...entrada de ejemplo...}]          (opcional)
+    }
+
+    training_models/bundles/<sistema>/CURRENT   versión activa (una línea)
+    training_models/bundles/<sistema>/CANDIDATE versión en sombra/canario (JSON, ver model/shadow.py)
+
+Sin paquetes se usa la versión "legacy": los ficheros de siempre en
+Artifacts/ y training_models/. Los checksums se verifican antes de cargar.
+Variantes TFLite dentro del paquete: clave "model_<variante>" en "files"
+(p. ej. "model_int8": "hydro_int8.tflite"), elegida con AGROMIND_<SISTEMA>_VARIANT.
+
+Transformadores en un solo fichero mapeable (model/array_artifacts.py): clave
+"arrays" en "files" dentro del paquete, o Artifacts/<sistema>.agma en legacy.
+Si existe se usa en vez de los joblib (AGROMIND_ARRAY_ARTIFACTS=0 lo desactiva).
+
+Uso (desde back-end/):
+    python -m model.bundles pack hydro 2026-10-19.1        # empaqueta los ficheros actuales
+    python -m model.bundles pack soil v2 --file model=/ruta/agromind_v2.keras
+    python -m model.bundles list
+    python -m model.bundles verify hydro 2026-10-19.1
+    python -m model.bundles activate hydro 2026-10-19.1    # los workers la cargan en caliente
+    python -m model.array_artifacts convert --bundle hydro 2026-10-19.1   # añade "arrays"
+"""
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+
+from model import array_artifacts
+from model import surrogate as soil_surrogate
+from model.model_variants import load_serving_model, selected_variant, TFLiteModel
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+BUNDLES_DIR = os.getenv("AGROMIND_BUNDLES_DIR", os.path.join(BASE_DIR, "training_models", "bundles"))
+
+LEGACY_VERSION = "legacy"
+
+USE_ARRAYS = os.getenv("AGROMIND_ARRAY_ARTIFACTS", "1") != "0"
+
+# Ficheros de cada sistema (rol -> ruta actual, relativa a back-end/)
+SYSTEMS = {
+    "hydro": {
+        "model": "training_models/hydro_model.keras",
+        "scaler_num": "Artifacts/scaler_num_hydro.joblib",
+        "encoder": "Artifacts/label_encoder_hydro.joblib",
+        "scaler_y": "Artifacts/scaler_y_hydro.joblib",
+    },
+    "soil": {
+        "model": "training_models/agromind_best.keras",
+        "preprocessor": "Artifacts/preprocessor_X.joblib",
+        "scaler_y": "Artifacts/scaler_y.joblib",
+    },
+    "image": {
+        "model": "training_models/detector_de_imagen.h5",
+    },
+}
+
+# Objetos personalizados que necesita load_model por sistema
+_CUSTOM_OBJECTS = {"soil": {"r2_keras": lambda y, p: y}}
+
+
+class BundleError(Exception):
+    pass
+
+
+class ModelBundle:
+    """
+    Modelo + transformadores de una versión. Los transformadores quedan como
+    atributos con el nombre de su rol (bundle.scaler_y, bundle.encoder...).
+    Las peticiones toman la referencia una vez y la usan hasta terminar: el
+    cambio de versión es reasignar la referencia activa.
+    """
+
+    def __init__(self, system, version, manifest, parts, model=None):
+        self.system = system
+        self.version = version
+        self.manifest = manifest
+        self.parts = parts
+        self.model = model
+        # Sustituto tabulado del modelo (solo suelo, model/surrogate.py)
+        self.surrogate = None
+        for role, obj in parts.items():
+            setattr(self, role, obj)
+
+    def __repr__(self):
+        return f"<ModelBundle {self.system}@{self.version}>"
+
+
+# ===== RUTAS Y MANIFIESTOS =====
+
+def bundle_dir(system, version):
+    return os.path.join(BUNDLES_DIR, system, version)
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(system, version):
+    if version == LEGACY_VERSION:
+        return {"system": system, "version": LEGACY_VERSION, "files": dict(SYSTEMS[system]), "sha256": {}}
+    path = os.path.join(bundle_dir(system, version), "manifest.json")
+    if not os.path.exists(path):
+        raise BundleError(f"No existe el paquete {system}@{version} ({path})")
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("system") != system or manifest.get("version") != version:
+        raise BundleError(f"El manifiesto de {path} no corresponde a {system}@{version}")
+    return manifest
+
+
+def file_path(system, version, filename):
+    if version == LEGACY_VERSION:
+        return os.path.join(BASE_DIR, filename)
+    return os.path.join(bundle_dir(system, version), filename)
+
+
+def legacy_arrays_path(system):
+    return os.path.join(BASE_DIR, "Artifacts", f"{system}{array_artifacts.EXTENSION}")
+
+
+def part_checksums(system, version, manifest):
+    """{fichero: sha256} de los transformadores joblib (los del manifiesto si los tiene)."""
+    checksums = {}
+    for role, filename in manifest["files"].items():
+        if role in SYSTEMS[system] and role != "model":
+            checksums[filename] = (manifest["sha256"].get(filename)
+                                   or sha256_file(file_path(system, version, filename)))
+    return checksums
+
+
+def arrays_path(system, version, manifest):
+    """Fichero .agma de la versión, o None si no tiene."""
+    if version == LEGACY_VERSION:
+        path = legacy_arrays_path(system)
+        return path if os.path.exists(path) else None
+    filename = manifest["files"].get("arrays")
+    return file_path(system, version, filename) if filename else None
+
+
+def verify(system, version):
+    """Comprueba que están todos los ficheros del manifiesto y sus sha256."""
+    manifest = read_manifest(system, version)
+    for role in SYSTEMS[system]:
+        if role not in manifest["files"]:
+            raise BundleError(f"{system}@{version}: falta el rol '{role}' en el manifiesto")
+    for filename, expected in manifest.get("sha256", {}).items():
+        path = file_path(system, version, filename)
+        if not os.path.exists(path):
+            raise BundleError(f"{system}@{version}: falta {filename}")
+        if sha256_file(path) != expected:
+            raise BundleError(f"{system}@{version}: checksum incorrecto en {filename}")
+    return manifest
+
+
+def list_versions(system):
+    root = os.path.join(BUNDLES_DIR, system)
+    if not os.path.isdir(root):
+        return []
+    versions = [v for v in os.listdir(root) if os.path.exists(os.path.join(root, v, "manifest.json"))]
+    return sorted(versions)
+
+
+def _current_file(system):
+    return os.path.join(BUNDLES_DIR, system, "CURRENT")
+
+
+def current_version(system):
+    """Versión activa: AGROMIND_<SISTEMA>_BUNDLE, CURRENT, o legacy."""
+    env = os.getenv(f"AGROMIND_{system.upper()}_BUNDLE")
+    if env:
+        return env
+    try:
+        with open(_current_file(system)) as f:
+            return f.read().strip() or LEGACY_VERSION
+    except FileNotFoundError:
+        return LEGACY_VERSION
+
+
+def set_current(system, version):
+    """Escribe CURRENT de forma atómica (rename)."""
+    os.makedirs(os.path.join(BUNDLES_DIR, system), exist_ok=True)
+    path = _current_file(system)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, path)
+
+
+def _candidate_file(system):
+    return os.path.join(BUNDLES_DIR, system, "CANDIDATE")
+
+
+def candidate_config(system):
+    """{"version", "sample_rate", "canary_percent"} de la versión candidata, o None."""
+    try:
+        with open(_candidate_file(system)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def set_candidate(system, config):
+    """Escribe CANDIDATE de forma atómica; config=None lo elimina."""
+    path = _candidate_file(system)
+    if config is None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    os.makedirs(os.path.join(BUNDLES_DIR, system), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(config, f)
+    os.replace(tmp, path)
+
+
+# ===== CARGA =====
+
+def load_parts(system, version, manifest=None, prefer_arrays=USE_ARRAYS):
+    """
+    Transformadores de la versión (sin TensorFlow: seguro antes de fork).
+    Con fichero .agma no se importa scikit-learn ni joblib.
+    """
+    manifest = manifest or verify(system, version)
+    path = arrays_path(system, version, manifest) if prefer_arrays else None
+    if path:
+        # En legacy los joblib se pueden regenerar al reentrenar: el .agma debe venir de ellos
+        sources = part_checksums(system, version, manifest) if version == LEGACY_VERSION else None
+        try:
+            parts = array_artifacts.load_parts(path, sources)
+        except array_artifacts.StaleArtifacts as e:
+            print(f"⚠️ {e}. Se usan los joblib.")
+            return load_parts(system, version, manifest, prefer_arrays=False)
+        missing = [r for r in SYSTEMS[system] if r != "model" and r not in parts]
+        if missing:
+            raise BundleError(f"{system}@{version}: faltan {missing} en {os.path.basename(path)}")
+        return parts
+
+    import joblib
+
+    return {
+        role: joblib.load(file_path(system, version, filename))
+        for role, filename in manifest["files"].items()
+        if role in SYSTEMS[system] and role != "model"
+    }
+
+
+def load_model(system, version, manifest):
+    """Modelo Keras (o la variante TFLite elegida) de la versión."""
+    from tensorflow.keras.models import load_model as keras_load_model
+
+    path = file_path(system, version, manifest["files"]["model"])
+    if not os.path.exists(path):
+        raise BundleError(f"{system}@{version}: no se encuentra el modelo {path}")
+
+    def keras_loader():
+        return keras_load_model(path, custom_objects=_CUSTOM_OBJECTS.get(system))
+
+    if version == LEGACY_VERSION:
+        # Variantes de training_models/variants, como antes de los paquetes
+        return load_serving_model(system, keras_loader)
+
+    variant = selected_variant(system)
+    variant_file = manifest["files"].get(f"model_{variant}")
+    if variant not in ("", "float32", "keras") and variant_file:
+        print(f"Modelo '{system}@{version}': usando variante {variant}")
+        return TFLiteModel(file_path(system, version, variant_file))
+    return keras_loader()
+
+
+def load_bundle(system, version, with_model=True):
+    manifest = verify(system, version)
+    parts = load_parts(system, version, manifest)
+    model = load_model(system, version, manifest) if with_model else None
+    bundle = ModelBundle(system, version, manifest, parts, model)
+    if system == "soil":
+        bundle.surrogate = soil_surrogate.load_for(version, manifest)
+    return bundle
+
+
+# ===== EMPAQUETADO =====
+
+def add_file(system, version, role, path):
+    """Registra en el manifiesto de un paquete un fichero ya copiado en su directorio."""
+    if version == LEGACY_VERSION:
+        raise BundleError(f"'{LEGACY_VERSION}' no tiene manifiesto")
+    manifest = read_manifest(system, version)
+    filename = os.path.basename(path)
+    manifest["files"][role] = filename
+    manifest["sha256"][filename] = sha256_file(file_path(system, version, filename))
+
+    target = os.path.join(bundle_dir(system, version), "manifest.json")
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, target)
+    return manifest
+
+
+def pack(system, version, files=None, warmup=None):
+    """
+    Crea el paquete `system@version` copiando los ficheros de cada rol (por
+    defecto, los actuales de SYSTEMS). Devuelve la ruta del paquete.
+    """
+    if version == LEGACY_VERSION:
+        raise BundleError(f"'{LEGACY_VERSION}' está reservado")
+    target = bundle_dir(system, version)
+    if os.path.exists(target):
+        raise BundleError(f"Ya existe {target}")
+
+    sources = {role: os.path.join(BASE_DIR, path) for role, path in SYSTEMS[system].items()}
+    sources.update(files or {})
+
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    manifest = {"system": system, "version": version,
+                "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "files": {}, "sha256": {}}
+    for role, source in sources.items():
+        if not os.path.exists(source):
+            shutil.rmtree(tmp)
+            raise BundleError(f"No existe {source} (rol '{role}')")
+        filename = os.path.basename(source)
+        shutil.copy2(source, os.path.join(tmp, filename))
+        manifest["files"][role] = filename
+        manifest["sha256"][filename] = sha256_file(os.path.join(tmp, filename))
+    if warmup:
+        manifest["warmup"] = warmup
+
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, target)
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paquetes versionados de modelos")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("pack", help="Crear un paquete con los ficheros actuales o los indicados")
+    p.add_argument("system", choices=sorted(SYSTEMS))
+    p.add_argument("version")
+    p.add_argument("--file", action="append", default=[], metavar="ROL=RUTA",
+                   help="Sustituir el fichero de un rol (repetible)")
+
+    commands.add_parser("list", help="Versiones disponibles y activa por sistema")
+
+    p = commands.add_parser("verify", help="Comprobar ficheros y checksums")
+    p.add_argument("system", choices=sorted(SYSTEMS))
+    p.add_argument("version")
+
+    p = commands.add_parser("activate", help="Marcar la versión activa (recarga en caliente)")
+    p.add_argument("system", choices=sorted(SYSTEMS))
+    p.add_argument("version")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "pack":
+            files = dict(item.split("=", 1) for item in args.file)
+            print(f"📦 Paquete creado en {pack(args.system, args.version, files)}")
+        elif args.command == "list":
+            for system in sorted(SYSTEMS):
+                active = current_version(system)
+                versions = list_versions(system) or []
+                marks = [f"*{v}" if v == active else v for v in [LEGACY_VERSION] + versions]
+                print(f"{system:<6} {' '.join(marks)}")
+        elif args.command == "verify":
+            verify(args.system, args.version)
+            print(f"✅ {args.system}@{args.version} correcto")
+        elif args.command == "activate":
+            verify(args.system, args.version)
+            set_current(args.system, args.version)
+            print(f"✅ {args.system}: versión activa {args.version}")
+    except BundleError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
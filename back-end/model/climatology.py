@@ -0,0 +1,158 @@
+"""
+Normales climáticas mensuales en una rejilla lat/lon, mapeadas en memoria.
+
+El modelo de suelo se entrenó con la lluvia estacional de
+Crop_recommendation.csv (mm, ~20-300), no con la lluvia de la última hora que
+devuelve OpenWeatherMap (casi siempre 0). Este módulo da, sin red y en O(1),
+la temperatura (°C), humedad (%) y lluvia (mm/mes) normales de una celda y mes.
+
+Rejilla: array float32 (12, nlat, nlon, 3) en el formato .agma de
+model/array_artifacts.py; las tres variables de una celda-mes son contiguas,
+así que una consulta toca una sola página del fichero. Celdas sin datos
+(mar) = NaN -> lookup devuelve None y la API usa el clima actual.
+
+Construcción desde un CSV local de normales por punto (p. ej. exportado de
+WorldClim, ERA5 o NASA POWER), columnas lat, lon, month (1-12), temperature,
+humidity, rainfall. Los puntos de una misma celda se promedian:
+
+    python -m model.climatology build normales.csv --resolution 0.5
+    python -m model.climatology build era5.csv --rename t2m=temperature --rename tp=rainfall
+    python -m model.climatology lookup -0.18 -78.47 --month 4
+
+    AGROMIND_CLIMATOLOGY (Artifacts/climatology.agma)
+"""
+import os
+import math
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from model import array_artifacts
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CLIMATOLOGY_PATH = os.getenv("AGROMIND_CLIMATOLOGY", os.path.join(BASE_DIR, "Artifacts", "climatology.agma"))
+VARIABLES = ("temperature", "humidity", "rainfall")
+
+
+class ClimateGrid:
+    def __init__(self, normals, lat0, lon0, resolution):
+        self.normals = normals
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.resolution = resolution
+        _, self.nlat, self.nlon, _ = normals.shape
+
+    @classmethod
+    def load(cls, path=CLIMATOLOGY_PATH):
+        arrays, meta = array_artifacts.read(path)
+        return cls(arrays["normals"], meta["lat0"], meta["lon0"], meta["resolution"])
+
+    def cell(self, lat, lon):
+        """(fila, columna) de la celda, o None fuera de la rejilla."""
+        i = math.floor((lat - self.lat0) / self.resolution)
+        j = math.floor((lon - self.lon0) / self.resolution)
+        if 0 <= i < self.nlat and 0 <= j < self.nlon:
+            return i, j
+        return None
+
+    def lookup(self, lat, lon, month=None):
+        """{"temperature", "humidity", "rainfall"} del mes (por defecto el actual) o None."""
+        cell = self.cell(lat, lon)
+        if cell is None:
+            return None
+        month = month or datetime.utcnow().month
+        values = self.normals[month - 1, cell[0], cell[1]].tolist()
+        if any(math.isnan(v) for v in values):
+            return None
+        return dict(zip(VARIABLES, values))
+
+
+# Rejilla cargada (None sin fichero); se carga antes de fork y se comparte
+GRID = None
+
+
+def load(path=CLIMATOLOGY_PATH):
+    global GRID
+    if not os.path.exists(path):
+        print(f"⚠️ Sin climatología en {path} (python -m model.climatology build)")
+        return None
+    GRID = ClimateGrid.load(path)
+    return GRID
+
+
+def lookup(lat, lon, month=None):
+    return GRID.lookup(lat, lon, month) if GRID is not None else None
+
+
+# ===== CONSTRUCCIÓN =====
+
+def build(source, path=CLIMATOLOGY_PATH, resolution=0.5, rename=None, chunksize=500_000):
+    """Promedia por celda y mes los puntos de `source` (CSV) y escribe la rejilla."""
+    import pandas as pd
+
+    columns = ["lat", "lon", "month", *VARIABLES]
+    lats, lons = [], []
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        chunk = chunk.rename(columns=rename or {})
+        missing = set(columns) - set(chunk.columns)
+        if missing:
+            raise ValueError(f"Faltan columnas en {source}: {sorted(missing)}")
+        lats.append((chunk["lat"].min(), chunk["lat"].max()))
+        lons.append((chunk["lon"].min(), chunk["lon"].max()))
+
+    lat0 = math.floor(min(lo for lo, _ in lats) / resolution) * resolution
+    lon0 = math.floor(min(lo for lo, _ in lons) / resolution) * resolution
+    nlat = math.floor((max(hi for _, hi in lats) - lat0) / resolution) + 1
+    nlon = math.floor((max(hi for _, hi in lons) - lon0) / resolution) + 1
+
+    sums = np.zeros((12, nlat, nlon, len(VARIABLES)))
+    counts = np.zeros((12, nlat, nlon, 1))
+    points = 0
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        chunk = chunk.rename(columns=rename or {})[columns].dropna()
+        month = chunk["month"].to_numpy(dtype=int) - 1
+        if ((month < 0) | (month > 11)).any():
+            raise ValueError("month debe estar entre 1 y 12")
+        i = np.floor((chunk["lat"].to_numpy() - lat0) / resolution).astype(int)
+        j = np.floor((chunk["lon"].to_numpy() - lon0) / resolution).astype(int)
+        np.add.at(sums, (month, i, j), chunk[list(VARIABLES)].to_numpy(dtype=float))
+        np.add.at(counts, (month, i, j), 1)
+        points += len(chunk)
+
+    with np.errstate(invalid="ignore"):
+        normals = (sums / counts).astype(np.float32)
+    meta = {"lat0": lat0, "lon0": lon0, "resolution": resolution, "variables": list(VARIABLES),
+            "source": os.path.basename(source), "points": points,
+            "built_at": datetime.utcnow().isoformat(timespec="seconds")}
+    array_artifacts.write(path, {"normals": normals}, meta)
+    return meta, int((counts[..., 0] > 0).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Climatología mensual en rejilla")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("build", help="Construir la rejilla desde un CSV de normales por punto")
+    p.add_argument("source")
+    p.add_argument("--resolution", type=float, default=0.5, help="Grados por celda")
+    p.add_argument("--rename", action="append", default=[], metavar="COLUMNA=VARIABLE")
+    p.add_argument("--output", default=CLIMATOLOGY_PATH)
+
+    p = commands.add_parser("lookup", help="Normales de un punto")
+    p.add_argument("lat", type=float)
+    p.add_argument("lon", type=float)
+    p.add_argument("--month", type=int)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        meta, cells = build(args.source, args.output, args.resolution,
+                            dict(item.split("=", 1) for item in args.rename))
+        print(f"✅ {meta['points']} puntos -> {cells} celdas-mes con datos "
+              f"(resolución {meta['resolution']}°) en {args.output}")
+    else:
+        if load() is None:
+            raise SystemExit(1)
+        print(lookup(args.lat, args.lon, args.month) or "Sin datos para esa celda")
@@ -0,0 +1,214 @@
+"""
+Monitor de deriva de las entradas de producción frente a las de entrenamiento.
+
+Cada sistema compara sus entradas con una referencia calculada una vez a
+partir de los CSV de entrenamiento (tras clean_outliers, como en el
+preprocesado):
+
+    hydro (/generate-recipe): temperature, humidity, ph_water, week, crop
+    soil  (/predict):         temperature, humidity, ph, rainfall, crop
+
+Numéricas: histograma con BINS intervalos de igual masa en la referencia
+(cuantiles); los extremos quedan abiertos, así que los valores fuera de rango
+caen en el primer o último intervalo. Categóricas: un conteo por cultivo
+conocido más "otros". La memoria es constante y registrar una petición es
+bisect + incrementos bajo un lock (~microsegundos, ver benchmarks/microbench.py).
+Cada WINDOW muestras los conteos se reducen a la mitad, de modo que las
+estadísticas siguen el tráfico reciente.
+
+En /metrics (a partir de MIN_SAMPLES muestras):
+    agromind_drift_psi{endpoint,feature}   índice de estabilidad poblacional
+    agromind_drift_ks{endpoint,feature}    KS sobre los intervalos (solo numéricas)
+    agromind_drift_samples{endpoint}       muestras efectivas (con el decaimiento)
+Guía habitual de PSI: < 0.1 estable, 0.1-0.25 vigilar, > 0.25 deriva.
+
+Referencia (desde back-end/, se guarda en el formato de model/array_artifacts.py):
+    python -m model.drift build
+    python -m model.drift report      # referencia por variable
+
+    AGROMIND_DRIFT_REFERENCE (Artifacts/drift_reference.agma)
+    AGROMIND_DRIFT_WINDOW (5000)
+"""
+import os
+import argparse
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+from model import array_artifacts
+from model.metrics import REGISTRY, Gauge
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+REFERENCE_PATH = os.getenv("AGROMIND_DRIFT_REFERENCE", os.path.join(BASE_DIR, "Artifacts", "drift_reference.agma"))
+WINDOW = int(os.getenv("AGROMIND_DRIFT_WINDOW", 5000))
+MIN_SAMPLES = 100
+BINS = 20
+PSI_FLOOR = 1e-4  # proporción mínima por intervalo (evita log(0))
+
+# Sistema -> (ruta, CSV de entrenamiento, {variable de la API: columna del CSV}, variable categórica)
+SOURCES = {
+    "hydro": ("/generate-recipe", "model.preprocessing_data_hydro",
+              {"temperature": "Temp_C", "humidity": "Humidity_RH", "ph_water": "pH_Water", "week": "Week"},
+              ("crop", "Crop")),
+    "soil": ("/predict", "model.preprocessing_data_normal",
+             {"temperature": "temperature", "humidity": "humidity", "ph": "ph", "rainfall": "rainfall"},
+             ("crop", "label")),
+}
+
+DRIFT_PSI = REGISTRY.register(Gauge(
+    "agromind_drift_psi", "PSI de las entradas recientes frente a entrenamiento", ["endpoint", "feature"]))
+DRIFT_KS = REGISTRY.register(Gauge(
+    "agromind_drift_ks", "KS (sobre intervalos) de las entradas recientes frente a entrenamiento",
+    ["endpoint", "feature"]))
+DRIFT_SAMPLES = REGISTRY.register(Gauge(
+    "agromind_drift_samples", "Muestras efectivas en los histogramas de deriva", ["endpoint"]))
+
+
+def psi(live, reference):
+    p = np.maximum(live / max(live.sum(), 1e-12), PSI_FLOOR)
+    q = np.maximum(reference / reference.sum(), PSI_FLOOR)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def ks(live, reference):
+    return float(np.max(np.abs(np.cumsum(live) / max(live.sum(), 1e-12) - np.cumsum(reference) / reference.sum())))
+
+
+class DriftMonitor:
+    """Histogramas de las entradas de un sistema frente a su referencia."""
+
+    def __init__(self, system, endpoint, numeric, categorical, categories, reference):
+        self.system = system
+        self.endpoint = endpoint
+        self.numeric = list(numeric)
+        self.categorical = categorical
+        self.reference = reference  # {variable: conteos de la referencia}
+        self.count = 0
+        # Listas de Python: bisect e incrementos sin pasar por numpy en cada petición
+        self._edges = [[float(e) for e in edges] for edges in numeric.values()]
+        self._counts = [[0.0] * (len(edges) + 1) for edges in self._edges]
+        self._index = {name: i for i, name in enumerate(categories)}
+        self._cat_counts = [0.0] * (len(categories) + 1)
+        self._lock = threading.Lock()
+
+    def observe(self, *values):
+        """Valores en el orden de `numeric` seguido de la categoría."""
+        *numbers, category = values
+        with self._lock:
+            for edges, counts, value in zip(self._edges, self._counts, numbers):
+                counts[bisect_right(edges, value)] += 1
+            self._cat_counts[self._index.get(category, -1)] += 1
+            self.count += 1
+            if self.count >= WINDOW:
+                self._decay()
+
+    def _decay(self):
+        self._counts = [[c / 2 for c in counts] for counts in self._counts]
+        self._cat_counts = [c / 2 for c in self._cat_counts]
+        self.count /= 2
+
+    def stats(self):
+        """{variable: {"psi", "ks"}} con los conteos actuales."""
+        with self._lock:
+            counts = [np.array(c) for c in self._counts]
+            cat_counts = np.array(self._cat_counts)
+            count = self.count
+        out = {"samples": count, "features": {}}
+        for name, live in zip(self.numeric, counts):
+            reference = self.reference[name]
+            out["features"][name] = {"psi": psi(live, reference), "ks": ks(live, reference)}
+        out["features"][self.categorical] = {"psi": psi(cat_counts, self.reference[self.categorical])}
+        return out
+
+
+# Monitor por sistema (None sin fichero de referencia)
+MONITORS = {"hydro": None, "soil": None}
+
+
+def observe(system, *values):
+    monitor = MONITORS.get(system)
+    if monitor is not None:
+        monitor.observe(*values)
+
+
+def load_reference(path=REFERENCE_PATH):
+    """Crea los monitores a partir del fichero de referencia (si existe)."""
+    if not os.path.exists(path):
+        print(f"⚠️ Sin referencia de deriva en {path} (python -m model.drift build)")
+        return
+    arrays, meta = array_artifacts.read(path)
+    for system, spec in meta["monitors"].items():
+        numeric = {name: arrays[f"{system}.{name}.edges"] for name in spec["numeric"]}
+        reference = {name: np.asarray(arrays[f"{system}.{name}.counts"], dtype=float)
+                     for name in spec["numeric"] + [spec["categorical"]]}
+        MONITORS[system] = DriftMonitor(system, spec["endpoint"], numeric, spec["categorical"],
+                                        spec["categories"], reference)
+
+
+def _update_drift_gauges():
+    DRIFT_PSI.clear()
+    DRIFT_KS.clear()
+    for monitor in list(MONITORS.values()):
+        if monitor is None:
+            continue
+        DRIFT_SAMPLES.set(round(monitor.count, 1), endpoint=monitor.endpoint)
+        if monitor.count < MIN_SAMPLES:
+            continue
+        for feature, values in monitor.stats()["features"].items():
+            DRIFT_PSI.set(round(values["psi"], 5), endpoint=monitor.endpoint, feature=feature)
+            if "ks" in values:
+                DRIFT_KS.set(round(values["ks"], 5), endpoint=monitor.endpoint, feature=feature)
+
+
+REGISTRY.add_collector(_update_drift_gauges)
+
+
+# ===== REFERENCIA =====
+
+def build_reference(path=REFERENCE_PATH, bins=BINS):
+    """Histogramas de entrenamiento de cada sistema -> fichero .agma."""
+    import importlib
+
+    arrays, monitors = {}, {}
+    for system, (endpoint, module, columns, (categorical, cat_column)) in SOURCES.items():
+        preprocessing = importlib.import_module(module)
+        df = preprocessing.clean_outliers(preprocessing.load_data())
+        for name, column in columns.items():
+            values = df[column].to_numpy(dtype=float)
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+            arrays[f"{system}.{name}.edges"] = edges
+            arrays[f"{system}.{name}.counts"] = np.bincount(
+                np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1).astype(np.float64)
+        categories = sorted(df[cat_column].astype(str).unique())
+        counts = df[cat_column].astype(str).value_counts()
+        arrays[f"{system}.{categorical}.counts"] = np.array(
+            [counts[c] for c in categories] + [0], dtype=np.float64)
+        monitors[system] = {"endpoint": endpoint, "numeric": list(columns), "categorical": categorical,
+                            "categories": categories, "rows": int(len(df))}
+    array_artifacts.write(path, arrays, {"monitors": monitors})
+    return monitors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Referencia del monitor de deriva")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("build", help="Calcular la referencia desde data/*.csv")
+    p.add_argument("--bins", type=int, default=BINS)
+    commands.add_parser("report", help="Mostrar la referencia")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for system, spec in build_reference(bins=args.bins).items():
+            print(f"✅ {system} ({spec['endpoint']}): {spec['rows']} filas, "
+                  f"{len(spec['numeric'])} numéricas + {len(spec['categories'])} cultivos")
+        print(f"   -> {REFERENCE_PATH}")
+    else:
+        arrays, meta = array_artifacts.read(REFERENCE_PATH)
+        for system, spec in meta["monitors"].items():
+            print(f"{system} ({spec['endpoint']}, {spec['rows']} filas)")
+            for name in spec["numeric"]:
+                edges = arrays[f"{system}.{name}.edges"]
+                print(f"  {name:<12} {len(edges) + 1} intervalos, [{edges[0]:.2f} .. {edges[-1]:.2f}]")
+            print(f"  {spec['categorical']:<12} {', '.join(spec['categories'])}")
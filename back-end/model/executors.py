@@ -0,0 +1,184 @@
+"""
+Ejecutores dedicados y acotados para las llamadas a modelos.
+
+Cada modelo tiene su propio pool de hilos con un número fijo de workers y una
+cola máxima. Los endpoints async esperan el resultado sin bloquear el event
+loop. Cuando la cola está llena, o una tarea lleva esperando más de
+`queue_timeout` segundos, la petición se rechaza con 503 y `Retry-After` en
+lugar de dejar crecer la latencia sin límite.
+
+La cola es justa entre clientes (weighted fair queuing, con etiquetas de
+inicio como en start-time fair queuing): cada tarea recibe la etiqueta
+max(tiempo virtual, fin de la tarea anterior del mismo cliente) y se ejecuta
+primero la de etiqueta menor; cada tarea avanza el reloj de su cliente en
+1 / peso. Un cliente con 30 tareas en cola no retrasa a otro con 1: la suya
+sale en el siguiente hueco libre. Además, ningún cliente puede ocupar más de
+AGROMIND_TENANT_QUEUE_SHARE de la capacidad de un ejecutor (503 con
+reason=tenant_queue_full). El cliente y su peso los da model/rate_limit.py.
+
+Configuración por variables de entorno (valores por defecto entre paréntesis):
+    AGROMIND_HYDRO_WORKERS (2)  AGROMIND_HYDRO_QUEUE (32)
+    AGROMIND_SOIL_WORKERS (2)   AGROMIND_SOIL_QUEUE (32)
+    AGROMIND_IMAGE_WORKERS (1)  AGROMIND_IMAGE_QUEUE (8)
+    AGROMIND_QUEUE_TIMEOUT (10 segundos)
+    AGROMIND_TENANT_QUEUE_SHARE (0.5)
+"""
+import os
+import math
+import time
+import heapq
+import itertools
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from fastapi import HTTPException, status
+
+from model.metrics import REGISTRY, Counter, Gauge, Histogram
+
+
+EXECUTOR_INFLIGHT = REGISTRY.register(Gauge(
+    "agromind_executor_inflight", "Tareas en cola o en ejecución por ejecutor", ["executor"]))
+EXECUTOR_REJECTED = REGISTRY.register(Counter(
+    "agromind_executor_rejected_total",
+    "Tareas rechazadas por ejecutor (reason=queue_full|tenant_queue_full|queue_timeout)",
+    ["executor", "reason"]))
+EXECUTOR_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "agromind_executor_queue_wait_seconds", "Tiempo de espera en cola antes de ejecutar", ["executor"]))
+
+
+class ModelExecutor:
+    def __init__(self, name, max_workers, max_queue, queue_timeout=10.0, tenant_share=0.5):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Máximo de tareas (en cola o en ejecución) de un mismo cliente
+        self.max_per_tenant = max(1, int((max_workers + max_queue) * tenant_share))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"agromind-{name}")
+        self._lock = threading.Lock()
+        self._inflight = 0
+        # Cola justa: heap de (etiqueta de inicio, orden de llegada, tarea)
+        self._queue = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._tenant_finish = {}
+        self._tenant_inflight = {}
+        # Media móvil del tiempo de servicio, para estimar Retry-After
+        self._service_time = 0.05
+
+    @property
+    def inflight(self):
+        return self._inflight
+
+    def retry_after(self):
+        waves = math.ceil(max(self._inflight, 1) / self.max_workers)
+        return max(1, math.ceil(waves * self._service_time))
+
+    def _reject(self, reason):
+        EXECUTOR_REJECTED.inc(executor=self.name, reason=reason)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Servicio '{self.name}' saturado, reintenta más tarde.",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    def _enqueue(self, tenant, weight, task):
+        """Etiqueta y encola la tarea (con self._lock tomado)."""
+        if len(self._tenant_finish) > 4096:
+            # Olvidar clientes inactivos: su reloj ya quedó por detrás del virtual
+            self._tenant_finish = {t: f for t, f in self._tenant_finish.items()
+                                   if f > self._virtual_time or t in self._tenant_inflight}
+        start = max(self._virtual_time, self._tenant_finish.get(tenant, 0.0))
+        self._tenant_finish[tenant] = start + 1.0 / max(weight, 1e-3)
+        heapq.heappush(self._queue, (start, next(self._seq), task))
+
+    def _release(self, tenant):
+        with self._lock:
+            self._inflight -= 1
+            EXECUTOR_INFLIGHT.set(self._inflight, executor=self.name)
+            self._tenant_inflight[tenant] -= 1
+            if not self._tenant_inflight[tenant]:
+                del self._tenant_inflight[tenant]
+                # Un cliente sin tareas cuyo reloj ya alcanzó el virtual no necesita estado
+                if self._tenant_finish.get(tenant, 0.0) <= self._virtual_time:
+                    self._tenant_finish.pop(tenant, None)
+
+    def _run_next(self):
+        """
+        Cada envío al pool ejecuta la tarea con menor etiqueta de la cola, que
+        no tiene por qué ser la que hizo el envío: así el orden lo decide la
+        cola justa y no el FIFO del ThreadPoolExecutor.
+        """
+        with self._lock:
+            start, _, task = heapq.heappop(self._queue)
+            self._virtual_time = max(self._virtual_time, start)
+        future, ctx, enqueued_at, fn, args, kwargs, tenant = task
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(ctx.run(self._timed, enqueued_at, fn, *args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            self._release(tenant)
+
+    def _timed(self, enqueued_at, fn, *args, **kwargs):
+        waited = time.monotonic() - enqueued_at
+        EXECUTOR_QUEUE_WAIT.observe(waited, executor=self.name)
+        if waited > self.queue_timeout:
+            return _QueueTimeout
+
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+
+    async def run(self, fn, *args, tenant="anonymous", weight=1.0, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) en el pool del modelo y espera el resultado.
+        `tenant` y `weight` (keyword) sitúan la tarea en la cola justa.
+        """
+        future = Future()
+        # Copia del contexto: las etapas de metrics.stage siguen asociadas a la petición
+        task = (future, contextvars.copy_context(), time.monotonic(), fn, args, kwargs, tenant)
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_queue:
+                self._reject("queue_full")
+            if self._tenant_inflight.get(tenant, 0) >= self.max_per_tenant:
+                self._reject("tenant_queue_full")
+            self._inflight += 1
+            self._tenant_inflight[tenant] = self._tenant_inflight.get(tenant, 0) + 1
+            EXECUTOR_INFLIGHT.set(self._inflight, executor=self.name)
+            self._enqueue(tenant, weight, task)
+        self._pool.submit(self._run_next)
+
+        result = await asyncio.wrap_future(future)
+        if result is _QueueTimeout:
+            self._reject("queue_timeout")
+        return result
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+class _QueueTimeout:
+    """Marca de tarea descartada por esperar demasiado en cola."""
+
+
+def _from_env(name, workers, queue):
+    return ModelExecutor(
+        name,
+        max_workers=int(os.getenv(f"AGROMIND_{name.upper()}_WORKERS", workers)),
+        max_queue=int(os.getenv(f"AGROMIND_{name.upper()}_QUEUE", queue)),
+        queue_timeout=float(os.getenv("AGROMIND_QUEUE_TIMEOUT", 10.0)),
+        tenant_share=float(os.getenv("AGROMIND_TENANT_QUEUE_SHARE", 0.5)),
+    )
+
+
+HYDRO_EXECUTOR = _from_env("hydro", 2, 32)
+SOIL_EXECUTOR = _from_env("soil", 2, 32)
+IMAGE_EXECUTOR = _from_env("image", 1, 8)
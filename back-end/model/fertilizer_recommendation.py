@@ -1,52 +1,206 @@
-def recommend_fertilizer(crop, N_ai, P_ai, K_ai):
-    """
-    Estrategia de Fertilización Mixta (Versión Texto Plano Profesional).
-    Prioriza 15-15-15 y complementa con simples.
-    """
-    
-    rec = []
-    # Encabezado técnico
-    rec.append(f"CULTIVO: {crop.upper()}")
-    rec.append(f"Requerimiento Neto (kg/ha): N={N_ai:.1f}, P={P_ai:.1f}, K={K_ai:.1f}")
-    rec.append("") # Espacio en blanco
-    rec.append("PLAN DE FERTILIZACION SUGERIDO (Base 15-15-15):")
-
-    # --- PASO 1: Calcular la BASE usando TRIPLE 15 ---
-    limitante = min(N_ai, P_ai, K_ai)
-    qty_15 = 0
-    
-    if limitante > 0:
-        qty_15 = (limitante / 15) * 100
-        rec.append(f"- BASE: Aplicar {qty_15:.2f} kg/ha de Triple 15")
-        rec.append(f"  (Cubre {limitante:.1f} kg iniciales de N, P y K)")
-    
-    # Calcular remanentes
-    n_restante = N_ai - limitante
-    p_restante = P_ai - limitante
-    k_restante = K_ai - limitante
-
-    # --- PASO 2: Rellenar FÓSFORO (P) con DAP ---
-    qty_dap = 0
-    if p_restante > 1:
-        qty_dap = (p_restante / 46) * 100
-        rec.append(f"- REFUERZO P: Aplicar {qty_dap:.2f} kg/ha de DAP (18-46-0)")
-        # Descuento de N por aporte del DAP
-        aporte_n_dap = qty_dap * 0.18
-        n_restante = n_restante - aporte_n_dap
-
-    # --- PASO 3: Rellenar POTASIO (K) con KCl ---
-    if k_restante > 1:
-        qty_kcl = (k_restante / 60) * 100
-        rec.append(f"- REFUERZO K: Aplicar {qty_kcl:.2f} kg/ha de KCl (0-0-60)")
-
-    # --- PASO 4: Rellenar NITRÓGENO (N) con UREA ---
-    if n_restante > 1:
-        qty_urea = (n_restante / 46) * 100
-        rec.append(f"- REFUERZO N: Aplicar {qty_urea:.2f} kg/ha de Urea (46-0-0)")
-
-    rec.append("")
-    rec.append("NOTA TECNICA:")
-    rec.append("Aplicar Triple 15 y DAP a la siembra.")
-    rec.append("Aplicar Urea y KCl en etapa de desarrollo.")
-    
-    return "\n".join(rec)
\ No newline at end of file
+"""
+Plan de fertilización de suelo de mínimo costo.
+
+Un LP por campo (como HydroOptimizer para las sales): kg/ha de cada producto
+del catálogo que cubren el requerimiento neto de N, P y K con el menor costo,
+sin pasar de requerimiento * (1 + TOLERANCE) + ABS_TOLERANCE por nutriente.
+Cada restricción lleva una holgura penalizada, así que el LP siempre tiene
+solución: si el catálogo no puede cumplirla (p. ej. falta un nutriente o un
+producto compuesto obliga a pasarse), el plan sale marcado "relaxed".
+
+El catálogo por defecto son los productos del plan clásico (Triple 15, DAP,
+KCl y urea); AGROMIND_FERTILIZER_CATALOG apunta a un JSON con el mismo formato
+para usar precios y productos locales:
+
+    {"currency": "USD",
+     "products": {"Urea (46-0-0)": {"N": 46, "P": 0, "K": 0, "cost": 0.65,
+                                    "bag_kg": 50, "stage": "en etapa de desarrollo"}}}
+
+N, P y K en % del producto, cost por kg de producto. blend_batch resuelve
+miles de campos en un solo LP disperso diagonal por bloques (requerimientos
+repetidos se resuelven una vez), para planes de toda una cooperativa.
+"""
+import os
+import json
+import math
+
+import numpy as np
+
+
+NUTRIENTS = ("N", "P", "K")
+TOLERANCE = 0.15  # exceso relativo permitido por nutriente
+ABS_TOLERANCE = 2.0  # kg/ha de exceso siempre permitidos (requerimientos pequeños)
+BATCH_CHUNK = 2000  # campos por LP en blend_batch
+
+DEFAULT_CATALOG = {
+    "currency": "USD",
+    "products": {
+        "Triple 15 (15-15-15)": {"N": 15, "P": 15, "K": 15, "cost": 0.75, "bag_kg": 50, "stage": "a la siembra"},
+        "DAP (18-46-0)": {"N": 18, "P": 46, "K": 0, "cost": 0.85, "bag_kg": 50, "stage": "a la siembra"},
+        "KCl (0-0-60)": {"N": 0, "P": 0, "K": 60, "cost": 0.60, "bag_kg": 50, "stage": "en etapa de desarrollo"},
+        "Urea (46-0-0)": {"N": 46, "P": 0, "K": 0, "cost": 0.65, "bag_kg": 50, "stage": "en etapa de desarrollo"},
+    },
+}
+
+CATALOG_PATH = os.getenv("AGROMIND_FERTILIZER_CATALOG")
+
+
+def load_catalog(path=CATALOG_PATH):
+    if not path:
+        return DEFAULT_CATALOG
+    with open(path, encoding="utf-8") as f:
+        catalog = json.load(f)
+    for name, product in catalog["products"].items():
+        missing = {"cost", *NUTRIENTS} - set(product)
+        if missing:
+            raise ValueError(f"Producto '{name}' sin {sorted(missing)} en {path}")
+    return catalog
+
+
+class FertilizerBlender:
+    def __init__(self, catalog=None):
+        catalog = catalog or DEFAULT_CATALOG
+        self.currency = catalog.get("currency", "USD")
+        self.products = catalog["products"]
+        self.names = list(self.products)
+        # (3, n_productos): kg de nutriente por kg de producto
+        self.grades = np.array([[self.products[p][n] / 100 for p in self.names] for n in NUTRIENTS], dtype=float)
+        self.costs = np.array([self.products[p]["cost"] for p in self.names], dtype=float)
+
+        # Bloque de un campo: [G | -I 0; -G | 0 -I] [x; exceso; déficit] <= [tope; -req]
+        n_rows = 2 * len(NUTRIENTS)
+        self._block = np.hstack([np.vstack([self.grades, -self.grades]), -np.identity(n_rows)])
+        # Déficit mucho más caro que exceso: solo se falta si el catálogo no alcanza
+        penalty = 1e3 * max(self.costs.max() / max(self.grades.max(), 1e-9), 1.0)
+        self._c = np.concatenate([self.costs, np.full(len(NUTRIENTS), penalty), np.full(len(NUTRIENTS), 10 * penalty)])
+
+    def _bounds(self, requirements):
+        requirements = np.maximum(requirements, 0)
+        return np.hstack([requirements * (1 + TOLERANCE) + ABS_TOLERANCE, -requirements])
+
+    def _solve(self, requirements):
+        """(m, n_productos) kg/ha y (m,) máscara de planes relajados para m requerimientos (m, 3)."""
+        from scipy import sparse
+        from scipy.optimize import linprog
+
+        m = len(requirements)
+        n_vars = self._block.shape[1]
+        b = self._bounds(requirements)
+        res = linprog(
+            c=np.tile(self._c, m),
+            A_ub=sparse.kron(sparse.identity(m, format="csr"), sparse.csr_matrix(self._block), format="csr"),
+            b_ub=b.ravel(),
+            bounds=(0, None),
+            method="highs"
+        )
+        if not res.success:
+            raise RuntimeError(f"LP de fertilización sin solución: {res.message}")
+        solution = res.x.reshape(m, n_vars)
+        scale = np.maximum(1.0, np.abs(b).max(axis=1))
+        relaxed = solution[:, len(self.names):].max(axis=1) > 1e-7 * scale
+        return solution[:, :len(self.names)], relaxed
+
+    def blend(self, requirement, area_ha=1.0, crop=None):
+        """Plan de mínimo costo para un requerimiento {"N", "P", "K"} en kg/ha."""
+        return self.blend_batch([[requirement[n] for n in NUTRIENTS]], [area_ha], [crop])[0]
+
+    def blend_batch(self, requirements, areas=None, crops=None):
+        """
+        Planes para muchos campos. requirements: (n, 3) kg/ha de N, P, K;
+        areas: hectáreas por campo (por defecto 1); crops: nombre por campo.
+        """
+        requirements = np.asarray(requirements, dtype=float).reshape(-1, len(NUTRIENTS))
+        n = len(requirements)
+        if n == 0:
+            return []
+        areas = np.ones(n) if areas is None else np.asarray(areas, dtype=float)
+        crops = crops or [None] * n
+
+        # Requerimientos repetidos (al 0.01 kg/ha) se resuelven una sola vez
+        unique, inverse = np.unique(np.round(requirements, 2), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        quantities = np.empty((len(unique), len(self.names)))
+        relaxed = np.empty(len(unique), dtype=bool)
+        for lo in range(0, len(unique), BATCH_CHUNK):
+            quantities[lo:lo + BATCH_CHUNK], relaxed[lo:lo + BATCH_CHUNK] = self._solve(unique[lo:lo + BATCH_CHUNK])
+
+        return [self._plan(crops[i], unique[inverse[i]], quantities[inverse[i]], bool(relaxed[inverse[i]]), areas[i])
+                for i in range(n)]
+
+    def _plan(self, crop, requirement, quantities, relaxed, area_ha):
+        products = []
+        for name, kg_ha in zip(self.names, quantities):
+            if kg_ha <= 0.01:
+                continue
+            product = self.products[name]
+            kg_total = kg_ha * area_ha
+            bag_kg = product.get("bag_kg")
+            products.append({
+                "name": name,
+                "kg_per_ha": round(float(kg_ha), 2),
+                "kg_total": round(float(kg_total), 2),
+                "bags": math.ceil(kg_total / bag_kg - 1e-9) if bag_kg else None,
+                "cost": round(float(kg_total * product["cost"]), 2),
+                "stage": product.get("stage"),
+            })
+        supplied = self.grades @ quantities
+        cost_ha = float(self.costs @ quantities)
+        return {
+            "crop": crop,
+            "area_ha": float(area_ha),
+            "requirement": {n: round(float(v), 2) for n, v in zip(NUTRIENTS, requirement)},
+            "supplied": {n: round(float(v), 2) for n, v in zip(NUTRIENTS, supplied)},
+            "products": products,
+            "cost_per_ha": round(cost_ha, 2),
+            "cost_total": round(cost_ha * float(area_ha), 2),
+            "currency": self.currency,
+            "relaxed": relaxed,
+        }
+
+    def render(self, plan):
+        """Texto plano del plan (el de /predict y los avisos regionales)."""
+        req, sup = plan["requirement"], plan["supplied"]
+        rec = []
+        rec.append(f"CULTIVO: {(plan['crop'] or '').upper()}")
+        rec.append(f"Requerimiento Neto (kg/ha): N={req['N']:.1f}, P={req['P']:.1f}, K={req['K']:.1f}")
+        rec.append(f"Superficie: {plan['area_ha']:g} ha")
+        rec.append("")
+
+        if not plan["products"]:
+            rec.append("No se requiere fertilizacion adicional.")
+            return "\n".join(rec)
+
+        rec.append("PLAN DE FERTILIZACION SUGERIDO (minimo costo):")
+        for p in plan["products"]:
+            line = f"- Aplicar {p['kg_per_ha']:.2f} kg/ha de {p['name']}"
+            if plan["area_ha"] != 1:
+                line += f" ({p['kg_total']:.2f} kg en total)"
+            if p["bags"]:
+                line += f" -> {p['bags']} saco(s)"
+            rec.append(line)
+        rec.append(f"  (Aporta N={sup['N']:.1f}, P={sup['P']:.1f}, K={sup['K']:.1f} kg/ha)")
+        rec.append(f"Costo estimado: {plan['cost_per_ha']:.2f} {plan['currency']}/ha, "
+                   f"{plan['cost_total']:.2f} {plan['currency']} en total")
+        if plan["relaxed"]:
+            rec.append("AVISO: el catalogo no permite ajustarse al requerimiento; revisar los aportes.")
+
+        stages = {}
+        for p in plan["products"]:
+            if p["stage"]:
+                stages.setdefault(p["stage"], []).append(p["name"])
+        if stages:
+            rec.append("")
+            rec.append("NOTA TECNICA:")
+            for stage, names in stages.items():
+                rec.append(f"Aplicar {', '.join(names)} {stage}.")
+
+        return "\n".join(rec)
+
+
+# Catálogo de AGROMIND_FERTILIZER_CATALOG (o el de por defecto); scipy se importa al primer plan
+BLENDER = FertilizerBlender(load_catalog())
+
+
+def recommend_fertilizer(crop, N_ai, P_ai, K_ai, area_ha=1.0):
+    """Plan de mínimo costo en texto plano (ver FertilizerBlender.render)."""
+    return BLENDER.render(BLENDER.blend({"N": N_ai, "P": P_ai, "K": K_ai}, area_ha, crop))
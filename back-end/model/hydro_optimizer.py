@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.optimize import linprog
 
 class HydroOptimizer:
     def __init__(self):
@@ -26,12 +25,7 @@ class HydroOptimizer:
             }
         }
 
-    def calculate_recipe(self, targets, water_liters):
-        names = list(self.salts.keys())
-        n_vars = len(names)
-        costs = [self.salts[k]["cost"] for k in names]
-        tolerance = 0.10 
-
+    def _lp_constraints(self, names, targets, tolerance):
         A_ub = []
         b_ub = []
 
@@ -55,6 +49,19 @@ class HydroOptimizer:
         A_ub.append([-self.salts[s]["Mg"] for s in names])
         b_ub.append(-30)  
 
+        return A_ub, b_ub
+
+    def calculate_recipe(self, targets, water_liters):
+        # scipy se importa en la primera receta (o en el warmup), no al arrancar
+        from scipy.optimize import linprog
+
+        names = list(self.salts.keys())
+        n_vars = len(names)
+        costs = [self.salts[k]["cost"] for k in names]
+        tolerance = 0.10 
+
+        A_ub, b_ub = self._lp_constraints(names, targets, tolerance)
+
         bounds = [(0, None)] * n_vars
 
         # Resolver
@@ -71,6 +78,60 @@ class HydroOptimizer:
 
         return self._format_result(res.x, names, water_liters)
 
+    def calculate_recipes_batch(self, targets_list, water_liters_list):
+        """
+        Varias recetas con un solo linprog: las restricciones de cada receta
+        forman un bloque de una matriz dispersa diagonal por bloques, y como
+        los bloques son independientes el óptimo conjunto es el de cada receta.
+
+        Para que una receta inviable no haga inviable todo el lote, cada
+        restricción lleva una holgura con penalización muy alta: si la receta
+        es viable la holgura queda en 0 y la solución es la misma que la de
+        calculate_recipe; si no, la holgura es positiva y esa receta usa
+        _fallback_calculation, igual que en calculate_recipe.
+        """
+        from scipy import sparse
+        from scipy.optimize import linprog
+
+        m = len(targets_list)
+        if m == 0:
+            return []
+
+        names = list(self.salts.keys())
+        n_vars = len(names)
+        costs = [self.salts[k]["cost"] for k in names]
+        tolerance = 0.10
+
+        blocks = [self._lp_constraints(names, targets, tolerance) for targets in targets_list]
+        A = np.array(blocks[0][0], dtype=float)
+        n_rows = A.shape[0]
+
+        # Bloque por receta: [A | -I] x_s <= b, variables [sales..., holguras...]
+        block = sparse.hstack([sparse.csr_matrix(A), -sparse.identity(n_rows)], format="csr")
+        penalty = 1e4 * max(costs)
+        c = np.tile(np.concatenate([costs, np.full(n_rows, penalty)]), m)
+
+        res = linprog(
+            c=c,
+            A_ub=sparse.kron(sparse.identity(m, format="csr"), block, format="csr"),
+            b_ub=np.concatenate([np.array(b_ub, dtype=float) for _, b_ub in blocks]),
+            bounds=(0, None),
+            method="highs"
+        )
+        if not res.success:
+            return [self.calculate_recipe(t, w) for t, w in zip(targets_list, water_liters_list)]
+
+        solution = res.x.reshape(m, n_vars + n_rows)
+        recipes = []
+        for i in range(m):
+            quantities, slack = solution[i, :n_vars], solution[i, n_vars:]
+            b_scale = max(1.0, float(np.max(np.abs(blocks[i][1]))))
+            if np.max(slack) > 1e-7 * b_scale:
+                recipes.append(self._fallback_calculation(names, targets_list[i], water_liters_list[i]))
+            else:
+                recipes.append(self._format_result(quantities, names, water_liters_list[i]))
+        return recipes
+
     def _format_result(self, quantities, names, water_liters):
         recipe = []
         for i, gpl in enumerate(quantities):
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import random
 import os
@@ -58,85 +57,93 @@ cultivos_db = {
 }
 
 # --- 2. GENERADOR DE DATOS REALISTAS ---
+# Solo al ejecutar el script: importar cultivos_db (p. ej. /hydro-plan) no
+# debe regenerar ni sobrescribir data/hydro_dataset.csv.
 
-data = []
-num_muestras = 15000 # Más cultivos = necesitamos más datos
+def generar_dataset(num_muestras=15000):
+    import pandas as pd
 
-print(f"Generando {num_muestras} muestras para 15 tipos de cultivos...")
+    data = []
 
-for _ in range(num_muestras):
-    
-    # -- Selección --
-    cultivo_nombre = random.choice(list(cultivos_db.keys()))
-    info = cultivos_db[cultivo_nombre]
-    semana = random.randint(1, info['ciclo'])
-    
-    # -- Base NPK --
-    base_n, base_p, base_k = 0, 0, 0
-    for etapa in info['curva']:
-        if etapa['sem'][0] <= semana <= etapa['sem'][1]:
-            base_n, base_p, base_k = etapa['N'], etapa['P'], etapa['K']
-            break
-            
-    # -- Inputs Ambientales (Simulación de Sensores) --
-    # Temperatura: Rango 5°C a 40°C
-    temp = np.random.normal(24, 6)
-    temp = round(max(5.0, min(40.0, temp)), 2)
-    
-    # Humedad: Rango 10% a 100%
-    humedad = np.random.normal(60, 15)
-    humedad = round(max(10.0, min(100.0, humedad)), 2)
-    
-    # pH: AQUI ESTA TU CAMBIO. Rango amplio 3.5 a 9.0
-    # Usamos una distribución normal centrada en 6.0 pero con "colas" largas
-    # para simular usuarios con agua muy mala.
-    ph = np.random.normal(6.2, 0.8) 
-    ph = round(max(3.5, min(9.0, ph)), 2)
-
-    # -- Lógica Agronómica (Ajustes) --
-    factor = 1.0
-    
-    # Calor: Diluir nutrientes
-    if temp > 28.0: factor -= (temp - 28.0) * 0.03
-    # Frío: Concentrar ligeramente
-    elif temp < 15.0: factor += 0.05
-    
-    # Humedad Baja: Diluir para evitar quemadura por transpiración
-    if humedad < 40.0: factor -= 0.10
-    
-    # pH Extremo (NUEVO): Si el pH es terrible (>8 o <4.5), la absorción cae.
-    # La IA debería recomendar MENOS fertilizante porque la planta no puede comer bien,
-    # y así evitamos acumulación de sales (bloqueo de nutrientes).
-    if ph > 7.5 or ph < 5.0:
-        factor -= 0.15 # Penalización por bloqueo de nutrientes
-        
-    # Limites del factor
-    factor = max(0.4, min(1.3, factor))
-    
-    # -- Ruido y Cálculo Final --
-    ruido = np.random.normal(0, 5)
-    
-    n_final = round(max(0.0, (base_n * factor + ruido)), 2)
-    p_final = round(max(0.0, (base_p * factor + (ruido/2))), 2)
-    k_final = round(max(0.0, (base_k * factor + ruido)), 2)
-    
-    # -- EC (Conductividad) --
-    # Estimación: (PPMs Totales) / 700. Incluimos Ca+Mg+S estimando x1.35
-    ec_target = round(((n_final + p_final + k_final) * 1.35) / 700, 3)
-    
-    # Lavado de raíces (semana final) -> EC casi cero
-    if n_final < 10: ec_target = 0.4
+    print(f"Generando {num_muestras} muestras para 15 tipos de cultivos...")
+
+    for _ in range(num_muestras):
+
+        # -- Selección --
+        cultivo_nombre = random.choice(list(cultivos_db.keys()))
+        info = cultivos_db[cultivo_nombre]
+        semana = random.randint(1, info['ciclo'])
+
+        # -- Base NPK --
+        base_n, base_p, base_k = 0, 0, 0
+        for etapa in info['curva']:
+            if etapa['sem'][0] <= semana <= etapa['sem'][1]:
+                base_n, base_p, base_k = etapa['N'], etapa['P'], etapa['K']
+                break
+
+        # -- Inputs Ambientales (Simulación de Sensores) --
+        # Temperatura: Rango 5°C a 40°C
+        temp = np.random.normal(24, 6)
+        temp = round(max(5.0, min(40.0, temp)), 2)
+
+        # Humedad: Rango 10% a 100%
+        humedad = np.random.normal(60, 15)
+        humedad = round(max(10.0, min(100.0, humedad)), 2)
+
+        # pH: AQUI ESTA TU CAMBIO. Rango amplio 3.5 a 9.0
+        # Usamos una distribución normal centrada en 6.0 pero con "colas" largas
+        # para simular usuarios con agua muy mala.
+        ph = np.random.normal(6.2, 0.8) 
+        ph = round(max(3.5, min(9.0, ph)), 2)
+
+        # -- Lógica Agronómica (Ajustes) --
+        factor = 1.0
+
+        # Calor: Diluir nutrientes
+        if temp > 28.0: factor -= (temp - 28.0) * 0.03
+        # Frío: Concentrar ligeramente
+        elif temp < 15.0: factor += 0.05
+
+        # Humedad Baja: Diluir para evitar quemadura por transpiración
+        if humedad < 40.0: factor -= 0.10
+
+        # pH Extremo (NUEVO): Si el pH es terrible (>8 o <4.5), la absorción cae.
+        # La IA debería recomendar MENOS fertilizante porque la planta no puede comer bien,
+        # y así evitamos acumulación de sales (bloqueo de nutrientes).
+        if ph > 7.5 or ph < 5.0:
+            factor -= 0.15 # Penalización por bloqueo de nutrientes
+
+        # Limites del factor
+        factor = max(0.4, min(1.3, factor))
+
+        # -- Ruido y Cálculo Final --
+        ruido = np.random.normal(0, 5)
+
+        n_final = round(max(0.0, (base_n * factor + ruido)), 2)
+        p_final = round(max(0.0, (base_p * factor + (ruido/2))), 2)
+        k_final = round(max(0.0, (base_k * factor + ruido)), 2)
+
+        # -- EC (Conductividad) --
+        # Estimación: (PPMs Totales) / 700. Incluimos Ca+Mg+S estimando x1.35
+        ec_target = round(((n_final + p_final + k_final) * 1.35) / 700, 3)
+
+        # Lavado de raíces (semana final) -> EC casi cero
+        if n_final < 10: ec_target = 0.4
+
+        data.append([cultivo_nombre, semana, temp, humedad, ph, n_final, p_final, k_final, ec_target])
+
+    ruta_script = os.path.dirname(os.path.abspath(__file__))
+    ruta_salida = os.path.join(os.path.dirname(ruta_script), 'data', 'hydro_dataset.csv')
 
-    data.append([cultivo_nombre, semana, temp, humedad, ph, n_final, p_final, k_final, ec_target])
+    os.makedirs(os.path.dirname(ruta_salida), exist_ok=True)
 
-ruta_script = os.path.dirname(os.path.abspath(__file__))
-ruta_salida = os.path.join(os.path.dirname(ruta_script), 'data', 'hydro_dataset.csv')
+    # --- 3. GUARDAR ---
+    df = pd.DataFrame(data, columns=['Crop', 'Week', 'Temp_C', 'Humidity_RH', 'pH_Water', 'N_ppm', 'P_ppm', 'K_ppm', 'EC_Target'])
+    df.to_csv(ruta_salida, index=False)
 
-os.makedirs(os.path.dirname(ruta_salida), exist_ok=True)
+    print("Dataset generado con éxito.")
+    print(df.sample(5)) # Muestra 5 ejemplos aleatorios
 
-# --- 3. GUARDAR ---
-df = pd.DataFrame(data, columns=['Crop', 'Week', 'Temp_C', 'Humidity_RH', 'pH_Water', 'N_ppm', 'P_ppm', 'K_ppm', 'EC_Target'])
-df.to_csv(ruta_salida, index=False)
 
-print("Dataset generado con éxito.")
-print(df.sample(5)) # Muestra 5 ejemplos aleatorios
\ No newline at end of file
+if __name__ == "__main__":
+    generar_dataset()
@@ -0,0 +1,294 @@
+"""
+Barrido de hiperparámetros para los dos regresores (suelo e hidroponía).
+
+Reparte los ensayos en un pool de procesos de una sola máquina (CPU), limitando
+los hilos intra-op de TensorFlow de cada ensayo para no sobresuscribir los
+núcleos. Cada ensayo usa EarlyStopping y una regla de poda por mediana: si tras
+unas épocas su val_loss es peor que la mediana de los demás ensayos en la misma
+época, se detiene. El resultado es una tabla CSV con precisión (R2) frente a
+latencia de inferencia de cada candidato y la frontera de Pareto marcada.
+
+Uso (desde back-end/):
+    python -m model.hyperparameter_sweep --target normal --trials 16 --workers 4
+    python -m model.hyperparameter_sweep --target hydro --trials 12 --workers 3 --threads 2
+"""
+import os
+import csv
+import time
+import random
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+
+RESULTS_DIR = "sweep_results"
+
+# Espacios de búsqueda. Las tuplas de "units"/"dropout" describen capa a capa,
+# igual que los valores por defecto de cada build_model.
+SEARCH_SPACES = {
+    "normal": {
+        "units": [(256, 128, 64, 32), (128, 64, 32), (256, 128, 64), (64, 32)],
+        "dropout": [0.1, 0.2, 0.3],
+        "learning_rate": [3e-4, 1e-3, 3e-3],
+        "batch_size": [32, 64],
+    },
+    "hydro": {
+        "embedding_dim": [4, 8, 10, 16],
+        "num_units": [32, 64],
+        "units": [(128, 64, 32), (64, 32), (256, 128, 64)],
+        "dropout": [0.1, 0.2, 0.3],
+        "learning_rate": [3e-4, 1e-3, 3e-3],
+        "batch_size": [32, 64],
+    },
+}
+
+# La poda no actúa antes de esta época ni con menos ensayos de referencia
+PRUNE_WARMUP_EPOCHS = 5
+PRUNE_MIN_TRIALS = 3
+
+
+def sample_trials(space, n_trials, seed=42):
+    """Muestra n_trials combinaciones distintas del espacio (sin reemplazo)."""
+    keys = list(space.keys())
+    grid = list(itertools.product(*(space[k] for k in keys)))
+    rng = random.Random(seed)
+    rng.shuffle(grid)
+    return [dict(zip(keys, values)) for values in grid[:n_trials]]
+
+
+def load_split(target):
+    """Prepara los datos una sola vez en el proceso principal (sin guardar artefactos)."""
+    if target == "normal":
+        from model.preprocessing_data_normal import preprocess_data
+        X_train, X_test, y_train, y_test, _ = preprocess_data(save=False)
+        return {"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test}
+
+    from model.preprocessing_data_hydro import preprocess_data
+    X_num_train, X_num_test, X_cat_train, X_cat_test, y_train, y_test, num_classes = preprocess_data(save=False)
+    return {
+        "X_train": [X_num_train, X_cat_train],
+        "X_test": [X_num_test, X_cat_test],
+        "y_train": y_train,
+        "y_test": y_test,
+        "num_classes": num_classes,
+    }
+
+
+# ===== CÓDIGO QUE CORRE EN CADA PROCESO DEL POOL =====
+
+def _init_worker(threads):
+    # Debe ejecutarse antes de importar TensorFlow en el proceso hijo
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _build(target, params, data):
+    if target == "normal":
+        from model.perceptron_model_normal import build_model
+        return build_model(
+            data["X_train"].shape[1], data["y_train"].shape[1],
+            units=params["units"], dropout=params["dropout"],
+            learning_rate=params["learning_rate"]
+        )
+
+    from model.perceptron_model_hydro import build_model
+    return build_model(
+        data["X_train"][0].shape[1], data["num_classes"],
+        embedding_dim=params["embedding_dim"], num_units=params["num_units"],
+        units=params["units"], dropout=params["dropout"],
+        learning_rate=params["learning_rate"]
+    )
+
+
+def _median_pruning_callback(trial_id, shared_curves):
+    from tensorflow.keras.callbacks import Callback
+
+    class MedianPruning(Callback):
+        """Detiene el ensayo si su mejor val_loss es peor que la mediana del resto."""
+
+        def __init__(self):
+            super().__init__()
+            self.best_curve = []
+            self.pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            val_loss = float(logs["val_loss"])
+            best = min(val_loss, self.best_curve[-1]) if self.best_curve else val_loss
+            self.best_curve.append(best)
+            shared_curves[trial_id] = self.best_curve
+
+            if epoch < PRUNE_WARMUP_EPOCHS:
+                return
+
+            others = [
+                curve[epoch] for key, curve in shared_curves.items()
+                if key != trial_id and len(curve) > epoch
+            ]
+            if len(others) >= PRUNE_MIN_TRIALS and best > float(np.median(others)):
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return MedianPruning()
+
+
+def _measure_latency(model, sample, repeats=200):
+    """Latencia de una inferencia individual (llamada directa, sin model.predict)."""
+    for _ in range(10):
+        model(sample, training=False)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model(sample, training=False)
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings) * 1000), float(np.percentile(timings, 95) * 1000)
+
+
+def run_trial(trial_id, target, params, data, epochs, patience, shared_curves):
+    from sklearn.metrics import r2_score
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    start = time.perf_counter()
+    model = _build(target, params, data)
+
+    pruning = _median_pruning_callback(trial_id, shared_curves)
+    early_stop = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+
+    history = model.fit(
+        data["X_train"], data["y_train"],
+        validation_split=0.2,
+        epochs=epochs,
+        batch_size=params["batch_size"],
+        callbacks=[early_stop, pruning],
+        verbose=0
+    )
+
+    y_pred = model.predict(data["X_test"], verbose=0)
+    r2 = r2_score(data["y_test"], y_pred)
+    mae = float(np.mean(np.abs(data["y_test"] - y_pred)))
+
+    if target == "normal":
+        sample = data["X_test"][:1]
+    else:
+        sample = [data["X_test"][0][:1], data["X_test"][1][:1]]
+    latency_p50, latency_p95 = _measure_latency(model, sample)
+
+    return {
+        "trial": trial_id,
+        **{k: params[k] for k in sorted(params)},
+        "r2": round(float(r2), 5),
+        "mae_scaled": round(mae, 5),
+        "best_val_loss": round(float(min(history.history["val_loss"])), 6),
+        "epochs_run": len(history.history["val_loss"]),
+        "pruned": pruning.pruned_at is not None,
+        "params_count": int(model.count_params()),
+        "latency_ms_p50": round(latency_p50, 4),
+        "latency_ms_p95": round(latency_p95, 4),
+        "train_seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+# ===== ORQUESTACIÓN =====
+
+def mark_pareto(results):
+    """Marca los candidatos no dominados en (R2 máximo, latencia mínima)."""
+    for r in results:
+        r["pareto"] = not any(
+            o is not r
+            and o["r2"] >= r["r2"]
+            and o["latency_ms_p50"] <= r["latency_ms_p50"]
+            and (o["r2"] > r["r2"] or o["latency_ms_p50"] < r["latency_ms_p50"])
+            for o in results
+        )
+    return results
+
+
+def write_results(target, results):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{target}_{stamp}.csv")
+
+    fields = list(results[0].keys())
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(results)
+    return path
+
+
+def print_table(results):
+    print(f"\n{'trial':>5} {'r2':>8} {'lat p50 ms':>11} {'params':>8} {'epochs':>6} {'poda':>5} {'pareto':>6}  config")
+    for r in results:
+        config = {k: r[k] for k in r if k in SEARCH_SPACES["normal"] or k in SEARCH_SPACES["hydro"]}
+        print(f"{r['trial']:>5} {r['r2']:>8.4f} {r['latency_ms_p50']:>11.3f} {r['params_count']:>8} "
+              f"{r['epochs_run']:>6} {'sí' if r['pruned'] else 'no':>5} {'*' if r['pareto'] else '':>6}  {config}")
+
+
+def run_sweep(target, n_trials=16, workers=None, threads=1, epochs=100, patience=10, seed=42):
+    cpus = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, cpus // threads)
+    if workers * threads > cpus:
+        print(f"⚠️  {workers} procesos x {threads} hilos supera los {cpus} núcleos disponibles")
+
+    trials = sample_trials(SEARCH_SPACES[target], n_trials, seed=seed)
+    data = load_split(target)
+    print(f"Barrido '{target}': {len(trials)} ensayos, {workers} procesos x {threads} hilos")
+
+    # spawn: cada proceso arranca limpio y configura TensorFlow antes de importarlo
+    ctx = mp.get_context("spawn")
+    results = []
+    with ctx.Manager() as manager:
+        shared_curves = manager.dict()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = {
+                pool.submit(run_trial, i, target, params, data, epochs, patience, shared_curves): i
+                for i, params in enumerate(trials)
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Ensayo {futures[future]} falló: {e}")
+                    continue
+                results.append(result)
+                estado = "podado" if result["pruned"] else "completo"
+                print(f"  ensayo {result['trial']:>3} {estado:<9} r2={result['r2']:.4f} "
+                      f"lat={result['latency_ms_p50']:.3f} ms")
+
+    if not results:
+        print("Ningún ensayo terminó correctamente.")
+        return None, []
+
+    results.sort(key=lambda r: r["r2"], reverse=True)
+    mark_pareto(results)
+    path = write_results(target, results)
+    print_table(results)
+    print(f"\nResultados guardados en {path}")
+    return path, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de hiperparámetros de los regresores AgroMind")
+    parser.add_argument("--target", choices=sorted(SEARCH_SPACES), default="normal")
+    parser.add_argument("--trials", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto núcleos / hilos)")
+    parser.add_argument("--threads", type=int, default=1, help="Hilos intra-op de TensorFlow por ensayo")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--patience", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run_sweep(args.target, args.trials, args.workers, args.threads, args.epochs, args.patience, args.seed)
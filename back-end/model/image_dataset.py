@@ -0,0 +1,240 @@
+"""
+Dataset de imágenes para entrenar el clasificador de enfermedades.
+
+Decodifica una sola vez las imágenes de imagenes_entrenamiento/ (una carpeta
+por clase) a un tensor uint8 de N x 224 x 224 x 3 guardado como .npy
+memory-mapped, usando un pool de procesos. El caché se identifica por la lista
+de archivos con sus mtimes y tamaños: si nada cambió, los siguientes
+entrenamientos abren el .npy directamente y no decodifican ningún JPEG.
+
+Uso (desde back-end/):
+    python -m model.image_dataset              # construye o reutiliza el caché
+    python -m model.image_dataset --size 160
+
+    from model.image_dataset import build_store
+    store = build_store()
+    train_idx, val_idx = store.split(0.2)
+    for x, y in store.batches(train_idx, batch_size=32, augment=True):
+        ...
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+IMAGES_DIR = "imagenes_entrenamiento"
+CACHE_DIR = os.path.join("cache", "image_dataset")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CHUNK_SIZE = 256
+
+
+def list_images(root=IMAGES_DIR):
+    """Clases (carpetas en orden alfabético) y lista de (ruta relativa, etiqueta)."""
+    classes = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    files = []
+    for label, cls in enumerate(classes):
+        for name in sorted(os.listdir(os.path.join(root, cls))):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                files.append((os.path.join(cls, name), label))
+    return classes, files
+
+
+CACHE_FORMAT = 2  # 2: valid.npy marca las imágenes que no se pudieron decodificar
+
+
+def cache_key(root, files, size, interpolation):
+    digest = hashlib.sha1(f"{CACHE_FORMAT}|{size}|{interpolation}".encode())
+    for rel, label in files:
+        st = os.stat(os.path.join(root, rel))
+        digest.update(f"{rel}|{label}|{st.st_mtime_ns}|{st.st_size}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _decode_chunk(store_path, start, paths, size, interpolation):
+    # Se ejecuta en un proceso del pool: escribe su bloque directamente en el .npy
+    from PIL import Image
+
+    resample = getattr(Image, interpolation.upper())
+    images = np.load(store_path, mmap_mode="r+")
+    failed = []
+    for offset, path in enumerate(paths):
+        try:
+            with Image.open(path) as img:
+                img = img.convert("RGB")
+                if img.size != (size, size):
+                    img = img.resize((size, size), resample)
+                images[start + offset] = np.asarray(img, dtype=np.uint8)
+        except Exception as e:
+            failed.append((path, str(e)))
+    images.flush()
+    return failed
+
+
+class ImageStore:
+    """Imágenes uint8 memory-mapped más sus etiquetas."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.classes = self.meta["classes"]
+        self.images = np.load(os.path.join(path, "images.npy"), mmap_mode="r")
+        self.labels = np.load(os.path.join(path, "labels.npy"))
+        # Las imágenes que fallaron quedan a cero en images.npy: nunca se usan
+        self.valid = np.load(os.path.join(path, "valid.npy"))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def split(self, val_fraction=0.2, seed=42):
+        """Índices de entrenamiento y validación estratificados por clase."""
+        rng = np.random.default_rng(seed)
+        train, val = [], []
+        for label in range(len(self.classes)):
+            idx = np.flatnonzero((self.labels == label) & self.valid)
+            rng.shuffle(idx)
+            n_val = int(round(len(idx) * val_fraction))
+            val.append(idx[:n_val])
+            train.append(idx[n_val:])
+        return np.sort(np.concatenate(train)), np.sort(np.concatenate(val))
+
+    def batches(self, indices=None, batch_size=32, augment=False, shuffle=True, seed=None):
+        """
+        Genera (x, y) con x en float32 [0, 1] (igual que predict_disease) e y
+        enteros. Una pasada completa por los índices = una época.
+        """
+        indices = np.flatnonzero(self.valid) if indices is None else np.asarray(indices)
+        indices = indices[self.valid[indices]]
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(indices) if shuffle else indices
+
+        for start in range(0, len(order), batch_size):
+            # Leer en orden creciente aprovecha mejor el read-ahead del memmap
+            batch_idx = np.sort(order[start:start + batch_size])
+            x = self.images[batch_idx]
+            if augment:
+                x = augment_batch(x, rng)
+            yield x.astype(np.float32) / 255.0, self.labels[batch_idx]
+
+    def as_tf_dataset(self, indices=None, batch_size=32, augment=False, shuffle=True, seed=None):
+        """
+        tf.data.Dataset que recorre el caché (una época por iteración). Cada
+        época usa seed + época: otro orden y otras aumentaciones, reproducibles.
+        """
+        import tensorflow as tf
+
+        size = self.meta["size"]
+        epochs = itertools.count()
+
+        def epoch():
+            e = next(epochs)
+            return self.batches(indices, batch_size, augment, shuffle, None if seed is None else seed + e)
+
+        return tf.data.Dataset.from_generator(
+            epoch,
+            output_signature=(
+                tf.TensorSpec(shape=(None, size, size, 3), dtype=tf.float32),
+                tf.TensorSpec(shape=(None,), dtype=tf.int64),
+            ),
+        ).prefetch(2)
+
+
+def augment_batch(x, rng):
+    """Volteos y variaciones de brillo/contraste sobre un lote uint8 (N, H, W, 3)."""
+    x = x.copy()
+    n = len(x)
+
+    flip_lr = rng.random(n) < 0.5
+    x[flip_lr] = x[flip_lr, :, ::-1]
+    flip_ud = rng.random(n) < 0.5
+    x[flip_ud] = x[flip_ud, ::-1]
+
+    x = x.astype(np.float32)
+    brightness = rng.uniform(-20, 20, size=(n, 1, 1, 1))
+    contrast = rng.uniform(0.85, 1.15, size=(n, 1, 1, 1))
+    mean = x.mean(axis=(1, 2, 3), keepdims=True)
+    x = (x - mean) * contrast + mean + brightness
+    return np.clip(x, 0, 255).astype(np.uint8)
+
+
+def build_store(root=IMAGES_DIR, size=224, workers=None, cache_dir=CACHE_DIR, interpolation="nearest"):
+    """
+    Devuelve el ImageStore de `root`, decodificándolo solo si el caché no existe
+    o si cambió algún archivo. interpolation="nearest" reproduce el
+    preprocesado de la API (image.load_img).
+    """
+    classes, files = list_images(root)
+    if not files:
+        raise ValueError(f"No hay imágenes en {root}")
+
+    key = cache_key(root, files, size, interpolation)
+    final_dir = os.path.join(cache_dir, f"{size}px_{key}")
+    if os.path.exists(os.path.join(final_dir, "meta.json")):
+        return ImageStore(final_dir)
+
+    start_time = time.perf_counter()
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    store_path = os.path.join(tmp_dir, "images.npy")
+    images = np.lib.format.open_memmap(store_path, mode="w+", dtype=np.uint8, shape=(len(files), size, size, 3))
+    del images
+
+    paths = [os.path.join(root, rel) for rel, _ in files]
+    print(f"Decodificando {len(paths)} imágenes a {size}x{size}...")
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_decode_chunk, store_path, start, paths[start:start + CHUNK_SIZE], size, interpolation)
+            for start in range(0, len(paths), CHUNK_SIZE)
+        ]
+        for future in futures:
+            failed += future.result()
+
+    for path, error in failed:
+        print(f"⚠️  No se pudo decodificar {path}: {error}")
+
+    np.save(os.path.join(tmp_dir, "labels.npy"), np.array([label for _, label in files], dtype=np.int64))
+    failed_paths = {path for path, _ in failed}
+    np.save(os.path.join(tmp_dir, "valid.npy"), np.array([path not in failed_paths for path in paths]))
+    meta = {
+        "key": key,
+        "size": size,
+        "interpolation": interpolation,
+        "classes": classes,
+        "files": [rel for rel, _ in files],
+        "failed": [path for path, _ in failed],
+        "build_seconds": round(time.perf_counter() - start_time, 2),
+    }
+    # meta.json se escribe al final: su presencia marca el caché como completo
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    print(f"Caché creado en {final_dir} ({meta['build_seconds']} s)")
+    return ImageStore(final_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye el caché de imágenes de entrenamiento")
+    parser.add_argument("--root", default=IMAGES_DIR)
+    parser.add_argument("--size", type=int, default=224)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = build_store(args.root, args.size, args.workers)
+    counts = np.bincount(store.labels, minlength=len(store.classes))
+    print(f"{len(store)} imágenes, {store.images.nbytes / 1024 ** 2:.0f} MB, "
+          f"listo en {time.perf_counter() - start:.2f} s")
+    for cls, n in zip(store.classes, counts):
+        print(f"  {cls:<20} {n}")
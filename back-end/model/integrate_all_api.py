@@ -1,15 +1,19 @@
-import joblib
+import time
+_IMPORT_START = time.perf_counter()
+
 import numpy as np
-import pandas as pd
-import tensorflow as tf
 import os
+import io
 import sys
-import shutil
+import threading
+import math
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from tensorflow.keras.models import load_model
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Optional, List, Union
 
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'model'))
@@ -17,10 +21,22 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'model'))
 
 from model.weather_api import get_weather 
 from model.hydro_optimizer import HydroOptimizer
-from model.fertilizer_recommendation import recommend_fertilizer
-from model.plant_classifier import predict_disease 
+from model.fertilizer_recommendation import BLENDER
+from model import plant_classifier
+from model.plant_classifier import predict_disease, load_image_model
+from model import bundles
+from model import shadow
+from model import drift
+from model import climatology
+from model import surrogate as soil_surrogate
+from model.metrics import REGISTRY, Gauge, MetricsMiddleware, stage, record_model_call, record_error, record_cache
+from model.executors import HYDRO_EXECUTOR, SOIL_EXECUTOR, IMAGE_EXECUTOR
+from model.negotiation import NegotiatedResponse, NegotiationMiddleware, serialize
+from model.rate_limit import LIMITER, Client
 
-app = FastAPI(title="AgroMind IA Unificada")
+# Respuestas en JSON (orjson), MessagePack o CBOR según Accept; JSON comprimido
+# con br/gzip según Accept-Encoding (ver model/negotiation.py)
+app = FastAPI(title="AgroMind IA Unificada", default_response_class=NegotiatedResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,41 +44,331 @@ app.add_middleware(
     allow_credentials=False,  
     allow_methods=["*"],  
     allow_headers=["*"],  
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(NegotiationMiddleware)
 
-print("\n--- INICIANDO CARGA DE MODELOS ---")
+# TensorFlow, pandas, scikit-learn, joblib y scipy NO se importan aquí: importar
+# este módulo debe ser barato (ver benchmarks/startup.py). Se importan al cargar
+# artefactos y modelos, en el arranque de cada worker o en preload() (serve.py).
 
-try:
-    
-    hydro_model = load_model('training_models/hydro_model.keras')
-    scaler_num_hydro = joblib.load('Artifacts/scaler_num_hydro.joblib')
-    encoder_cat_hydro = joblib.load('Artifacts/label_encoder_hydro.joblib')
-    scaler_y_hydro = joblib.load('Artifacts/scaler_y_hydro.joblib')
-    optimizer = HydroOptimizer()
-    print("Sistema Hidropónico: LISTO")
+# Paquete activo de cada sistema (model/bundles.py): modelo + transformadores de
+# una versión. Los transformadores son objetos Python/numpy, se cargan antes de
+# fork() y se comparten copy-on-write entre workers (ver serve.py); los modelos
+# Keras/TFLite se cargan en cada worker al arrancar (TensorFlow no es seguro
+# ante fork()). Cada petición toma BUNDLES[sistema] una sola vez: recargar una
+# versión es reasignar esa referencia y las peticiones en curso terminan con la
+# anterior.
+BUNDLES = {"hydro": None, "soil": None, "image": None}
+optimizer = None
 
-except Exception as e:
-    print(f"Error cargando Hidroponía: {e}")
-    hydro_model = None
+# Estado de la última recarga en caliente por sistema (GET /admin/models)
+RELOADS = {}
+_reload_locks = {system: threading.Lock() for system in BUNDLES}
+# Última configuración CANDIDATE aplicada por sistema (en sombra/canario, model/shadow.py)
+CANDIDATE_STATUS = {}
+_candidate_lock = threading.Lock()
+BUNDLE_POLL_SECONDS = float(os.getenv("AGROMIND_BUNDLE_POLL_S", 10))
 
+# ===== ESTADO DE ARRANQUE =====
+# /health/live: el proceso responde. /health/ready: modelos cargados y calientes.
+STARTUP = {"status": "starting", "phases": {}, "error": None}
+_startup_lock = threading.Lock()
 
-try:
-    
-    preprocessor_X_normal = joblib.load("Artifacts/preprocessor_X.joblib")
-    scaler_y_normal = joblib.load("Artifacts/scaler_y.joblib")
-    model_normal = tf.keras.models.load_model(
-        "training_models/agromind_best.keras", 
-        custom_objects={'r2_keras': lambda y, p: y} 
-    )
-    
-    print("Sistema Suelo/Normal: LISTO")
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "agromind_startup_seconds", "Duración de cada fase del arranque (import|artifacts|models|warmup)", ["phase"]))
+BUNDLE_INFO = REGISTRY.register(Gauge(
+    "agromind_model_bundle_info", "Versión de paquete activa por sistema (1 = activa)", ["system", "version"]))
+
+
+def _record_phase(phase, seconds):
+    STARTUP["phases"][phase] = round(seconds, 3)
+    STARTUP_SECONDS.set(seconds, phase=phase)
+
+
+def preload():
+    """Importaciones pesadas y artefactos sin TensorFlow inicializado; seguro antes de fork()."""
+    import scipy.optimize  # noqa: F401
+    import tensorflow  # noqa: F401  (importar no arranca el runtime)
+    load_artifacts()
+    # Con artefactos .agma los transformadores no necesitan scikit-learn ni pandas
+    if any(type(part).__module__.startswith("sklearn")
+           for bundle in BUNDLES.values() if bundle for part in bundle.parts.values()):
+        import pandas  # noqa: F401
+        import sklearn  # noqa: F401
+
+
+def load_artifacts():
+    """Transformadores de las versiones activas y optimizador (sin TensorFlow)."""
+    global optimizer
+    start = time.perf_counter()
+
+    for system in ("hydro", "soil"):
+        version = bundles.current_version(system)
+        try:
+            manifest = bundles.verify(system, version)
+            BUNDLES[system] = bundles.ModelBundle(
+                system, version, manifest, bundles.load_parts(system, version, manifest))
+            if system == "soil":
+                BUNDLES[system].surrogate = soil_surrogate.load_for(version, manifest)
+        except Exception as e:
+            print(f"Error cargando artefactos de {system}@{version}: {e}")
+
+    try:
+        climatology.load()
+    except Exception as e:
+        print(f"Error cargando la climatología: {e}")
+
+    try:
+        drift.load_reference()
+    except Exception as e:
+        print(f"Error cargando la referencia de deriva: {e}")
+
+    try:
+        optimizer = HydroOptimizer()
+    except Exception as e:
+        print(f"Error cargando el optimizador de Hidroponía: {e}")
+    _record_phase("artifacts", time.perf_counter() - start)
+
+
+def _activate(bundle, previous=None):
+    BUNDLES[bundle.system] = bundle
+    if bundle.system == "image":
+        plant_classifier.model = bundle.model
+    if previous is not None and previous.version != bundle.version:
+        BUNDLE_INFO.set(0, system=bundle.system, version=previous.version)
+    BUNDLE_INFO.set(1, system=bundle.system, version=bundle.version)
+
+
+def _record_load_failure(system, version, error):
+    # El vigilante de CURRENT no reintenta una versión que ya falló
+    RELOADS[system] = {"status": "failed", "version": version, "error": str(error)}
+
+
+def load_models():
+    start = time.perf_counter()
+    print("\n--- INICIANDO CARGA DE MODELOS ---")
+
+    for system, label in (("hydro", "Sistema Hidropónico"), ("soil", "Sistema Suelo/Normal")):
+        bundle = BUNDLES[system]
+        try:
+            if bundle is None:
+                raise RuntimeError(f"artefactos de {system} no disponibles")
+            bundle.model = bundles.load_model(system, bundle.version, bundle.manifest)
+            _activate(bundle)
+            print(f"{label}: LISTO ({bundle.version})")
+        except Exception as e:
+            print(f"Error cargando {label}: {e}")
+            _record_load_failure(system, bundle.version if bundle else bundles.current_version(system), e)
+
+    version = bundles.current_version("image")
+    if version == bundles.LEGACY_VERSION:
+        if load_image_model() is not None:
+            _activate(bundles.ModelBundle("image", version, bundles.read_manifest("image", version), {},
+                                          plant_classifier.model))
+        else:
+            _record_load_failure("image", version, "modelo no disponible")
+    else:
+        try:
+            _activate(bundles.load_bundle("image", version))
+            print(f"✅ Modelo de imágenes cargado correctamente ({version}).")
+        except Exception as e:
+            print(f"❌ Error cargando el modelo de imágenes {version}: {e}")
+            _record_load_failure("image", version, e)
+    _record_phase("models", time.perf_counter() - start)
+
+
+# Entradas de ejemplo para calentar (y validar) un paquete si su manifiesto no trae "warmup"
+DEFAULT_WARMUP = {
+    "hydro": [{"crop": "lettuce", "temperature": 22.0, "humidity": 60.0, "ph_water": 6.0, "week": 3}],
+    "soil": [{"crop": "maize", "temperature": 25.0, "humidity": 60.0, "ph": 6.5, "rainfall": 50.0}],
+    "image": [{}],
+}
+
+
+def warmup_bundle(bundle):
+    """
+    Inferencia con las entradas de ejemplo del paquete: compila los grafos y
+    comprueba que la salida es finita antes de ponerlo en servicio.
+    """
+    if bundle.model is None:
+        return
+    samples = bundle.manifest.get("warmup") or DEFAULT_WARMUP[bundle.system]
+    if bundle.system == "hydro":
+        out = predict_hydro_batch(*(
+            [sample[key] for sample in samples]
+            for key in ("crop", "temperature", "humidity", "ph_water", "week")), bundle=bundle)
+    elif bundle.system == "soil":
+        out = predict_soil_batch(*(
+            [sample[key] for sample in samples]
+            for key in ("crop", "temperature", "humidity", "ph", "rainfall")), bundle=bundle)
+    else:
+        out = bundle.model.predict(np.zeros((len(samples), 224, 224, 3), dtype=np.float32), verbose=0)
+    if not np.all(np.isfinite(out)):
+        raise bundles.BundleError(f"{bundle.system}@{bundle.version}: salida no finita en el warmup")
+
+
+def warmup():
+    """Una inferencia de cada modelo: compila los grafos y calienta pandas/scipy."""
+    start = time.perf_counter()
+    for bundle in list(BUNDLES.values()):
+        if bundle is not None:
+            warmup_bundle(bundle)
+    if optimizer is not None:
+        optimizer.calculate_recipe(targets={"N": 150.0, "P": 50.0, "K": 200.0, "EC": 1.5}, water_liters=100)
+    _record_phase("warmup", time.perf_counter() - start)
+
+
+# ===== RECARGA EN CALIENTE =====
+
+def reload_bundle(system, version=None, activate=True):
+    """
+    Carga system@version, la calienta y la pone en servicio. Bloqueante: se
+    ejecuta en un hilo aparte (start_reload o el vigilante de CURRENT) mientras
+    la versión anterior sigue atendiendo. Con activate=True escribe CURRENT,
+    y los demás workers la cargan en su siguiente comprobación.
+    Devuelve False si ya había una recarga de ese sistema en marcha.
+    """
+    lock = _reload_locks[system]
+    if not lock.acquire(blocking=False):
+        return False
+    try:
+        version = version or bundles.current_version(system)
+        RELOADS[system] = {"status": "loading", "version": version}
+        start = time.perf_counter()
+        try:
+            bundle = bundles.load_bundle(system, version)
+            warmup_bundle(bundle)
+        except Exception as e:
+            print(f"❌ Recarga de {system}@{version} fallida: {e}")
+            RELOADS[system] = {"status": "failed", "version": version, "error": str(e)}
+            return True
+
+        previous = BUNDLES[system]
+        _activate(bundle, previous)
+        if activate:
+            bundles.set_current(system, version)
+            # Candidato promovido: deja de estar en sombra/canario en todos los workers
+            config = bundles.candidate_config(system) if system in shadow.CANDIDATES else None
+            if config and config.get("version") == version:
+                bundles.set_candidate(system, None)
+                apply_candidate(system, None)
+        RELOADS[system] = {
+            "status": "ready", "version": version,
+            "previous": previous.version if previous else None,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        print(f"🔄 {system}: {RELOADS[system]['previous']} -> {version}")
+        return True
+    finally:
+        lock.release()
+
+
+def start_reload(system, version=None, activate=True):
+    """Lanza reload_bundle en segundo plano. False si ya hay una en marcha."""
+    if _reload_locks[system].locked():
+        return False
+    threading.Thread(target=reload_bundle, args=(system, version, activate),
+                     name=f"agromind-reload-{system}", daemon=True).start()
+    return True
+
+
+def apply_candidate(system, config):
+    """
+    Pone en sombra/canario la versión de `config` (ver model/shadow.py) o
+    retira el candidato con config=None. Bloqueante: carga y calienta el
+    paquete en el hilo que llama, la versión activa sigue atendiendo.
+    """
+    with _candidate_lock:
+        if CANDIDATE_STATUS.get(system, {}).get("config") == config:
+            return
+        current = shadow.CANDIDATES[system]
+        try:
+            if config is None:
+                shadow.CANDIDATES[system] = None
+            elif current is not None and current.version == config["version"]:
+                current.configure(config.get("sample_rate", 0.0), config.get("canary_percent", 0.0))
+                current = None
+            else:
+                bundle = bundles.load_bundle(system, config["version"])
+                warmup_bundle(bundle)
+                predict = predict_hydro_batch if system == "hydro" else predict_soil_batch
+                shadow.CANDIDATES[system] = shadow.Shadow(
+                    bundle, predict, config.get("sample_rate", 0.0), config.get("canary_percent", 0.0))
+                print(f"🧪 {system}: candidato {config['version']} en sombra")
+            if current is not None:
+                current.stop()
+            CANDIDATE_STATUS[system] = {"status": "ready", "config": config}
+        except Exception as e:
+            # El vigilante no reintenta la misma configuración
+            print(f"❌ Candidato {system}@{config['version']} no disponible: {e}")
+            CANDIDATE_STATUS[system] = {"status": "failed", "config": config, "error": str(e)}
+
+
+def start_candidate(system, config):
+    threading.Thread(target=apply_candidate, args=(system, config),
+                     name=f"agromind-candidate-{system}", daemon=True).start()
 
-except Exception as e:
-    print(f"Error cargando Sistema Normal: {e}")
-    model_normal = None
 
+def _watch_bundles(interval):
+    """Recarga los sistemas cuya versión en CURRENT o CANDIDATE cambió (p. ej. desde otro worker)."""
+    while True:
+        time.sleep(interval)
+        for system in shadow.CANDIDATES:
+            apply_candidate(system, bundles.candidate_config(system))
+        for system, bundle in list(BUNDLES.items()):
+            version = bundles.current_version(system)
+            last = RELOADS.get(system, {})
+            if bundle is not None and bundle.version == version:
+                continue
+            if last.get("version") == version and last.get("status") in ("failed", "loading"):
+                continue
+            reload_bundle(system, version, activate=False)
 
 
+def warm_start():
+    """Carga artefactos (si faltan), modelos y warmup. Idempotente."""
+    with _startup_lock:
+        if STARTUP["status"] in ("ready", "failed"):
+            return
+        STARTUP["status"] = "loading"
+        start = time.perf_counter()
+        try:
+            if BUNDLES["hydro"] is None and BUNDLES["soil"] is None:
+                load_artifacts()
+            load_models()
+            warmup()
+            STARTUP["status"] = "ready"
+            for system in shadow.CANDIDATES:
+                config = bundles.candidate_config(system)
+                if config:
+                    start_candidate(system, config)
+            if BUNDLE_POLL_SECONDS > 0:
+                threading.Thread(target=_watch_bundles, args=(BUNDLE_POLL_SECONDS,),
+                                 name="agromind-bundle-watch", daemon=True).start()
+        except Exception as e:
+            print(f"❌ Error en el arranque: {e}")
+            STARTUP["status"] = "failed"
+            STARTUP["error"] = str(e)
+        _record_phase("total_ready", time.perf_counter() - start)
+
+
+@app.on_event("startup")
+def startup_load_models():
+    # Por defecto en segundo plano: el proceso acepta conexiones (live) mientras
+    # los modelos cargan y /health/ready indica cuándo puede recibir tráfico
+    if os.getenv("AGROMIND_BLOCKING_STARTUP", "0") == "1":
+        warm_start()
+    else:
+        threading.Thread(target=warm_start, name="agromind-warmup", daemon=True).start()
+
+
+def require_ready():
+    if STARTUP["status"] in ("starting", "loading"):
+        raise HTTPException(
+            status_code=503, detail="Modelos cargando, reintenta en unos segundos.", headers={"Retry-After": "5"})
+
 
 CROP_TRANSLATION = {
     "rúcula": "arugula",
@@ -90,6 +396,25 @@ CROP_TRANSLATION_NORMAL = {
     "limon": "orange", "algodon": "cotton", "coco": "coconut"
 }
 
+# Clima del modelo de suelo (model/climatology.py):
+#   live        solo OpenWeatherMap (lluvia de la última hora)
+#   blend       temperatura y humedad actuales + lluvia normal del mes
+#   climatology normales del mes, sin llamada de red
+# Sin datos de climatología para la celda se usa el clima actual.
+CLIMATE_MODE = os.getenv("AGROMIND_CLIMATE_MODE", "blend")
+DEFAULT_SOIL_WEATHER = {"temperature": 25.0, "humidity": 60.0, "rainfall": 50.0}
+
+
+def soil_weather(lat, lon):
+    normals = climatology.lookup(lat, lon) if CLIMATE_MODE != "live" else None
+    if normals is not None and CLIMATE_MODE == "climatology":
+        return {**normals, "source": "climatology"}
+    weather = get_weather(lat, lon) or dict(DEFAULT_SOIL_WEATHER)
+    if normals is not None:
+        weather = {**weather, "rainfall": normals["rainfall"], "rainfall_source": "climatology"}
+    return weather
+
+
 class UserInput(BaseModel):
     crop: str
     week: int
@@ -98,47 +423,196 @@ class UserInput(BaseModel):
     lat: float
     long: float
 
+class HydroPlanInput(BaseModel):
+    crop: str
+    tank_liters: float
+    ph_water: float
+    lat: float
+    long: float
+    weeks: Optional[int] = Field(None, ge=1, le=52)  # por defecto, el ciclo del cultivo
+
+
 class PredictionRequestNormal(BaseModel):
     crop: str
     ph: float
     latitud: float
     longitud: float
+    area_ha: float = Field(1.0, gt=0)  # superficie del campo (cantidades totales del plan)
+
+
+def _preprocess_soil(columns, bundle=None):
+    """El preprocesador .agma acepta el dict de columnas; el de scikit-learn necesita un DataFrame."""
+    preprocessor = (bundle or BUNDLES["soil"]).preprocessor
+    if getattr(preprocessor, "accepts_columns", False):
+        return preprocessor.transform(columns)
+    import pandas as pd
 
+    return preprocessor.transform(pd.DataFrame(columns))
 
-def prepare_input_normal(crop, temperature, humidity, ph, rainfall):
-    X_df = pd.DataFrame({
+
+def prepare_input_normal(crop, temperature, humidity, ph, rainfall, bundle=None):
+    return _preprocess_soil({
         "temperature": [temperature],
         "humidity": [humidity],
         "ph": [ph],
         "rainfall": [rainfall],
         "label": [crop]
-    })
-    return preprocessor_X_normal.transform(X_df)
+    }, bundle)
+
+
+# ===== INFERENCIA POR LOTES =====
+# Una sola llamada a cada modelo para n filas (trabajos batch: avisos regionales,
+# recetas programadas). Los argumentos son listas o arrays de igual longitud.
+# `bundle` permite usar una versión concreta (por defecto, la activa).
+
+# Filas por paso de predict en los lotes (Keras usa 32 por defecto: miles de
+# pasos para un barrido o la construcción del sustituto)
+PREDICT_BATCH = 4096
+
+def prepare_inputs_normal(crops, temperature, humidity, ph, rainfall, bundle=None):
+    return _preprocess_soil({
+        "temperature": np.asarray(temperature, dtype=float),
+        "humidity": np.asarray(humidity, dtype=float),
+        "ph": np.asarray(ph, dtype=float),
+        "rainfall": np.asarray(rainfall, dtype=float),
+        "label": list(crops)
+    }, bundle)
+
 
+def predict_soil_batch(crops, temperature, humidity, ph, rainfall, bundle=None):
+    """Array (n, 3) con N, P, K requeridos (kg/ha)."""
+    bundle = bundle or BUNDLES["soil"]
+    X = prepare_inputs_normal(crops, temperature, humidity, ph, rainfall, bundle=bundle)
+    y_scaled = bundle.model.predict(X, verbose=0, batch_size=PREDICT_BATCH)
+    record_model_call("soil", batch_size=len(X))
+    return bundle.scaler_y.inverse_transform(y_scaled)
+
+
+def hydro_crop_indices(crops, bundle=None):
+    # Cultivos desconocidos -> índice 0, igual que /generate-recipe
+    classes = {name: i for i, name in enumerate((bundle or BUNDLES["hydro"]).encoder.classes_)}
+    return np.array([classes.get(crop, 0) for crop in crops])
+
+
+def predict_hydro_batch(crops, temperature, humidity, ph_water, week, bundle=None):
+    """Array (n, 4) con N, P, K (ppm) y EC objetivo."""
+    bundle = bundle or BUNDLES["hydro"]
+    temperature = np.asarray(temperature, dtype=float)
+    humidity = np.asarray(humidity, dtype=float)
+    input_num = np.column_stack([
+        temperature, humidity, np.asarray(ph_water, dtype=float), np.asarray(week, dtype=float),
+        temperature * humidity,
+    ])
+    input_num_processed = bundle.scaler_num.transform(input_num)
+    pred_scaled = bundle.model.predict([input_num_processed, hydro_crop_indices(crops, bundle)], verbose=0,
+                                       batch_size=PREDICT_BATCH)
+    record_model_call("hydro", batch_size=len(input_num))
+    return bundle.scaler_y.inverse_transform(pred_scaled)
+
+
+@app.get("/health/live", include_in_schema=False)
+def health_live():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", include_in_schema=False)
+def health_ready():
+    body = {
+        "status": STARTUP["status"],
+        "phases_s": STARTUP["phases"],
+        "models": {
+            system: bundle is not None and bundle.model is not None for system, bundle in BUNDLES.items()
+        },
+        "versions": {system: bundle.version if bundle else None for system, bundle in BUNDLES.items()},
+    }
+    if STARTUP["error"]:
+        body["error"] = STARTUP["error"]
+    code = 200 if STARTUP["status"] == "ready" else 503
+    return JSONResponse(body, status_code=code)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+
+# Límite por cliente (usuario del JWT o IP) en las rutas de inferencia; el
+# cliente también ordena la cola justa de cada ejecutor (model/rate_limit.py)
+IMAGE_COST = 4  # la CNN ocupa su único worker mucho más que los otros modelos
 
 
 @app.post("/predict-image")
-async def predict_image_endpoint(file: UploadFile = File(...)):
+async def predict_image_endpoint(
+    file: UploadFile = File(...),
+    client: Client = Depends(LIMITER.limit("/predict-image", cost=IMAGE_COST))
+):
+    require_ready()
     try:
-        temp_filename = f"temp_{file.filename}"
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        
-        resultado = predict_disease(temp_filename)
-        
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
-        
-        return {"success": True, "data": resultado}
+        with stage("image_read"):
+            contents = await file.read()
+
+        # La CNN corre en su propio pool; el event loop sigue atendiendo otras rutas
+        bundle = BUNDLES["image"]
+        with stage("image_predict"):
+            resultado = await IMAGE_EXECUTOR.run(
+                predict_disease, io.BytesIO(contents), bundle.model if bundle else None,
+                tenant=client.key, weight=client.weight)
+        record_model_call("image", batch_size=1)
+
+        return {"success": True, "data": resultado, "model_version": bundle.version if bundle else None}
+    except HTTPException:
+        raise
     except Exception as e:
+        record_error("/predict-image", "exception")
         return {"success": False, "error": str(e)}
 
 
+def _hydro_targets(bundle, data, crop, temp, humidity):
+    """Escalado + modelo hidropónico + optimizador. Se ejecuta en HYDRO_EXECUTOR."""
+    climate_interaction = temp * humidity
+    input_num  = np.array([[temp, humidity, data.ph_water, data.week, climate_interaction]])
+
+    with stage("hydro_scaling"):
+        if bundle is not None:
+            input_num_processed = bundle.scaler_num.transform(input_num)
+        else:
+            input_num_processed = input_num
+        
+        # Nombre ya traducido (CROP_TRANSLATION), igual que /hydro-plan y los lotes
+        crop_idx = hydro_crop_indices([crop], bundle) if bundle is not None else np.array([0])
+
+    
+    if bundle is not None and bundle.model is not None:
+        with stage("hydro_predict"):
+            pred_scaled = bundle.model.predict([input_num_processed, crop_idx], verbose=0)
+            pred_real = bundle.scaler_y.inverse_transform(pred_scaled)[0]
+        record_model_call("hydro", batch_size=1)
+
+        n_req, p_req, k_req = pred_real[0], pred_real[1], pred_real[2]
+        ec_target = pred_real[3]
+    else:
+        n_req, p_req, k_req, ec_target = 999, 999, 999, 999.0
+
+    with stage("optimizer"):
+        recipe_items = optimizer.calculate_recipe(
+            targets={
+                "N": float(n_req),
+                "P": float(p_req),
+                "K": float(k_req),
+                "EC": float(ec_target)
+        },
+        water_liters=data.tank_liters)
+
+    return n_req, p_req, k_req, ec_target, recipe_items
+
+
 @app.post("/generate-recipe")
-def generate_recipe(data: UserInput):
+async def generate_recipe(data: UserInput, client: Client = Depends(LIMITER.limit("/generate-recipe"))):
+    require_ready()
 
-    weather_data = get_weather(data.lat, data.long)
+    with stage("weather"):
+        weather_data = await run_in_threadpool(get_weather, data.lat, data.long)
 
     if not weather_data:
         weather_data = {"temperature": 20.0, "humidity": 60.0}
@@ -149,37 +623,16 @@ def generate_recipe(data: UserInput):
     crop_input = data.crop.lower().strip()
     crop_model_name = CROP_TRANSLATION.get(crop_input, crop_input)
 
-    climate_interaction = temp * humidity
-    input_num  = np.array([[temp, humidity, data.ph_water, data.week, climate_interaction]])
-
-    if scaler_num_hydro:
-        input_num_processed = scaler_num_hydro.transform(input_num)
-    else:
-        input_num_processed = input_num
-    
-    try:
-        crop_idx = encoder_cat_hydro.transform([data.crop])
-    except:
-        crop_idx = np.array([0])
+    drift.observe("hydro", temp, humidity, data.ph_water, data.week, crop_model_name)
 
-    
-    if hydro_model:
-        pred_scaled = hydro_model.predict([input_num_processed, crop_idx], verbose=0)
-        pred_real = scaler_y_hydro.inverse_transform(pred_scaled)[0]
-
-        n_req, p_req, k_req = pred_real[0], pred_real[1], pred_real[2]
-        ec_target = pred_real[3]
-    else:
-        n_req, p_req, k_req, ec_target = 999, 999, 999, 999.0
-
-    recipe_items = optimizer.calculate_recipe(
-        targets={
-            "N": float(n_req),
-            "P": float(p_req),
-            "K": float(k_req),
-            "EC": float(ec_target)
-    },
-    water_liters=data.tank_liters)
+    # Versión fija para toda la petición aunque haya una recarga en curso
+    # (la candidata si el cliente está en el canario)
+    bundle, candidate = shadow.route("hydro", BUNDLES["hydro"], client.key)
+    n_req, p_req, k_req, ec_target, recipe_items = await HYDRO_EXECUTOR.run(
+        _hydro_targets, bundle, data, crop_model_name, temp, humidity, tenant=client.key, weight=client.weight)
+    if candidate is not None and bundle is not None and bundle.model is not None:
+        candidate.offer((crop_model_name, temp, humidity, data.ph_water, data.week),
+                        (n_req, p_req, k_req, ec_target))
 
     if recipe_items is None or len(recipe_items) == 0:
         raise HTTPException(status_code = 400, detail= "No se pudo calcular una mezcla viable.")
@@ -201,48 +654,372 @@ def generate_recipe(data: UserInput):
             "target_ec": float(ec_target)
         },
         "mix_A": [item for item in recipe_items if item['tank_type'] == 'A'],
-        "mix_B": [item for item in recipe_items if item['tank_type'] == 'B']
+        "mix_B": [item for item in recipe_items if item['tank_type'] == 'B'],
+        "model_version": bundle.version if bundle else None
     }
 
     return response
 
 
+# Un plan ocupa el ejecutor más que una receta (un LP con todas las semanas)
+PLAN_COST = 2
+
+
+def _salt_costs():
+    return {name: salt["cost"] for name, salt in optimizer.salts.items()}
+
+
+def _hydro_plan(bundle, crop, temp, humidity, ph_water, weeks, tank_liters):
+    """
+    Todas las semanas del ciclo con una llamada al modelo y un solo LP
+    (calculate_recipes_batch). Se ejecuta en HYDRO_EXECUTOR.
+    """
+    n = len(weeks)
+    with stage("hydro_predict"):
+        targets = predict_hydro_batch([crop] * n, [temp] * n, [humidity] * n, [ph_water] * n, weeks,
+                                      bundle=bundle)
+    targets_list = [{"N": float(t[0]), "P": float(t[1]), "K": float(t[2]), "EC": float(t[3])} for t in targets]
+    with stage("optimizer"):
+        recipes = optimizer.calculate_recipes_batch(targets_list, [tank_liters] * n)
+
+    # Coste en las unidades de HydroOptimizer.salts[...]["cost"] (por gramo)
+    costs = _salt_costs()
+    schedule, totals = [], {}
+    for week, target, recipe in zip(weeks, targets_list, recipes):
+        for item in recipe:
+            total = totals.setdefault(item["name"], {"name": item["name"], "grams_total": 0.0,
+                                                     "tank_type": item["tank_type"]})
+            total["grams_total"] += item["grams_total"]
+        schedule.append({
+            "week": week,
+            "target_ppm": {"N": target["N"], "P": target["P"], "K": target["K"]},
+            "target_ec": target["EC"],
+            "mix_A": [item for item in recipe if item["tank_type"] == "A"],
+            "mix_B": [item for item in recipe if item["tank_type"] == "B"],
+            "cost": round(sum(item["grams_total"] * costs[item["name"]] for item in recipe), 2),
+        })
+    for total in totals.values():
+        total["grams_total"] = round(total["grams_total"], 2)
+        total["cost"] = round(total["grams_total"] * costs[total["name"]], 2)
+    return schedule, list(totals.values())
+
+
+@app.post("/hydro-plan")
+async def hydro_plan(data: HydroPlanInput, client: Client = Depends(LIMITER.limit("/hydro-plan", cost=PLAN_COST))):
+    """
+    Plan del ciclo completo (una mezcla por semana, un tanque por semana):
+    clima una sola vez, una inferencia por lotes y un LP para todas las semanas.
+    """
+    require_ready()
+    from model.hydroponic_data import cultivos_db
+
+    crop_input = data.crop.lower().strip()
+    crop_model_name = CROP_TRANSLATION.get(crop_input, crop_input)
+    cycle = data.weeks or cultivos_db.get(crop_model_name, {}).get("ciclo")
+    if cycle is None:
+        raise HTTPException(status_code=400, detail=f"Ciclo desconocido para '{data.crop}': indica 'weeks'.")
+
+    bundle = BUNDLES["hydro"]
+    if bundle is None or bundle.model is None or optimizer is None:
+        raise HTTPException(status_code=500, detail="Modelo Hidropónico no cargado.")
+
+    with stage("weather"):
+        weather_data = await run_in_threadpool(get_weather, data.lat, data.long)
+    if not weather_data:
+        weather_data = {"temperature": 20.0, "humidity": 60.0}
+    temp, humidity = weather_data["temperature"], weather_data["humidity"]
+
+    schedule, totals = await HYDRO_EXECUTOR.run(
+        _hydro_plan, bundle, crop_model_name, temp, humidity, data.ph_water, list(range(1, cycle + 1)),
+        data.tank_liters, tenant=client.key, weight=client.weight)
+
+    return {
+        "status": "success",
+        "tank_info": {"volume": data.tank_liters, "crop": data.crop, "crop_model": crop_model_name},
+        "environment": {"temperature": temp, "humidity": humidity},
+        "cycle_weeks": cycle,
+        "schedule": schedule,
+        "totals": {"salts": totals, "cost": round(sum(t["cost"] for t in totals), 2)},
+        "model_version": bundle.version,
+    }
+
+
+def _soil_prediction(bundle, crop_model_name, weather_data, ph, area_ha=1.0):
+    """
+    Preprocesado + modelo de suelo + recomendación. Se ejecuta en SOIL_EXECUTOR.
+    Devuelve también qué calculó N, P, K: "surrogate" o "model".
+    """
+    inputs = (weather_data["temperature"], weather_data["humidity"], ph, weather_data.get("rainfall", 50.0))
+
+    # Sustituto tabulado (si está activado): sin TensorFlow dentro de la rejilla
+    y_pred = None
+    if bundle.surrogate is not None:
+        with stage("soil_surrogate"):
+            y_pred = bundle.surrogate.predict_one(crop_model_name, *inputs)
+        record_cache("soil_surrogate", hit=y_pred is not None)
+
+    engine = "surrogate"
+    if y_pred is None:
+        engine = "model"
+        with stage("soil_preprocess"):
+            X = prepare_input_normal(crop_model_name, *inputs, bundle=bundle)
+
+        with stage("soil_predict"):
+            y_scaled = bundle.model.predict(X, verbose=0)
+            y_pred = bundle.scaler_y.inverse_transform(y_scaled)[0]
+        record_model_call("soil", batch_size=len(X))
+    
+    N_val, P_val, K_val = float(y_pred[0]), float(y_pred[1]), float(y_pred[2])
+    with stage("recommendation"):
+        plan = BLENDER.blend({"N": N_val, "P": P_val, "K": K_val}, area_ha, crop_model_name)
+
+    return N_val, P_val, K_val, plan, engine
+
+
 @app.post("/predict")
-def predict_fertilizer(request: PredictionRequestNormal):
-    if not model_normal:
+async def predict_fertilizer(request: PredictionRequestNormal, client: Client = Depends(LIMITER.limit("/predict"))):
+    require_ready()
+    bundle, candidate = shadow.route("soil", BUNDLES["soil"], client.key)
+    if bundle is None or bundle.model is None:
         raise HTTPException(status_code=500, detail="Modelo Suelo no cargado.")
 
     try:
-        weather_data = get_weather(request.latitud, request.longitud)
-        if not weather_data: weather_data = {"temperature": 25.0, "humidity": 60.0, "rainfall": 50.0}
+        with stage("weather"):
+            weather_data = await run_in_threadpool(soil_weather, request.latitud, request.longitud)
         
         crop_input = request.crop.lower().strip()
         crop_model_name = CROP_TRANSLATION_NORMAL.get(crop_input, crop_input)
+        drift.observe("soil", weather_data["temperature"], weather_data["humidity"], request.ph,
+                      weather_data.get("rainfall", 50.0), crop_model_name)
 
-        X = prepare_input_normal(
-            crop=crop_model_name,
-            temperature=weather_data["temperature"],
-            humidity=weather_data["humidity"],
-            ph=request.ph,
-            rainfall=weather_data.get("rainfall", 50.0)
-        )
-        
-        y_scaled = model_normal.predict(X)
-        y_pred = scaler_y_normal.inverse_transform(y_scaled)[0]
-        
-        N_val, P_val, K_val = float(y_pred[0]), float(y_pred[1]), float(y_pred[2])
-        recomendacion_texto = recommend_fertilizer(crop_model_name, N_val, P_val, K_val)
+        N_val, P_val, K_val, plan, engine = await SOIL_EXECUTOR.run(
+            _soil_prediction, bundle, crop_model_name, weather_data, request.ph, request.area_ha,
+            tenant=client.key, weight=client.weight)
+        # La sombra compara red contra red: la salida del sustituto arrastra su error de interpolación
+        if candidate is not None and engine == "model":
+            candidate.offer((crop_model_name, weather_data["temperature"], weather_data["humidity"],
+                             request.ph, weather_data.get("rainfall", 50.0)), (N_val, P_val, K_val))
 
         return {
             "success": True,
             "nutrientes_requeridos": { "N": round(N_val, 2), "P": round(P_val, 2), "K": round(K_val, 2) },
             "datos_clima": weather_data,
-            "recomendacion": recomendacion_texto
+            "recomendacion": BLENDER.render(plan),
+            "plan_fertilizacion": plan,
+            "model_version": bundle.version
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+# ===== PLANES DE FERTILIZACIÓN POR LOTES =====
+# Requerimientos ya conocidos (p. ej. de /predict o /predict-sweep) de muchos
+# campos -> planes de mínimo costo en un solo LP (model/fertilizer_recommendation.py)
+
+BLEND_MAX_FIELDS = int(os.getenv("AGROMIND_BLEND_MAX_FIELDS", 10_000))
+BLEND_FIELDS_PER_TOKEN = 1_000
+
+
+class FieldRequirement(BaseModel):
+    crop: Optional[str] = None
+    N: float
+    P: float
+    K: float
+    area_ha: float = Field(1.0, gt=0)
+
+
+class BlendRequest(BaseModel):
+    fields: List[FieldRequirement]
+    include_text: bool = False
+
+
+def _blend_fields(fields, include_text):
+    plans = BLENDER.blend_batch([[f.N, f.P, f.K] for f in fields], [f.area_ha for f in fields],
+                                [f.crop for f in fields])
+    totals = {}
+    for plan in plans:
+        if include_text:
+            plan["recomendacion"] = BLENDER.render(plan)
+        for p in plan["products"]:
+            total = totals.setdefault(p["name"], {"name": p["name"], "kg_total": 0.0, "cost": 0.0})
+            total["kg_total"] += p["kg_total"]
+            total["cost"] += p["cost"]
+    for total in totals.values():
+        bag_kg = BLENDER.products[total["name"]].get("bag_kg")
+        total["bags"] = math.ceil(total["kg_total"] / bag_kg - 1e-9) if bag_kg else None
+        total["kg_total"] = round(total["kg_total"], 2)
+        total["cost"] = round(total["cost"], 2)
+    return plans, list(totals.values())
+
+
+@app.post("/fertilizer-blend")
+async def fertilizer_blend(request: BlendRequest, client: Client = Depends(LIMITER.limit("/fertilizer-blend"))):
+    """
+    Planes de fertilización de mínimo costo para muchos campos (p. ej. toda
+    una cooperativa) y el total a comprar por producto.
+    """
+    if not 1 <= len(request.fields) <= BLEND_MAX_FIELDS:
+        raise HTTPException(status_code=422, detail=f"Entre 1 y {BLEND_MAX_FIELDS} campos por petición.")
+    extra = -(-len(request.fields) // BLEND_FIELDS_PER_TOKEN) - 1
+    if extra > 0:
+        await LIMITER.acheck(client.key, extra, "/fertilizer-blend")
+
+    with stage("recommendation"):
+        plans, totals = await run_in_threadpool(_blend_fields, request.fields, request.include_text)
+    return {
+        "plans": plans,
+        "totals": {"products": totals, "cost": round(sum(t["cost"] for t in totals), 2),
+                   "area_ha": round(sum(f.area_ha for f in request.fields), 2), "currency": BLENDER.currency},
+    }
+
+
+# ===== BARRIDOS "QUÉ PASARÍA SI" (SUELO) =====
+# Producto cartesiano de pH x temperatura x humedad x lluvia para un cultivo,
+# evaluado por lotes (un preprocesado + una inferencia por bloque).
+
+SWEEP_MAX_POINTS = int(os.getenv("AGROMIND_SWEEP_MAX_POINTS", 200_000))
+SWEEP_STREAM_MIN = int(os.getenv("AGROMIND_SWEEP_STREAM_MIN", 20_000))  # a partir de aquí, NDJSON
+SWEEP_CHUNK = 16_384  # puntos por bloque en streaming
+SWEEP_POINTS_PER_TOKEN = 10_000  # fichas extra del limitador para barridos grandes
+SWEEP_ORDER = ("ph", "temperature", "humidity", "rainfall")
+
+
+class SweepRange(BaseModel):
+    """num valores equiespaciados de start a stop (ambos incluidos)"""
+    start: float
+    stop: float
+    num: int = Field(..., ge=1, le=1000)
+
+
+SweepAxis = Union[SweepRange, List[float]]
+
+
+class SweepRequest(BaseModel):
+    crop: str
+    ph: SweepAxis
+    # Sin eje: valor del clima de latitud/longitud (o el clima por defecto)
+    temperature: Optional[SweepAxis] = None
+    humidity: Optional[SweepAxis] = None
+    rainfall: Optional[SweepAxis] = None
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
+    stream: Optional[bool] = None  # por defecto, streaming a partir de SWEEP_STREAM_MIN puntos
+
+
+def _sweep_axis(name, axis, default):
+    if axis is None:
+        values = np.array([default], dtype=float)
+    elif isinstance(axis, SweepRange):
+        values = np.linspace(axis.start, axis.stop, axis.num)
+    else:
+        values = np.asarray(axis, dtype=float)
+    if not 1 <= len(values) <= 1000 or not np.all(np.isfinite(values)):
+        raise HTTPException(status_code=422, detail=f"Eje '{name}': entre 1 y 1000 valores finitos.")
+    return values
+
+
+def _sweep_block(bundle, crop, grid, lo, hi):
+    """N, P, K (kg/ha, 2 decimales) de los puntos lo:hi del producto cartesiano."""
+    ph, temperature, humidity, rainfall = (g[lo:hi] for g in grid)
+    crops = [crop] * (hi - lo)
+    if bundle.surrogate is not None:
+        # Sustituto tabulado donde la rejilla cubre el punto; la red solo para el resto
+        values, inside = bundle.surrogate.predict_batch(crops, temperature, humidity, ph, rainfall)
+        record_cache("soil_surrogate", hit=bool(inside.all()))
+        rows = np.flatnonzero(~inside)
+        if len(rows):
+            values[rows] = predict_soil_batch(crops[:len(rows)], temperature[rows], humidity[rows],
+                                              ph[rows], rainfall[rows], bundle=bundle)
+    else:
+        values = predict_soil_batch(crops, temperature, humidity, ph, rainfall, bundle=bundle)
+    return np.round(values.astype(float), 2)
+
+
+@app.post("/predict-sweep")
+async def predict_sweep(request: SweepRequest, http_request: Request,
+                        client: Client = Depends(LIMITER.limit("/predict-sweep"))):
+    """
+    Necesidades de N, P, K para cada combinación de los ejes. Respuesta
+    compacta: ejes + shape + values (n, 3) en orden C sobre
+    (ph, temperature, humidity, rainfall). Los barridos grandes (o con
+    Accept: application/x-ndjson) se envían en NDJSON: una línea de cabecera
+    y una por bloque {"offset", "values"}. Si el executor rechaza un bloque a
+    mitad de la respuesta, la última línea es {"error", "status", "offset",
+    "retry_after"}.
+    """
+    require_ready()
+    bundle = BUNDLES["soil"]
+    if bundle is None or bundle.model is None:
+        raise HTTPException(status_code=500, detail="Modelo Suelo no cargado.")
+
+    crop_input = request.crop.lower().strip()
+    crop_model_name = CROP_TRANSLATION_NORMAL.get(crop_input, crop_input)
+    if crop_model_name not in set(bundle.preprocessor.named_transformers_["cat"].categories_[0]):
+        raise HTTPException(status_code=400, detail=f"Cultivo desconocido: {request.crop}")
+
+    weather_data = DEFAULT_SOIL_WEATHER
+    if None in (request.temperature, request.humidity, request.rainfall) and request.latitud is not None \
+            and request.longitud is not None:
+        with stage("weather"):
+            weather_data = await run_in_threadpool(soil_weather, request.latitud, request.longitud)
+    axes = {
+        "ph": _sweep_axis("ph", request.ph, None),
+        **{name: _sweep_axis(name, getattr(request, name), weather_data.get(name, DEFAULT_SOIL_WEATHER[name]))
+           for name in SWEEP_ORDER[1:]},
+    }
+    shape = [len(axes[name]) for name in SWEEP_ORDER]
+    total = int(np.prod(shape))
+    if total > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=422,
+                            detail=f"Barrido de {total} puntos; el máximo es {SWEEP_MAX_POINTS}.")
+
+    # Fichas extra proporcionales al tamaño (la primera ya la cobró la dependencia)
+    extra = -(-total // SWEEP_POINTS_PER_TOKEN) - 1
+    if extra > 0:
+        await LIMITER.acheck(client.key, extra, "/predict-sweep")
+
+    grid = [g.ravel() for g in np.meshgrid(*(axes[name] for name in SWEEP_ORDER), indexing="ij")]
+    header = {"crop": request.crop, "crop_model": crop_model_name, "order": list(SWEEP_ORDER),
+              "axes": axes, "shape": shape, "outputs": ["N", "P", "K"], "points": total,
+              "model_version": bundle.version}
+
+    stream = request.stream
+    if stream is None:
+        stream = total >= SWEEP_STREAM_MIN or "application/x-ndjson" in http_request.headers.get("accept", "")
+    if not stream:
+        values = await SOIL_EXECUTOR.run(_sweep_block, bundle, crop_model_name, grid, 0, total,
+                                         tenant=client.key, weight=client.weight)
+        # Directo a la clase de respuesta: orjson serializa los arrays sin jsonable_encoder
+        return NegotiatedResponse({**header, "values": values})
+
+    # El primer bloque se calcula antes de responder: si el executor lo rechaza,
+    # el cliente recibe el 503 con Retry-After en lugar de un 200 vacío
+    first = await SOIL_EXECUTOR.run(_sweep_block, bundle, crop_model_name, grid, 0, min(SWEEP_CHUNK, total),
+                                    tenant=client.key, weight=client.weight)
+
+    async def lines():
+        yield serialize(header, "json") + b"\n"
+        yield serialize({"offset": 0, "values": first}, "json") + b"\n"
+        for lo in range(SWEEP_CHUNK, total, SWEEP_CHUNK):
+            hi = min(lo + SWEEP_CHUNK, total)
+            try:
+                values = await SOIL_EXECUTOR.run(_sweep_block, bundle, crop_model_name, grid, lo, hi,
+                                                 tenant=client.key, weight=client.weight)
+            except HTTPException as e:
+                # El 200 ya salió: el rechazo va como última línea y el cliente
+                # puede reanudar desde `offset`
+                yield serialize({"error": e.detail, "status": e.status_code, "offset": lo,
+                                 "retry_after": (e.headers or {}).get("Retry-After")}, "json") + b"\n"
+                return
+            yield serialize({"offset": lo, "values": values}, "json") + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+_record_phase("import", time.perf_counter() - _IMPORT_START)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
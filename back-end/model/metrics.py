@@ -0,0 +1,315 @@
+"""
+Métricas estilo Prometheus y trazas de latencia por etapa para la API.
+
+Registro en memoria sin dependencias externas: contadores, gauges e
+histogramas con buckets fijos, expuestos en formato de texto Prometheus por el
+endpoint /metrics. Observar un valor cuesta una búsqueda binaria y un lock,
+del orden de microsegundos.
+
+Uso en un endpoint:
+
+    with stage("hydro_predict"):
+        pred = hydro_model.predict(...)
+    record_model_call("hydro", batch_size=1)
+
+Si el cliente envía la cabecera `X-Timing: 1` (o AGROMIND_TIMING_HEADER=1),
+la respuesta incluye `Server-Timing` con el desglose de etapas de esa petición.
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+TIMING_HEADER_ALWAYS = os.getenv("AGROMIND_TIMING_HEADER", "0") == "1"
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def clear(self):
+        """Olvida todas las series (gauges recalculados en un collector)."""
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        return Counter.render(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [conteos por bucket (+Inf al final), suma, total]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            base = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base} {total!r}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """collector() se llama en cada render; sirve para gauges calculados al vuelo."""
+        self._collectors.append(collector)
+
+    def render(self):
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "agromind_request_seconds", "Latencia total por endpoint", ["endpoint", "method", "status"]))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "agromind_stage_seconds", "Latencia por etapa de inferencia", ["stage"]))
+MODEL_CALLS = REGISTRY.register(Counter(
+    "agromind_model_calls_total", "Llamadas a cada modelo", ["model"]))
+MODEL_BATCH_SIZE = REGISTRY.register(Histogram(
+    "agromind_model_batch_size", "Tamaño de lote por llamada a modelo", ["model"], buckets=SIZE_BUCKETS))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "agromind_cache_requests_total", "Consultas a cachés (result=hit|miss)", ["cache", "result"]))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "agromind_cache_hit_ratio", "Proporción de aciertos por caché", ["cache"]))
+ERRORS = REGISTRY.register(Counter(
+    "agromind_errors_total", "Errores por endpoint y tipo", ["endpoint", "kind"]))
+
+
+def _update_cache_ratios():
+    totals = {}
+    for (cache, result), value in list(CACHE_REQUESTS._values.items()):
+        hits, count = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (value if result == "hit" else 0), count + value)
+    for cache, (hits, count) in totals.items():
+        CACHE_HIT_RATIO.set(hits / count if count else 0.0, cache=cache)
+
+
+REGISTRY.add_collector(_update_cache_ratios)
+
+
+# ===== MEMORIA DEL PROCESO =====
+
+PROCESS_MEMORY = REGISTRY.register(Gauge(
+    "agromind_process_memory_bytes", "Memoria del worker (kind=rss|pss|shared|private)", ["kind"]))
+
+
+def process_memory(pid="self"):
+    """
+    RSS, PSS, memoria compartida y privada en bytes a partir de
+    /proc/<pid>/smaps_rollup (Linux). PSS reparte las páginas compartidas entre
+    los procesos que las usan: es la medida justa con workers pre-fork.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _update_process_memory():
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.set(value, kind=kind)
+
+
+REGISTRY.add_collector(_update_process_memory)
+
+
+# ===== TRAZAS POR PETICIÓN =====
+
+# Lista de (etapa, segundos) de la petición en curso; None fuera de una petición
+_request_timings = ContextVar("agromind_request_timings", default=None)
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def record_model_call(model, batch_size=1):
+    MODEL_CALLS.inc(model=model)
+    MODEL_BATCH_SIZE.observe(batch_size, model=model)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_error(endpoint, kind):
+    ERRORS.inc(endpoint=endpoint, kind=kind)
+
+
+def _route_label(scope):
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "unknown")
+    return "unmatched"
+
+
+def _server_timing(timings, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia por endpoint, errores y cabecera Server-Timing opcional."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = []
+        token = _request_timings.set(timings)
+        want_header = TIMING_HEADER_ALWAYS or (b"x-timing", b"1") in scope.get("headers", ())
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if want_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(timings, time.perf_counter() - start)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        error_kind = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            error_kind = "exception"
+            raise
+        finally:
+            _request_timings.reset(token)
+            endpoint = _route_label(scope)
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start, endpoint=endpoint, method=scope.get("method", ""), status=status_code
+            )
+            if error_kind is None and status_code >= 500:
+                error_kind = "5xx"
+            elif error_kind is None and status_code >= 400:
+                error_kind = "4xx"
+            if error_kind:
+                record_error(endpoint, error_kind)
@@ -0,0 +1,303 @@
+"""
+Exportación de variantes cuantizadas (y opcionalmente podadas) de los modelos
+de servicio: suelo (agromind_best.keras), hidroponía (hydro_model.keras) e
+imagen (detector_de_imagen.h5).
+
+Para cada modelo se generan en training_models/variants/:
+    <modelo>_float16.tflite      pesos en float16
+    <modelo>_int8.tflite         cuantización int8 calibrada con datos reales
+    <modelo>_pruned_int8.tflite  poda por magnitud + int8 (con --prune)
+
+La calibración usa filas de data/ (regresores) e imágenes de
+imagenes_entrenamiento/ (clasificador), distintas de las de evaluación. Al final
+se escribe variants/report.json con precisión, latencia y memoria de cada
+variante frente al modelo float32 original.
+
+Uso (desde back-end/):
+    python -m model.model_export
+    python -m model.model_export --models soil hydro --prune 0.5
+"""
+import os
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+import joblib
+
+from model.model_variants import VARIANTS_DIR, MODEL_NAMES, TFLiteModel, variant_path
+
+
+KERAS_PATHS = {
+    "soil": "training_models/agromind_best.keras",
+    "hydro": "training_models/hydro_model.keras",
+    "image": "training_models/detector_de_imagen.h5",
+}
+
+IMAGES_DIR = "imagenes_entrenamiento"
+IMAGE_SIZE = (224, 224)
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def load_keras_model(name):
+    from tensorflow.keras.models import load_model
+
+    # Sin compilar: solo se usa para inferencia (y así no hace falta r2_keras)
+    return load_model(KERAS_PATHS[name], compile=False)
+
+
+# ===== DATOS DE CALIBRACIÓN Y EVALUACIÓN =====
+# Cada función devuelve (calibracion, X_eval, y_eval, postproceso) donde
+# calibracion es una lista de entradas de una sola muestra.
+
+def _soil_data(n_calibration):
+    from sklearn.model_selection import train_test_split
+    from model.preprocessing_data_normal import load_data, clean_outliers, feature_engineering
+
+    df = feature_engineering(clean_outliers(load_data()))
+    preprocessor_X = joblib.load("Artifacts/preprocessor_X.joblib")
+    scaler_y = joblib.load("Artifacts/scaler_y.joblib")
+
+    X = preprocessor_X.transform(df[['temperature', 'humidity', 'ph', 'rainfall', 'label']]).astype(np.float32)
+    y = df[['N', 'P', 'K']].values
+    X_train, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    calibration = [[X_train[i:i + 1]] for i in range(min(n_calibration, len(X_train)))]
+    return calibration, [X_test], y_test, scaler_y.inverse_transform
+
+
+def _hydro_data(n_calibration):
+    from sklearn.model_selection import train_test_split
+    from model.preprocessing_data_hydro import load_data, clean_outliers, feature_engineering
+
+    df = feature_engineering(clean_outliers(load_data()))
+    scaler_num = joblib.load("Artifacts/scaler_num_hydro.joblib")
+    encoder_cat = joblib.load("Artifacts/label_encoder_hydro.joblib")
+    scaler_y = joblib.load("Artifacts/scaler_y_hydro.joblib")
+
+    X_num = scaler_num.transform(df[['Temp_C', 'Humidity_RH', 'pH_Water', 'Week', 'climate_interaction']].values)
+    X_cat = encoder_cat.transform(df['Crop'].values).reshape(-1, 1)
+    y = df[['N_ppm', 'P_ppm', 'K_ppm', 'EC_Target']].values
+
+    X_num_train, X_num_test, X_cat_train, X_cat_test, _, y_test = train_test_split(
+        X_num.astype(np.float32), X_cat.astype(np.float32), y, test_size=0.2, random_state=42
+    )
+
+    calibration = [
+        [X_num_train[i:i + 1], X_cat_train[i:i + 1]]
+        for i in range(min(n_calibration, len(X_num_train)))
+    ]
+    return calibration, [X_num_test, X_cat_test], y_test, scaler_y.inverse_transform
+
+
+def _load_image(path):
+    from tensorflow.keras.preprocessing import image
+
+    # Mismo preprocesado que plant_classifier.predict_disease
+    img = image.load_img(path, target_size=IMAGE_SIZE)
+    return image.img_to_array(img) / 255.0
+
+
+def _image_data(n_calibration, eval_per_class=40, seed=42):
+    rng = random.Random(seed)
+    classes = sorted(d for d in os.listdir(IMAGES_DIR) if os.path.isdir(os.path.join(IMAGES_DIR, d)))
+
+    calibration_files, eval_files, eval_labels = [], [], []
+    per_class_calibration = max(1, n_calibration // len(classes))
+    for idx, cls in enumerate(classes):
+        files = sorted(os.listdir(os.path.join(IMAGES_DIR, cls)))
+        rng.shuffle(files)
+        paths = [os.path.join(IMAGES_DIR, cls, f) for f in files]
+        eval_files += paths[:eval_per_class]
+        eval_labels += [idx] * len(paths[:eval_per_class])
+        calibration_files += paths[eval_per_class:eval_per_class + per_class_calibration]
+
+    calibration = [[_load_image(p)[None].astype(np.float32)] for p in calibration_files]
+    X_eval = np.stack([_load_image(p) for p in eval_files]).astype(np.float32)
+    return calibration, [X_eval], np.array(eval_labels), None
+
+
+DATASETS = {"soil": _soil_data, "hydro": _hydro_data, "image": _image_data}
+
+
+# ===== PODA Y CONVERSIÓN =====
+
+def magnitude_prune(model, sparsity):
+    """Copia del modelo con el `sparsity` de pesos de menor magnitud a cero en cada kernel."""
+    import tensorflow as tf
+
+    pruned = tf.keras.models.clone_model(model)
+    pruned.set_weights(model.get_weights())
+
+    for layer in pruned.layers:
+        if not hasattr(layer, "kernel"):
+            continue
+        weights = layer.get_weights()
+        kernel = weights[0]
+        threshold = np.quantile(np.abs(kernel), sparsity)
+        weights[0] = np.where(np.abs(kernel) < threshold, 0.0, kernel).astype(kernel.dtype)
+        layer.set_weights(weights)
+
+    return pruned
+
+
+def _input_names(model):
+    return [t.name.split(":")[0] for t in model.inputs]
+
+
+def convert(model, variant, calibration):
+    import tensorflow as tf
+
+    names = _input_names(model)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        # int8 con calibración; entradas y salidas se mantienen en float32
+        def representative_dataset():
+            for sample in calibration:
+                yield dict(zip(names, sample))
+        converter.representative_dataset = representative_dataset
+
+    return converter.convert(), names
+
+
+def save_variant(name, variant, content, input_names, source):
+    os.makedirs(VARIANTS_DIR, exist_ok=True)
+    path = variant_path(name, variant)
+    with open(path, "wb") as f:
+        f.write(content)
+    with open(path + ".json", "w") as f:
+        json.dump({"model": name, "variant": variant, "inputs": input_names, "source": source}, f, indent=2)
+    return path
+
+
+# ===== EVALUACIÓN =====
+
+def _score(name, y_pred, y_eval, postprocess):
+    if name == "image":
+        return {"accuracy": round(float(np.mean(np.argmax(y_pred, axis=1) == y_eval)), 4)}
+
+    mae = np.mean(np.abs(postprocess(y_pred) - y_eval), axis=0)
+    return {"mae": round(float(np.mean(mae)), 4), "mae_per_output": [round(float(v), 4) for v in mae]}
+
+
+def _latency_ms(predict, sample, repeats):
+    for _ in range(5):
+        predict(sample)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(sample)
+        timings.append(time.perf_counter() - start)
+    return round(float(np.median(timings) * 1000), 4)
+
+
+def evaluate(name, variant, loader, X_eval, y_eval, postprocess, size_bytes):
+    rss_before = _rss_mb()
+    model = loader()
+
+    if isinstance(model, TFLiteModel):
+        predict = lambda x: model.predict(x)
+    else:
+        # Llamada directa: mide el modelo y no la sobrecarga de model.predict
+        predict = lambda x: np.asarray(model(x if len(x) > 1 else x[0], training=False))
+
+    batch = 32
+    y_pred = np.concatenate([
+        predict([x[i:i + batch] for x in X_eval]) for i in range(0, len(X_eval[0]), batch)
+    ])
+    rss_after = _rss_mb()
+
+    sample = [x[:1] for x in X_eval]
+    repeats = 30 if name == "image" else 200
+    return {
+        "model": name,
+        "variant": variant,
+        **_score(name, y_pred, y_eval, postprocess),
+        "latency_ms_batch1": _latency_ms(predict, sample, repeats),
+        "size_kb": round(size_bytes / 1024, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1),
+    }
+
+
+def export_model(name, prune=None, n_calibration=200):
+    if not os.path.exists(KERAS_PATHS[name]):
+        print(f"⚠️  No se encuentra {KERAS_PATHS[name]}; se omite '{name}'.")
+        return []
+
+    print(f"\n=== {name} ===")
+    calibration, X_eval, y_eval, postprocess = DATASETS[name](n_calibration)
+
+    import tensorflow as tf
+    tf.constant(0.0)  # Inicializa el runtime antes de medir memoria
+
+    results = [evaluate(
+        name, "float32", lambda: load_keras_model(name), X_eval, y_eval, postprocess,
+        os.path.getsize(KERAS_PATHS[name])
+    )]
+
+    model = load_keras_model(name)
+    candidates = [("float16", model), ("int8", model)]
+    if prune:
+        candidates.append(("pruned_int8", magnitude_prune(model, prune)))
+
+    for variant, source_model in candidates:
+        content, input_names = convert(source_model, variant, calibration)
+        source = {"keras": KERAS_PATHS[name], "pruning": prune if variant.startswith("pruned") else None}
+        path = save_variant(name, variant, content, input_names, source)
+        print(f"  {variant:<12} -> {path}")
+        results.append(evaluate(
+            name, variant, lambda p=path: TFLiteModel(p), X_eval, y_eval, postprocess, len(content)
+        ))
+
+    return results
+
+
+def print_report(results):
+    print(f"\n{'modelo':<7} {'variante':<12} {'métrica':>16} {'lat ms (b=1)':>13} {'tamaño KB':>10} {'ΔRSS MB':>8}")
+    for r in results:
+        metric = f"acc={r['accuracy']:.4f}" if "accuracy" in r else f"mae={r['mae']:.3f}"
+        print(f"{r['model']:<7} {r['variant']:<12} {metric:>16} {r['latency_ms_batch1']:>13.3f} "
+              f"{r['size_kb']:>10.1f} {r['rss_delta_mb']:>8.1f}")
+
+
+def run_export(models=MODEL_NAMES, prune=None, n_calibration=200):
+    results = []
+    for name in models:
+        results += export_model(name, prune=prune, n_calibration=n_calibration)
+
+    if not results:
+        return None
+
+    os.makedirs(VARIANTS_DIR, exist_ok=True)
+    report_path = os.path.join(VARIANTS_DIR, "report.json")
+    with open(report_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_report(results)
+    print(f"\nReporte guardado en {report_path}")
+    return report_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta variantes cuantizadas/podadas de los modelos AgroMind")
+    parser.add_argument("--models", nargs="+", choices=MODEL_NAMES, default=list(MODEL_NAMES))
+    parser.add_argument("--prune", type=float, default=None, help="Fracción de pesos a podar por kernel (p. ej. 0.5)")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    args = parser.parse_args()
+
+    run_export(args.models, prune=args.prune, n_calibration=args.calibration_samples)
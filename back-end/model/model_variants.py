@@ -0,0 +1,108 @@
+"""
+Selección de la variante de servicio de cada modelo (float32, float16, int8...).
+
+Las variantes cuantizadas las genera model/model_export.py en
+training_models/variants/<modelo>_<variante>.tflite. La API elige la variante
+por modelo con variables de entorno:
+
+    AGROMIND_SOIL_VARIANT=int8
+    AGROMIND_HYDRO_VARIANT=float16
+    AGROMIND_IMAGE_VARIANT=pruned_int8
+
+Si la variable no está definida (o vale float32) se usa el modelo Keras original.
+"""
+import os
+import json
+import threading
+
+import numpy as np
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VARIANTS_DIR = os.path.join(BASE_DIR, "..", "training_models", "variants")
+
+MODEL_NAMES = ("soil", "hydro", "image")
+
+
+def variant_path(name, variant):
+    return os.path.join(VARIANTS_DIR, f"{name}_{variant}.tflite")
+
+
+def selected_variant(name):
+    return os.getenv(f"AGROMIND_{name.upper()}_VARIANT", "float32").strip().lower()
+
+
+def _tflite_interpreter(**kwargs):
+    # LiteRT es el intérprete recomendado desde TF 2.20; tf.lite sigue funcionando
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(**kwargs)
+
+
+class TFLiteModel:
+    """
+    Envoltorio de un modelo .tflite con la misma interfaz que usa la API
+    sobre los modelos Keras: predict(inputs, verbose=0) -> np.ndarray.
+    """
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.variant = os.path.basename(path).rsplit(".", 1)[0]
+
+        meta_path = path + ".json"
+        self.meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+
+        self.interpreter = _tflite_interpreter(model_path=path, num_threads=num_threads)
+        self.runner = self.interpreter.get_signature_runner()
+        signature = self.interpreter.get_signature_list()["serving_default"]
+
+        # Orden de entradas igual al del modelo Keras (guardado al exportar)
+        self.input_names = self.meta.get("inputs") or sorted(signature["inputs"])
+        self.output_name = signature["outputs"][0]
+        self.input_shapes = {
+            name: tuple(details["shape_signature"][1:])
+            for name, details in self.runner.get_input_details().items()
+        }
+
+        # El intérprete no es seguro entre hilos
+        self._lock = threading.Lock()
+
+    def predict(self, inputs, verbose=0, batch_size=None):
+        if not isinstance(inputs, (list, tuple)):
+            inputs = [inputs]
+
+        # Keras acepta p. ej. índices de cultivo con forma (n,); TFLite exige (n, 1)
+        feed = {
+            name: np.asarray(value, dtype=np.float32).reshape((-1,) + self.input_shapes[name])
+            for name, value in zip(self.input_names, inputs)
+        }
+        with self._lock:
+            outputs = self.runner(**feed)
+        return outputs[self.output_name]
+
+    def __repr__(self):
+        return f"<TFLiteModel {self.variant}>"
+
+
+def load_serving_model(name, keras_loader, num_threads=None):
+    """
+    Devuelve el modelo que debe servir la API para `name`.
+    keras_loader es una función sin argumentos que carga el modelo float32.
+    """
+    variant = selected_variant(name)
+    if variant in ("", "float32", "keras"):
+        return keras_loader()
+
+    path = variant_path(name, variant)
+    if not os.path.exists(path):
+        print(f"⚠️  Variante '{variant}' de '{name}' no encontrada en {path}; usando float32.")
+        return keras_loader()
+
+    print(f"Modelo '{name}': usando variante {variant}")
+    return TFLiteModel(path, num_threads=num_threads)
@@ -0,0 +1,212 @@
+"""
+Negociación de formato de respuesta para clientes móviles.
+
+La app usa este módulo como `default_response_class`, así que cualquier ruta
+que devuelva un dict o un modelo Pydantic pasa por aquí:
+
+  - Accept: application/msgpack (o application/x-msgpack) -> MessagePack
+  - Accept: application/cbor                              -> CBOR
+  - cualquier otro                                        -> JSON (orjson)
+  - Accept-Encoding: br / gzip -> cuerpo comprimido si ocupa más de
+    COMPRESS_MIN_BYTES, en cualquier formato: en los historiales los nombres
+    de campo se repiten en cada fila y MessagePack/CBOR sin comprimir apenas
+    ahorran un 10 % frente a JSON (ver benchmarks/payload_bench.py)
+
+orjson, msgpack, cbor2 y brotli son opcionales: si falta alguno, ese formato
+no se ofrece y se responde con el siguiente disponible (json de la librería
+estándar y gzip siempre están).
+
+Por endpoint y formato se registran los bytes enviados y el tiempo de
+serialización + compresión (agromind_response_bytes,
+agromind_serialization_seconds en /metrics).
+"""
+import os
+import gzip
+import json
+import time
+from contextvars import ContextVar
+
+from starlette.responses import Response
+
+from model.metrics import REGISTRY, Histogram, LATENCY_BUCKETS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("AGROMIND_COMPRESS_MIN_BYTES", 512))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+BYTES_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576)
+
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "agromind_response_bytes", "Bytes del cuerpo enviado por endpoint, formato y compresión",
+    ["endpoint", "format", "encoding"], buckets=BYTES_BUCKETS))
+SERIALIZATION_SECONDS = REGISTRY.register(Histogram(
+    "agromind_serialization_seconds", "Tiempo de serialización + compresión de la respuesta",
+    ["endpoint", "format"], buckets=LATENCY_BUCKETS))
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "cbor": "application/cbor",
+}
+
+_ACCEPT_ALIASES = {
+    "application/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/cbor": "cbor",
+}
+
+# Scope ASGI de la petición en curso (lo fija NegotiationMiddleware)
+_current_scope = ContextVar("agromind_negotiation_scope", default=None)
+
+
+def available_formats():
+    formats = ["json"]
+    if msgpack is not None:
+        formats.append("msgpack")
+    if cbor2 is not None:
+        formats.append("cbor")
+    return formats
+
+
+def _parse_header(value):
+    """[(token, q)] de una cabecera Accept / Accept-Encoding, de mayor a menor q."""
+    items = []
+    for order, part in enumerate(value.split(",")):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, val = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        if token:
+            items.append((token.lower(), q, order))
+    items.sort(key=lambda item: (-item[1], item[2]))
+    return [(token, q) for token, q, _ in items]
+
+
+def choose_format(accept):
+    available = available_formats()
+    for token, q in _parse_header(accept):
+        fmt = _ACCEPT_ALIASES.get(token)
+        if q > 0 and fmt in available:
+            return fmt
+    return "json"
+
+
+def choose_encoding(accept_encoding):
+    for token, q in _parse_header(accept_encoding):
+        if q <= 0:
+            continue
+        if token == "br" and brotli is not None:
+            return "br"
+        if token == "gzip":
+            return "gzip"
+    return "identity"
+
+
+def _json_default(obj):
+    # numpy (escalares y arrays) cuando no hay orjson
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def serialize(content, fmt):
+    if fmt == "msgpack":
+        return msgpack.packb(content, use_bin_type=True, default=_json_default)
+    if fmt == "cbor":
+        return cbor2.dumps(content, default=lambda encoder, obj: encoder.encode(_json_default(obj)))
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def _endpoint_label(scope):
+    if scope is None:
+        return "unknown"
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class NegotiatedResponse(Response):
+    """Respuesta por defecto de la API: formato según Accept, compresión según Accept-Encoding."""
+
+    media_type = "application/json"
+
+    def __init__(self, content=None, status_code=200, headers=None, media_type=None, background=None):
+        scope = _current_scope.get()
+        request_headers = dict(scope.get("headers", ())) if scope is not None else {}
+        fmt = choose_format(request_headers.get(b"accept", b"").decode("latin-1"))
+
+        start = time.perf_counter()
+        body = serialize(content, fmt)
+        encoding = "identity"
+        if len(body) >= COMPRESS_MIN_BYTES:
+            encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+            body = compress(body, encoding)
+        elapsed = time.perf_counter() - start
+
+        endpoint = _endpoint_label(scope)
+        SERIALIZATION_SECONDS.observe(elapsed, endpoint=endpoint, format=fmt)
+        RESPONSE_BYTES.observe(len(body), endpoint=endpoint, format=fmt, encoding=encoding)
+
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept, Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        super().__init__(body, status_code, headers, media_type or MEDIA_TYPES[fmt], background)
+
+    def render(self, content):
+        # El cuerpo llega ya serializado desde __init__
+        return content if isinstance(content, bytes) else super().render(content)
+
+
+class NegotiationMiddleware:
+    """Middleware ASGI: deja el scope de la petición al alcance de NegotiatedResponse."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
@@ -8,10 +8,13 @@ from tensorflow.keras import layers, models, optimizers, callbacks
 from model.preprocessing_data_hydro import preprocess_data
 from sklearn.metrics import r2_score
 
-def build_model(num_features_dim, num_classes, embedding_dim=0):
+def build_model(num_features_dim, num_classes, embedding_dim=0, num_units=64,
+                units=(128, 64, 32), dropout=(0.3, 0.2), learning_rate=0.001):
+    if isinstance(dropout, (int, float)):
+        dropout = [dropout] * (len(units) - 1)
     
     input_num = layers.Input(shape=(num_features_dim, ), name="input_numerico")
-    x1 = layers.Dense(64, activation='relu')(input_num)
+    x1 = layers.Dense(num_units, activation='relu')(input_num)
     x1 = layers.BatchNormalization()(x1)
 
     
@@ -21,18 +24,17 @@ def build_model(num_features_dim, num_classes, embedding_dim=0):
 
     merged = layers.Concatenate()([x1, x2])
 
-    dense = layers.Dense(128, activation='relu')(merged)
-    dense = layers.Dropout(0.3)(dense)
+    dense = merged
+    for i, width in enumerate(units[:-1]):
+        dense = layers.Dense(width, activation='relu')(dense)
+        dense = layers.Dropout(dropout[i])(dense)
 
-    dense = layers.Dense(64, activation='relu')(dense)
-    dense = layers.Dropout(0.2)(dense)
-
-    dense = layers.Dense(32, activation='relu')(dense)
+    dense = layers.Dense(units[-1], activation='relu')(dense)
 
     output = layers.Dense(4, activation='linear', name='output_nutrientes')(dense)
 
     model = models.Model(inputs=[input_num, input_cat], outputs=output)
-    optimizer = optimizers.Adam(learning_rate=0.001)
+    optimizer = optimizers.Adam(learning_rate=learning_rate)
 
     model.compile(optimizer=optimizer, loss='mse', metrics=['mae'])
 
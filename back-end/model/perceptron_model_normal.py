@@ -6,7 +6,7 @@ import numpy as np
 
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, BatchNormalization, Activation
+from tensorflow.keras.layers import Input, Dense, Dropout, BatchNormalization, Activation
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 from model.preprocessing_data_normal import preprocess_data
@@ -31,34 +31,29 @@ def r2_keras(y_true, y_pred):
     return (1 - SS_res / (SS_tot + tf.keras.backend.epsilon()))
 
 #Se definen las capas que vamos a tener en nuestra red neuronal Perceptron Multicapa
-def build_model(input_dim, output_dim):
-    model = Sequential()
-
-    #Capa 1
-    model.add(Dense(256, input_shape=(input_dim,)))
-    model.add(BatchNormalization())
-    model.add(Activation('swish'))
-    model.add(Dropout(0.3))
+#Los valores por defecto son los del modelo en producción (agromind_best.keras);
+#el barrido de hiperparámetros (model/hyperparameter_sweep.py) los varía.
+def build_model(input_dim, output_dim, units=(256, 128, 64, 32), dropout=(0.3, 0.3, 0.2), learning_rate=0.001):
+    if isinstance(dropout, (int, float)):
+        dropout = [dropout] * (len(units) - 1)
 
-    #Capa 2
-    model.add(Dense(128))
-    model.add(BatchNormalization())
-    model.add(Activation('swish'))
-    model.add(Dropout(0.3))
+    model = Sequential()
+    model.add(Input(shape=(input_dim,)))
 
-    #Capa 3
-    model.add(Dense(64))
-    model.add(BatchNormalization())
-    model.add(Activation('swish'))
-    model.add(Dropout(0.2))
+    #Capas ocultas: Dense + BatchNormalization + swish + Dropout
+    for i, width in enumerate(units[:-1]):
+        model.add(Dense(width))
+        model.add(BatchNormalization())
+        model.add(Activation('swish'))
+        model.add(Dropout(dropout[i]))
 
-    #Capa 4
-    model.add(Dense(32))
+    #Última capa oculta sin normalización ni dropout
+    model.add(Dense(units[-1]))
     model.add(Activation('swish'))
 
     model.add(Dense(output_dim, activation='sigmoid'))
 
-    optimizer = Adam(learning_rate=0.001)
+    optimizer = Adam(learning_rate=learning_rate)
 
     model.compile(
         optimizer=optimizer,
@@ -1,8 +1,8 @@
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import os
 
+from model.model_variants import load_serving_model
+
 # --- 1. CONFIGURACIÓN DE RUTAS ---
 # Obtenemos la ruta absoluta de donde está ESTE archivo script
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -12,20 +12,25 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Luego entramos a 'training_models'
 MODEL_PATH = os.path.join(BASE_DIR, "..", "training_models", "detector_de_imagen.h5")
 
-print(f"📷 Buscando modelo de visión en: {MODEL_PATH}")
-
 model = None
 
 # --- 2. CARGA DEL MODELO ---
-try:
-    if os.path.exists(MODEL_PATH):
-        model = load_model(MODEL_PATH)
-        print("✅ Modelo de imágenes cargado correctamente.")
-    else:
-        print(f"❌ Error CRÍTICO: No se encuentra el archivo en {MODEL_PATH}")
-        print("   -> Verifica que moviste 'detector_de_imagen.h5' a la carpeta 'training_models'.")
-except Exception as e:
-    print(f"❌ Error cargando el modelo de imágenes: {e}")
+# Se llama al arrancar cada worker (no al importar): TensorFlow no es seguro ante fork()
+def load_image_model():
+    global model
+    from tensorflow.keras.models import load_model
+
+    print(f"📷 Buscando modelo de visión en: {MODEL_PATH}")
+    try:
+        if os.path.exists(MODEL_PATH):
+            model = load_serving_model("image", lambda: load_model(MODEL_PATH))
+            print("✅ Modelo de imágenes cargado correctamente.")
+        else:
+            print(f"❌ Error CRÍTICO: No se encuentra el archivo en {MODEL_PATH}")
+            print("   -> Verifica que moviste 'detector_de_imagen.h5' a la carpeta 'training_models'.")
+    except Exception as e:
+        print(f"❌ Error cargando el modelo de imágenes: {e}")
+    return model
 
 # --- 3. DICCIONARIO DE CLASES ---
 # Asegúrate de que este orden coincida con cómo entrenaste tu modelo
@@ -39,9 +44,13 @@ class_names = {
 }
 
 # --- 4. FUNCIÓN DE PREDICCIÓN ---
-def predict_disease(image_path):
-    if model is None:
+def predict_disease(image_path, classifier=None):
+    # image_path puede ser una ruta o un objeto tipo archivo (io.BytesIO)
+    # classifier: versión concreta (la API pasa la de su paquete activo); por defecto, `model`
+    classifier = classifier if classifier is not None else model
+    if classifier is None:
         return {"error": "El modelo de imágenes no está cargado. Revisa la consola del servidor."}
+    from tensorflow.keras.preprocessing import image
 
     try:
         # AQUI ESTABA EL ERROR ANTERIOR:
@@ -54,7 +63,7 @@ def predict_disease(image_path):
         img_array /= 255.0  # Normalizar píxeles entre 0 y 1
 
         # Realizar la predicción
-        predictions = model.predict(img_array)
+        predictions = classifier.predict(img_array, verbose=0)
         predicted_class_idx = np.argmax(predictions)
         
         # Obtener confianza (probabilidad más alta)
@@ -64,17 +64,23 @@ def save_artifacts(scaler_num, encoder_cat, scaler_y):
     joblib.dump(scaler_num, 'Artifacts/scaler_num_hydro.joblib')
     joblib.dump(encoder_cat, 'Artifacts/label_encoder_hydro.joblib')
     joblib.dump(scaler_y, 'Artifacts/scaler_y_hydro.joblib')
+    # Copia mapeable en memoria que usa la API (model/array_artifacts.py)
+    from model.array_artifacts import convert
+    convert("hydro", "legacy")
     print("Artefactos guardados exitosamente")
 
 
-def preprocess_data(test_size=0.2, random_state=42):
+def preprocess_data(test_size=0.2, random_state=42, save=True):
     df = load_data()
     df_clean = clean_outliers(df)
     df_final = feature_engineering(df_clean)
     
     X_num, X_cat, y, scaler_num, encoder_cat, scaler_y = fit_transform_data(df_final)
 
-    save_artifacts(scaler_num, encoder_cat, scaler_y)
+    # save=False permite reutilizar el preprocesado (p. ej. en el barrido de
+    # hiperparámetros) sin sobrescribir los artefactos que usa la API.
+    if save:
+        save_artifacts(scaler_num, encoder_cat, scaler_y)
 
     X_num_train, X_num_test, X_cat_train, X_cat_test, y_train, y_test = train_test_split(
         X_num, X_cat, y, 
@@ -77,17 +77,23 @@ def save_artifacts(preprocessor_X, scaler_y, categories):
     joblib.dump(preprocessor_X, 'Artifacts/preprocessor_X.joblib')
     joblib.dump(scaler_y, 'Artifacts/scaler_y.joblib')
     joblib.dump(categories, 'Artifacts/categories.joblib')
+    # Copia mapeable en memoria que usa la API (model/array_artifacts.py)
+    from model.array_artifacts import convert
+    convert("soil", "legacy")
     print("Artefactos guardados exitosamente")
 
 
-def preprocess_data(test_size=0.2, random_state=42):
+def preprocess_data(test_size=0.2, random_state=42, save=True):
     df = load_data()
     df_clean = clean_outliers(df)
     df_final = feature_engineering(df_clean)
     
     X_processed, y_processed, preprocessor_X, scaler_y, categories = fit_transform_data(df_final)
 
-    save_artifacts(preprocessor_X, scaler_y, categories)
+    # save=False permite reutilizar el preprocesado (p. ej. en el barrido de
+    # hiperparámetros) sin sobrescribir los artefactos que usa la API.
+    if save:
+        save_artifacts(preprocessor_X, scaler_y, categories)
 
     X_train, X_test, y_train, y_test = train_test_split(
         X_processed, y_processed, 
@@ -0,0 +1,396 @@
+"""
+Plan de compra de fertilizantes para todos los cultivos activos (un usuario o una región).
+
+Cada plan de /predict se optimiza solo, pero la compra se hace a granel para
+todos los campos. Aquí se plantea un único MILP disperso (HiGHS, scipy.milp):
+
+  - Por campo de suelo, kg/ha de cada producto del catálogo de
+    model/fertilizer_recommendation.py con las mismas restricciones que
+    FertilizerBlender (requerimiento de la última predicción del cultivo,
+    tolerancia y holguras penalizadas).
+  - Lo aplicado en todos los campos sale del inventario compartido o de la compra.
+  - Compra por producto en sacos enteros (bag_kg) y con precios por volumen:
+    en el catálogo, "tiers": [{"min_kg": 1000, "cost": 0.70}, ...]; el precio
+    del tramo alcanzado se aplica a toda la cantidad comprada.
+
+Los campos con el mismo requerimiento por hectárea se agrupan en una sola
+clase con la suma de sus áreas (las restricciones son lineales en el área, así
+que el óptimo es el mismo): miles de campos con pocos cultivos distintos dan un
+modelo pequeño. scipy.milp no admite soluciones iniciales, así que se parte de
+la relajación LP y se resuelve la compra con las dosis fijas (_fix_and_solve).
+Como referencia se calcula el costo de planificar cada campo por separado
+(BLENDER.blend_batch, sacos por campo, precio base, sin inventario) y se
+devuelve el ahorro.
+
+Los cultivos hidropónicos no entran en el MILP (sus sales ya vienen fijadas por
+la receta): se suma la receta más reciente por las semanas que quedan de ciclo
+(un tanque por semana, como /hydro-plan).
+
+Uso (desde back-end/):
+    python -m model.procurement --user-id 3
+    python -m model.procurement --bbox -1.5 -79.5 0.5 -77.5 --inventory inventario.json --area-unit m2
+"""
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from database.models import Crop, Prediction, HydroRecipe
+from model.fertilizer_recommendation import BLENDER, NUTRIENTS
+
+
+TIME_LIMIT_S = 30.0
+MIP_REL_GAP = 1e-4
+REFINE_ROUNDS = 2
+AREA_FACTORS = {"ha": 1.0, "m2": 1e-4}  # Crop.area -> hectáreas
+
+
+# ===== NECESIDADES DE LOS CULTIVOS =====
+
+def active_crops(db, user_id):
+    return db.query(Crop).filter(Crop.user_id == user_id, Crop.status == "active").all()
+
+
+def _latest_predictions(db, crop_ids):
+    latest = {}
+    if not crop_ids:
+        return latest
+    rows = (db.query(Prediction.crop_id, Prediction.nitrogen, Prediction.phosphorus, Prediction.potassium)
+            .filter(Prediction.crop_id.in_(crop_ids))
+            .order_by(Prediction.created_at.desc()).all())
+    for crop_id, n, p, k in rows:
+        latest.setdefault(crop_id, (n, p, k))
+    return latest
+
+
+def _latest_recipes(db, crop_ids):
+    latest = {}
+    if not crop_ids:
+        return latest
+    rows = (db.query(HydroRecipe.crop_id, HydroRecipe.recipe_data)
+            .filter(HydroRecipe.crop_id.in_(crop_ids))
+            .order_by(HydroRecipe.created_at.desc()).all())
+    for crop_id, recipe in rows:
+        latest.setdefault(crop_id, recipe)
+    return latest
+
+
+def crop_needs(db, crops, area_unit="ha", today=None):
+    """
+    (campos de suelo, sales hidropónicas en kg, omitidos) de `crops`.
+    Campo: {"crop_id", "crop", "area_ha", "N", "P", "K"} con N, P, K en kg/ha.
+    """
+    from model.hydroponic_data import cultivos_db
+    from model.regional_advisories import crop_week
+    import model.integrate_all_api as api
+
+    factor = AREA_FACTORS[area_unit]
+    today = today or datetime.utcnow()
+    soil = [c for c in crops if c.crop_type == "soil"]
+    hydro = [c for c in crops if c.crop_type == "hydroponic"]
+    predictions = _latest_predictions(db, [c.id for c in soil])
+    recipes = _latest_recipes(db, [c.id for c in hydro])
+
+    fields, skipped = [], []
+    for crop in soil:
+        if not crop.area or crop.area <= 0:
+            skipped.append({"crop_id": crop.id, "reason": "sin área"})
+        elif crop.id not in predictions:
+            skipped.append({"crop_id": crop.id, "reason": "sin predicción de suelo"})
+        else:
+            n, p, k = predictions[crop.id]
+            fields.append({"crop_id": crop.id, "crop": crop.name, "area_ha": crop.area * factor,
+                           "N": n, "P": p, "K": k})
+
+    salts = {}
+    for crop in hydro:
+        recipe = recipes.get(crop.id)
+        if recipe is None:
+            skipped.append({"crop_id": crop.id, "reason": "sin receta hidropónica"})
+            continue
+        label = api.CROP_TRANSLATION.get(crop.name.lower().strip(), crop.name.lower().strip())
+        cycle = cultivos_db.get(label, {}).get("ciclo")
+        # Ciclo desconocido: solo el próximo tanque
+        weeks = max(cycle - crop_week(crop, today) + 1, 0) if cycle else 1
+        for item in recipe.get("mix_A", []) + recipe.get("mix_B", []):
+            salt = salts.setdefault(item["name"], {"name": item["name"], "kg_total": 0.0, "crops": 0})
+            salt["kg_total"] += item["grams_total"] * weeks / 1000
+            salt["crops"] += 1
+    for salt in salts.values():
+        salt["kg_total"] = round(salt["kg_total"], 3)
+    return fields, list(salts.values()), skipped
+
+
+# ===== MILP =====
+
+def _tiers(product, max_kg):
+    """[(mínimo, máximo, precio)] de cada tramo de precio del producto."""
+    tiers = [(0.0, product["cost"])] + sorted(
+        (float(t["min_kg"]), float(t["cost"])) for t in product.get("tiers", []) if t["min_kg"] > 0)
+    return [(lo, tiers[i + 1][0] if i + 1 < len(tiers) else max(max_kg, lo), cost)
+            for i, (lo, cost) in enumerate(tiers)]
+
+
+def _fix_and_solve(c, integrality, lb, ub, constraints, options, n_field_vars, tiers):
+    """
+    El MILP completo con miles de filas pasa segundos en cortes (y su brecha
+    relativa la dominan las penalizaciones de las holguras). En su lugar: la
+    relajación LP del modelo completo da las dosis de los campos; con ellas
+    fijas queda un MILP de compra con unas pocas variables enteras por
+    producto. Cada ronda vuelve a resolver el LP con los tramos de precio
+    elegidos fijos (las dosis responden al precio real) y se queda la mejor
+    solución. Es una heurística (no se demuestra optimalidad del modelo
+    completo); con 1000 campos distintos dio el mismo costo que el MILP
+    completo en una fracción del tiempo.
+    """
+    from scipy.optimize import milp, Bounds
+
+    continuous = np.zeros_like(integrality)
+    relaxed = milp(c, integrality=continuous, bounds=Bounds(lb, ub), constraints=constraints)
+    best = None
+    for round_ in range(REFINE_ROUNDS):
+        if relaxed.x is None:
+            break
+        fixed_lb, fixed_ub = lb.copy(), ub.copy()
+        fixed_lb[:n_field_vars] = fixed_ub[:n_field_vars] = relaxed.x[:n_field_vars]
+        res = milp(c, integrality=integrality, bounds=Bounds(fixed_lb, fixed_ub),
+                   constraints=constraints, options=options)
+        if res.x is None:
+            break
+        if best is None or res.fun < best.fun:
+            best = res
+        if round_ == REFINE_ROUNDS - 1:
+            break
+        tier_lb, tier_ub = lb.copy(), ub.copy()
+        tier_lb[tiers] = tier_ub[tiers] = np.round(res.x[tiers])
+        relaxed = milp(c, integrality=continuous, bounds=Bounds(tier_lb, tier_ub), constraints=constraints)
+    return best
+
+
+def plan_procurement(fields, inventory=None, blender=BLENDER, time_limit=TIME_LIMIT_S):
+    """
+    Compra de bajo costo (heurística, ver _fix_and_solve) para `fields` con el inventario
+    compartido {producto: kg}. Devuelve purchases, fields, totals y solver.
+    """
+    from scipy import sparse
+    from scipy.optimize import milp, LinearConstraint, Bounds
+
+    inventory = inventory or {}
+    unknown = set(inventory) - set(blender.names)
+    if unknown:
+        raise ValueError(f"Productos de inventario fuera del catálogo: {sorted(unknown)}")
+    if not fields:
+        return {"purchases": [], "fields": [], "totals": {"cost": 0.0, "baseline_cost": 0.0, "savings": 0.0,
+                                                           "currency": blender.currency}, "solver": None}
+    start = time.perf_counter()
+
+    requirements = np.array([[f[n] for n in NUTRIENTS] for f in fields], dtype=float)
+    areas = np.array([f["area_ha"] for f in fields], dtype=float)
+    classes, inverse = np.unique(np.round(np.maximum(requirements, 0), 2), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    class_area = np.bincount(inverse, weights=areas, minlength=len(classes))
+
+    n_classes, n_products = len(classes), len(blender.names)
+    block = blender._block
+    block_vars = block.shape[1]
+    upper = blender._bounds(classes)[:, :len(NUTRIENTS)]
+
+    # Cota de compra por producto: lo que haría falta para llegar al tope de algún nutriente en todos los campos
+    with np.errstate(divide="ignore"):
+        per_ha = np.where(blender.grades > 0, upper[:, :, None] / blender.grades[None], 0).max(axis=1)
+    max_kg = class_area @ per_ha
+
+    products = [blender.products[name] for name in blender.names]
+    tiers = [_tiers(p, m + (p.get("bag_kg") or 0)) for p, m in zip(products, max_kg)]
+    n_tiers = sum(len(t) for t in tiers)
+
+    # Variables: [clases (y, exceso, déficit)] [inventario usado] [compra por tramo] [tramo elegido] [sacos]
+    o_inv = n_classes * block_vars
+    o_q = o_inv + n_products
+    o_z = o_q + n_tiers
+    o_b = o_z + n_tiers
+    n_vars = o_b + n_products
+
+    c = np.zeros(n_vars)
+    c[:o_inv] = np.outer(class_area, np.concatenate([np.zeros(n_products), blender._c[n_products:]])).ravel()
+    integrality = np.zeros(n_vars)
+    lb, ub = np.zeros(n_vars), np.full(n_vars, np.inf)
+    ub[o_inv:o_q] = [inventory.get(name, 0.0) for name in blender.names]
+    ub[o_z:o_b] = 1
+    integrality[o_z:o_b] = 1
+
+    rows, cols, vals, row_lb, row_ub = [], [], [], [], []
+
+    def add_row(entries, lo, hi):
+        r = len(row_lb)
+        for col, val in entries:
+            rows.append(r)
+            cols.append(col)
+            vals.append(val)
+        row_lb.append(lo)
+        row_ub.append(hi)
+
+    t = 0
+    for j, (product, product_tiers) in enumerate(zip(products, tiers)):
+        q_cols = list(range(o_q + t, o_q + t + len(product_tiers)))
+        z_cols = list(range(o_z + t, o_z + t + len(product_tiers)))
+        t += len(product_tiers)
+        # Aplicado en todas las clases <= inventario usado + compra
+        add_row([(k * block_vars + j, class_area[k]) for k in range(n_classes)]
+                + [(o_inv + j, -1.0)] + [(q, -1.0) for q in q_cols], -np.inf, 0.0)
+        # Compra = sacos enteros (sin bag_kg: kg continuos)
+        bag_kg = product.get("bag_kg")
+        add_row([(q, 1.0) for q in q_cols] + [(o_b + j, -float(bag_kg or 1.0))], 0.0, 0.0)
+        if bag_kg:
+            integrality[o_b + j] = 1
+        # Un solo tramo de precio, y la compra dentro de sus límites
+        add_row([(z, 1.0) for z in z_cols], -np.inf, 1.0)
+        for q, z, (lo, hi, cost) in zip(q_cols, z_cols, product_tiers):
+            c[q] = cost
+            add_row([(q, 1.0), (z, -hi)], -np.inf, 0.0)
+            add_row([(q, 1.0), (z, -lo)], 0.0, np.inf)
+
+    coupling = sparse.csr_matrix((vals, (rows, cols)), shape=(len(row_lb), n_vars))
+    fields_block = sparse.hstack([
+        sparse.kron(sparse.identity(n_classes, format="csr"), sparse.csr_matrix(block), format="csr"),
+        sparse.csr_matrix((n_classes * block.shape[0], n_vars - o_inv)),
+    ], format="csr")
+    A = sparse.vstack([fields_block, coupling], format="csr")
+    b_lb = np.concatenate([np.full(fields_block.shape[0], -np.inf), row_lb])
+    b_ub = np.concatenate([blender._bounds(classes).ravel(), row_ub])
+    build_s = time.perf_counter() - start
+
+    constraints = LinearConstraint(A, b_lb, b_ub)
+    options = {"time_limit": time_limit, "mip_rel_gap": MIP_REL_GAP}
+    res = _fix_and_solve(c, integrality, lb, ub, constraints, options, o_inv, slice(o_z, o_b))
+    if res is None or res.x is None:
+        raise RuntimeError(f"Plan de compra sin solución: {res.message if res else 'LP sin solución'}")
+    solve_s = time.perf_counter() - start - build_s
+
+    x = res.x
+    per_ha = x[:o_inv].reshape(n_classes, block_vars)
+    quantities = per_ha[:, :n_products]
+    scale = np.maximum(1.0, np.abs(blender._bounds(classes)).max(axis=1))
+    relaxed = per_ha[:, n_products:].max(axis=1) > 1e-7 * scale
+
+    purchases, cost = [], 0.0
+    t = 0
+    for j, (name, product, product_tiers) in enumerate(zip(blender.names, products, tiers)):
+        q = x[o_q + t:o_q + t + len(product_tiers)]
+        t += len(product_tiers)
+        tier = int(np.argmax(q))
+        bought = float(q.sum())
+        applied = float(class_area @ quantities[:, j])
+        used = float(x[o_inv + j])
+        if applied <= 0.01 and bought <= 0.01 and used <= 0.01:
+            continue
+        product_cost = float(q @ np.array([p for _, _, p in product_tiers]))
+        cost += product_cost
+        purchases.append({
+            "name": name,
+            "applied_kg": round(applied, 2),
+            "from_inventory_kg": round(used, 2),
+            "purchased_kg": round(bought, 2),
+            "bags": int(round(x[o_b + j])) if product.get("bag_kg") else None,
+            "unit_cost": product_tiers[tier][2] if bought > 0.01 else None,
+            "cost": round(product_cost, 2),
+            "leftover_kg": round(used + bought - applied, 2),
+        })
+
+    plans = []
+    for f, k in zip(fields, inverse):
+        plans.append({
+            "crop_id": f.get("crop_id"),
+            "crop": f.get("crop"),
+            "area_ha": round(float(f["area_ha"]), 4),
+            "requirement": {n: round(float(v), 2) for n, v in zip(NUTRIENTS, classes[k])},
+            "products": [{"name": name, "kg_per_ha": round(float(kg), 2), "kg_total": round(float(kg * f["area_ha"]), 2)}
+                         for name, kg in zip(blender.names, quantities[k]) if kg > 0.01],
+            "relaxed": bool(relaxed[k]),
+        })
+
+    # Referencia: cada campo planificado y comprado por separado (sacos por campo, precio base)
+    baseline = 0.0
+    for plan in blender.blend_batch(requirements, areas):
+        for p in plan["products"]:
+            product = blender.products[p["name"]]
+            bag_kg = product.get("bag_kg")
+            kg = p["bags"] * bag_kg if bag_kg else p["kg_total"]
+            baseline += kg * product["cost"]
+
+    return {
+        "purchases": purchases,
+        "fields": plans,
+        "totals": {
+            "cost": round(cost, 2),
+            "baseline_cost": round(baseline, 2),
+            "savings": round(baseline - cost, 2),
+            "area_ha": round(float(areas.sum()), 2),
+            "currency": blender.currency,
+        },
+        "solver": {
+            # Heurística: dosis de la relajación LP y compra exacta con esas dosis fijas
+            "method": "lp_fix_and_round",
+            "status": res.message,
+            "subproblem_optimal": res.status == 0,  # solo el MILP de compra con las dosis fijas
+            "mip_gap": None if getattr(res, "mip_gap", None) is None else round(float(res.mip_gap), 6),
+            "fields": len(fields),
+            "classes": n_classes,
+            "variables": n_vars,
+            "constraints": A.shape[0],
+            "timings_s": {"build": round(build_s, 3), "solve": round(solve_s, 3)},
+        },
+    }
+
+
+def run_procurement(db, crops, inventory=None, area_unit="ha"):
+    """Necesidades de `crops` + plan de compra. Devuelve el resumen completo."""
+    fields, hydro_salts, skipped = crop_needs(db, crops, area_unit)
+    summary = plan_procurement(fields, inventory)
+    return {"crops": len(crops), **summary, "hydro_salts": hydro_salts, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    from database.database import SessionLocal
+    from model.regional_advisories import crops_for_region
+
+    parser = argparse.ArgumentParser(description="Plan de compra de fertilizantes")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--user-id", type=int, help="Cultivos activos de un usuario")
+    scope.add_argument("--bbox", nargs=4, type=float, metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"))
+    scope.add_argument("--center", nargs=2, type=float, metavar=("LAT", "LON"))
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--inventory", help="JSON {producto: kg} con el inventario disponible")
+    parser.add_argument("--area-unit", choices=sorted(AREA_FACTORS), default="ha", help="Unidad de Crop.area")
+    args = parser.parse_args()
+
+    inventory = None
+    if args.inventory:
+        with open(args.inventory, encoding="utf-8") as f:
+            inventory = json.load(f)
+
+    db = SessionLocal()
+    try:
+        if args.user_id is not None:
+            crops = active_crops(db, args.user_id)
+        else:
+            crops = crops_for_region(db, args.bbox, args.center, args.radius_km)
+        print(f"🌱 {len(crops)} cultivos activos")
+        summary = run_procurement(db, crops, inventory, args.area_unit)
+    finally:
+        db.close()
+
+    totals = summary["totals"]
+    for p in summary["purchases"]:
+        print(f"   {p['name']:<24} aplicar {p['applied_kg']:>10.1f} kg  inventario {p['from_inventory_kg']:>9.1f} kg  "
+              f"comprar {p['purchased_kg']:>10.1f} kg ({p['bags']} sacos) = {p['cost']:.2f}")
+    for salt in summary["hydro_salts"]:
+        print(f"💧 {salt['name']:<30} {salt['kg_total']:.2f} kg")
+    print(f"💰 {totals['cost']:.2f} {totals['currency']} (por separado: {totals['baseline_cost']:.2f}, "
+          f"ahorro {totals['savings']:.2f})")
+    if summary["solver"]:
+        print(f"⏱️  {summary['solver']['classes']} clases, {summary['solver']['timings_s']}")
+    if summary["skipped"]:
+        print(f"⚠️  Omitidos: {summary['skipped']}")
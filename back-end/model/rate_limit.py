@@ -0,0 +1,224 @@
+"""
+Límite de peticiones por cliente (token bucket) para las rutas de inferencia.
+
+El cliente ("tenant") es el usuario del JWT si la petición trae un Bearer
+válido (user:<id>) y, si no, la IP (ip:<dirección>). Cada cliente tiene un
+cubo de BURST fichas que se rellena a RATE fichas por segundo; cada ruta
+consume `cost` fichas (la CNN de imágenes cuesta más). Sin fichas: 429 con
+Retry-After.
+
+Backends:
+  - memory (por defecto): diccionario en el proceso; con varios workers de
+    serve.py cada worker lleva su propia cuenta.
+  - redis: cubo compartido entre workers y máquinas (script Lua atómico).
+    Necesita el paquete `redis`. Si Redis no responde se deja pasar la
+    petición (fail open) y se cuenta en agromind_rate_limit_errors_total.
+    El cliente es síncrono, así que las rutas async lo llaman desde el
+    threadpool (RateLimiter.acheck).
+
+El mismo cliente se usa en los ejecutores de modelos para el reparto justo
+de la cola (model/executors.py), con el peso de `tenant_weight`.
+
+Configuración (valores por defecto entre paréntesis):
+    AGROMIND_RATE_LIMIT_RPS (2)         fichas por segundo por cliente
+    AGROMIND_RATE_LIMIT_BURST (20)      tamaño del cubo
+    AGROMIND_RATE_LIMIT_BACKEND (memory)  memory | redis | off
+    AGROMIND_REDIS_URL (redis://localhost:6379/0)
+    AGROMIND_TRUST_PROXY (0)            1 = IP desde X-Forwarded-For
+    AGROMIND_ANON_WEIGHT (0.5)          peso en la cola de los clientes sin token
+    AGROMIND_TENANT_WEIGHTS ("")        pesos por cliente: "user:7=4,user:12=2"
+"""
+import os
+import math
+import time
+import threading
+from collections import OrderedDict, namedtuple
+
+from fastapi import HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+
+from auth.tokens import decode_token
+from model.metrics import REGISTRY, Counter
+
+
+RATE = float(os.getenv("AGROMIND_RATE_LIMIT_RPS", 2.0))
+BURST = float(os.getenv("AGROMIND_RATE_LIMIT_BURST", 20))
+BACKEND = os.getenv("AGROMIND_RATE_LIMIT_BACKEND", "memory")
+REDIS_URL = os.getenv("AGROMIND_REDIS_URL", "redis://localhost:6379/0")
+TRUST_PROXY = os.getenv("AGROMIND_TRUST_PROXY", "0") == "1"
+ANON_WEIGHT = float(os.getenv("AGROMIND_ANON_WEIGHT", 0.5))
+
+RATE_LIMITED = REGISTRY.register(Counter(
+    "agromind_rate_limited_total", "Peticiones rechazadas con 429 por ruta", ["route"]))
+RATE_LIMIT_ERRORS = REGISTRY.register(Counter(
+    "agromind_rate_limit_errors_total", "Errores del backend del limitador (la petición pasa)", ["backend"]))
+
+Client = namedtuple("Client", ["key", "weight"])
+
+
+def _parse_weights(value):
+    weights = {}
+    for item in value.split(","):
+        key, _, weight = item.strip().rpartition("=")
+        if key:
+            weights[key] = float(weight)
+    return weights
+
+
+TENANT_WEIGHTS = _parse_weights(os.getenv("AGROMIND_TENANT_WEIGHTS", ""))
+
+
+# ===== BACKENDS =====
+
+class MemoryBackend:
+    """Cubos en memoria del proceso; olvida los clientes menos recientes por encima de max_keys."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (fichas, instante de la última actualización)
+        self._lock = threading.Lock()
+
+    def consume(self, key, cost, rate, burst):
+        """(permitido, segundos hasta tener `cost` fichas, fichas restantes)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return allowed, retry_after, tokens
+
+
+# Refill + consumo atómico en Redis. Usa el reloj de Redis para que todos los
+# workers vean el mismo tiempo.
+_REDIS_SCRIPT = """
+local cost, rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Cubos compartidos en Redis (varios workers o réplicas de la API)."""
+
+    name = "redis"
+    blocking = True  # redis-py síncrono: fuera del event loop (ver RateLimiter.acheck)
+
+    def __init__(self, url=REDIS_URL, prefix="agromind:rl:"):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+
+    def consume(self, key, cost, rate, burst):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[cost, rate, burst])
+        tokens = float(tokens)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return bool(allowed), retry_after, tokens
+
+
+def create_backend(name=BACKEND):
+    if name == "off":
+        return None
+    if name == "redis":
+        return RedisBackend()
+    return MemoryBackend()
+
+
+# ===== CLIENTE =====
+
+def client_ip(request: Request):
+    if TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request):
+    """user:<id> si hay un Bearer válido; si no, ip:<dirección>."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"user:{decode_token(token).user_id}"
+        except HTTPException:
+            pass
+    return f"ip:{client_ip(request)}"
+
+
+def tenant_weight(key):
+    if key in TENANT_WEIGHTS:
+        return TENANT_WEIGHTS[key]
+    return ANON_WEIGHT if key.startswith("ip:") else 1.0
+
+
+# ===== LIMITADOR =====
+
+class RateLimiter:
+    def __init__(self, backend, rate=RATE, burst=BURST):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+
+    def check(self, key, cost, route):
+        """Consume `cost` fichas de `key` o lanza 429. Devuelve las fichas restantes."""
+        if self.backend is None:
+            return self.burst
+        try:
+            allowed, retry_after, remaining = self.backend.consume(key, cost, self.rate, self.burst)
+        except Exception:
+            RATE_LIMIT_ERRORS.inc(backend=self.backend.name)
+            return self.burst
+        if not allowed:
+            RATE_LIMITED.inc(route=route)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas peticiones, reintenta más tarde.",
+                headers={
+                    "Retry-After": str(max(1, math.ceil(retry_after))),
+                    "X-RateLimit-Limit": str(int(self.burst)),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+        return remaining
+
+    async def acheck(self, key, cost, route):
+        """check() para rutas async: un backend de red va al threadpool y no bloquea el event loop."""
+        if self.backend is not None and self.backend.blocking:
+            return await run_in_threadpool(self.check, key, cost, route)
+        return self.check(key, cost, route)
+
+    def limit(self, route, cost=1):
+        """Dependencia de FastAPI: aplica el límite y devuelve el Client para los ejecutores."""
+        async def dependency(request: Request, response: Response) -> Client:
+            key = client_key(request)
+            remaining = await self.acheck(key, cost, route)
+            response.headers["X-RateLimit-Limit"] = str(int(self.burst))
+            response.headers["X-RateLimit-Remaining"] = str(int(remaining))
+            return Client(key, tenant_weight(key))
+        return dependency
+
+
+LIMITER = RateLimiter(create_backend())
@@ -0,0 +1,184 @@
+"""
+Precalcula cada noche la receta hidropónica de la semana siguiente.
+
+Para cada cultivo hidropónico activo con planting_date y ubicación:
+  - semana actual = días desde planting_date // 7 + 1; se calcula la receta de
+    la semana siguiente (válida desde planting_date + 7 * semana_actual días);
+  - el clima se consulta una vez por celda geohash (como en regional_advisories);
+  - por lotes de `batch_size` cultivos: una inferencia del modelo hidropónico y
+    un solo LP para todas las mezclas (HydroOptimizer.calculate_recipes_batch);
+  - se guarda como HydroRecipe con scheduled=True. Si el cultivo ya tiene la
+    receta programada de esa semana no se recalcula (el job es idempotente).
+
+La app lee la receta con GET /crops/{crop_id}/scheduled-recipe, una búsqueda
+en el índice (crop_id, scheduled, week).
+
+Uso (desde back-end/):
+    python -m model.recipe_scheduler                  # una ejecución (cron)
+    python -m model.recipe_scheduler --daemon --at 02:00
+    python -m model.recipe_scheduler --date 2026-03-01 --dry-run
+"""
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+from database.models import Crop, HydroRecipe
+from model.regional_advisories import (
+    WEATHER_CELL_PRECISION, DEFAULT_WATER_PH, DEFAULT_TANK_LITERS,
+    group_by_cell, fetch_cell_weather, latest_inputs, crop_week,
+)
+import model.integrate_all_api as api
+
+
+def due_crops(db, today):
+    """Cultivos hidropónicos activos, con fecha de siembra y ubicación, sin cosechar."""
+    return db.query(Crop).filter(
+        Crop.status == "active",
+        Crop.crop_type == "hydroponic",
+        Crop.planting_date.isnot(None),
+        Crop.planting_date <= today,
+        Crop.geohash.isnot(None),
+        or_(Crop.harvest_date.is_(None), Crop.harvest_date > today),
+    ).all()
+
+
+def next_week(crop, today):
+    """(semana siguiente, fecha de inicio de esa semana)."""
+    current = crop_week(crop, today)
+    return current + 1, crop.planting_date + timedelta(days=7 * current)
+
+
+def _already_scheduled(db, plan):
+    """{(crop_id, week)} que ya tienen receta programada."""
+    crop_ids = [crop.id for crop, _, _ in plan]
+    if not crop_ids:
+        return set()
+    rows = db.query(HydroRecipe.crop_id, HydroRecipe.week).filter(
+        HydroRecipe.crop_id.in_(crop_ids),
+        HydroRecipe.scheduled.is_(True),
+        HydroRecipe.week.in_({week for _, week, _ in plan}),
+    ).all()
+    return set(rows)
+
+
+def precompute_next_week(db, today=None, batch_size=500, cell_precision=WEATHER_CELL_PRECISION,
+                         weather_workers=8, dry_run=False):
+    """Calcula y guarda las recetas de la semana siguiente. Devuelve un resumen."""
+    today = today or datetime.utcnow()
+    api.warm_start()
+    timings = {}
+
+    start = time.perf_counter()
+    crops = due_crops(db, today)
+    plan = [(crop, *next_week(crop, today)) for crop in crops]
+    done = _already_scheduled(db, plan)
+    plan = [(crop, week, valid_from) for crop, week, valid_from in plan if (crop.id, week) not in done]
+    timings["select_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cells = group_by_cell([crop for crop, _, _ in plan], cell_precision)
+    weather = fetch_cell_weather(list(cells), workers=weather_workers) if cells else {}
+    _, hydro_inputs = latest_inputs(db, [crop.id for crop, _, _ in plan])
+    timings["weather_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    created = 0
+    for offset in range(0, len(plan), batch_size):
+        chunk = plan[offset:offset + batch_size]
+        labels = [api.CROP_TRANSLATION.get(c.name.lower().strip(), c.name.lower().strip()) for c, _, _ in chunk]
+        climate = [weather[c.geohash[:cell_precision]] for c, _, _ in chunk]
+        inputs = [hydro_inputs.get(c.id, (DEFAULT_WATER_PH, DEFAULT_TANK_LITERS)) for c, _, _ in chunk]
+
+        targets = api.predict_hydro_batch(
+            labels,
+            [w["temperature"] for w in climate],
+            [w["humidity"] for w in climate],
+            [ph for ph, _ in inputs],
+            [week for _, week, _ in chunk],
+        )
+        recipes = api.optimizer.calculate_recipes_batch(
+            [{"N": float(n), "P": float(p), "K": float(k), "EC": float(ec)} for n, p, k, ec in targets],
+            [liters for _, liters in inputs],
+        )
+
+        rows = []
+        for (crop, week, valid_from), w, (ph_water, liters), (n, p, k, ec), items in zip(
+                chunk, climate, inputs, targets, recipes):
+            rows.append(HydroRecipe(
+                user_id=crop.user_id, crop_id=crop.id, crop_name=crop.name, week=week,
+                tank_liters=liters, ph_water=ph_water,
+                latitude=crop.location_lat, longitude=crop.location_long,
+                temperature=w["temperature"], humidity=w["humidity"],
+                target_nitrogen=float(n), target_phosphorus=float(p), target_potassium=float(k),
+                target_ec=float(ec),
+                recipe_data={
+                    "mix_A": [item for item in items if item["tank_type"] == "A"],
+                    "mix_B": [item for item in items if item["tank_type"] == "B"],
+                },
+                scheduled=True, valid_from=valid_from,
+            ))
+        if not dry_run:
+            db.add_all(rows)
+            db.commit()
+        created += len(rows)
+    timings["compute_s"] = time.perf_counter() - start
+
+    return {
+        "date": today.date().isoformat(),
+        "due_crops": len(crops),
+        "already_scheduled": len(crops) - len(plan),
+        "recipes": created,
+        "weather_cells": len(cells),
+        "dry_run": dry_run,
+        "timings_s": {k: round(v, 3) for k, v in timings.items()},
+    }
+
+
+def seconds_until(at, now=None):
+    now = now or datetime.now()
+    hour, minute = (int(x) for x in at.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def run_once(**kwargs):
+    from database.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        summary = precompute_next_week(db, **kwargs)
+    finally:
+        db.close()
+    print(f"🗓️  {summary['date']}: {summary['recipes']} recetas nuevas "
+          f"({summary['due_crops']} cultivos, {summary['already_scheduled']} ya programados, "
+          f"{summary['weather_cells']} celdas de clima) {summary['timings_s']}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recetas hidropónicas programadas para la semana siguiente")
+    parser.add_argument("--daemon", action="store_true", help="Quedarse en ejecución y repetir cada día")
+    parser.add_argument("--at", default="02:00", help="Hora local de ejecución diaria con --daemon (HH:MM)")
+    parser.add_argument("--date", help="Fecha de referencia YYYY-MM-DD (por defecto, hoy)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Calcula pero no guarda")
+    args = parser.parse_args()
+
+    options = {"batch_size": args.batch_size, "dry_run": args.dry_run}
+    if args.date:
+        options["today"] = datetime.strptime(args.date, "%Y-%m-%d")
+
+    if not args.daemon:
+        run_once(**options)
+    else:
+        print(f"⏰ Programador de recetas: todos los días a las {args.at}")
+        while True:
+            time.sleep(seconds_until(args.at))
+            try:
+                run_once(**options)
+            except Exception as e:
+                print(f"❌ Error en la ejecución programada: {e}")
@@ -0,0 +1,234 @@
+"""
+Avisos regionales de fertilización por lotes.
+
+Para todos los cultivos activos de una región (rectángulo o radio):
+  1. Los busca con el índice geohash (database/spatial.py).
+  2. Los agrupa por celda de clima: prefijo geohash de `cell_precision`
+     caracteres (5 ≈ 4.9 x 4.9 km), y consulta el clima UNA vez por celda,
+     en paralelo.
+  3. Ejecuta una sola inferencia por lotes del modelo de suelo para todos los
+     cultivos de suelo y otra del modelo hidropónico para todos los
+     hidropónicos; el optimizador resuelve todas las mezclas en un solo LP.
+  4. Guarda el resultado como Prediction / HydroRecipe de cada cultivo
+     (salvo con --dry-run).
+
+El pH y el volumen de tanque se toman de la última predicción/receta del
+cultivo; si no hay, se usan los valores por defecto. La semana del ciclo
+hidropónico sale de planting_date.
+
+Uso (desde back-end/):
+    python -m model.regional_advisories --bbox -1.5 -79.5 0.5 -77.5
+    python -m model.regional_advisories --center -0.18 -78.47 --radius-km 50 --dry-run
+"""
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from database.geohash import decode
+from database.models import Prediction, HydroRecipe
+from database.spatial import crops_in_bbox, crops_within_radius
+import model.integrate_all_api as api
+from model.fertilizer_recommendation import BLENDER
+
+
+WEATHER_CELL_PRECISION = 5
+DEFAULT_SOIL_PH = 6.5
+DEFAULT_WATER_PH = 6.0
+DEFAULT_TANK_LITERS = 100.0
+
+
+def group_by_cell(crops, precision=WEATHER_CELL_PRECISION):
+    cells = {}
+    for crop in crops:
+        cells.setdefault(crop.geohash[:precision], []).append(crop)
+    return cells
+
+
+def fetch_cell_weather(cells, workers=8):
+    """{celda: clima} consultando el clima del centro de cada celda una sola vez."""
+    def fetch(cell):
+        lat, lon = decode(cell)
+        # Misma fuente que /predict: lluvia normal del mes si hay climatología
+        return cell, api.soil_weather(lat, lon)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(cells)))) as pool:
+        return dict(pool.map(fetch, cells))
+
+
+def latest_inputs(db, crop_ids):
+    """Último pH de suelo y (pH de agua, litros) usados por cada cultivo."""
+    soil_ph, hydro = {}, {}
+    if not crop_ids:
+        return soil_ph, hydro
+
+    rows = (db.query(Prediction.crop_id, Prediction.ph)
+            .filter(Prediction.crop_id.in_(crop_ids))
+            .order_by(Prediction.created_at.desc()).all())
+    for crop_id, ph in rows:
+        soil_ph.setdefault(crop_id, ph)
+
+    rows = (db.query(HydroRecipe.crop_id, HydroRecipe.ph_water, HydroRecipe.tank_liters)
+            .filter(HydroRecipe.crop_id.in_(crop_ids))
+            .order_by(HydroRecipe.created_at.desc()).all())
+    for crop_id, ph_water, tank_liters in rows:
+        hydro.setdefault(crop_id, (ph_water, tank_liters))
+    return soil_ph, hydro
+
+
+def crop_week(crop, today=None):
+    if crop.planting_date is None:
+        return 1
+    today = today or datetime.utcnow()
+    return max(1, (today - crop.planting_date).days // 7 + 1)
+
+
+def _soil_advisories(db, crops, weather, cell_precision, soil_ph, dry_run):
+    known = set(api.BUNDLES["soil"].preprocessor.named_transformers_["cat"].categories_[0])
+    rows, skipped = [], []
+    for crop in crops:
+        label = api.CROP_TRANSLATION_NORMAL.get(crop.name.lower().strip(), crop.name.lower().strip())
+        (rows if label in known else skipped).append((crop, label))
+    if not rows:
+        return [], [crop.id for crop, _ in skipped]
+
+    climate = [weather[crop.geohash[:cell_precision]] for crop, _ in rows]
+    ph = [soil_ph.get(crop.id, DEFAULT_SOIL_PH) for crop, _ in rows]
+    npk = api.predict_soil_batch(
+        [label for _, label in rows],
+        [w["temperature"] for w in climate],
+        [w["humidity"] for w in climate],
+        ph,
+        [w.get("rainfall", 50.0) for w in climate],
+    )
+
+    # Planes de fertilización de todos los cultivos en un solo LP
+    plans = BLENDER.blend_batch(npk, crops=[label for _, label in rows])
+
+    advisories = []
+    for (crop, label), w, crop_ph, (n, p, k), plan in zip(rows, climate, ph, npk, plans):
+        text = BLENDER.render(plan)
+        advisories.append({"crop_id": crop.id, "crop_type": "soil", "N": round(float(n), 2),
+                           "P": round(float(p), 2), "K": round(float(k), 2)})
+        if not dry_run:
+            db.add(Prediction(
+                user_id=crop.user_id, crop_id=crop.id, crop_name=crop.name, ph=crop_ph,
+                latitude=crop.location_lat, longitude=crop.location_long,
+                temperature=w["temperature"], humidity=w["humidity"], rainfall=w.get("rainfall"),
+                nitrogen=float(n), phosphorus=float(p), potassium=float(k), recommendation=text,
+            ))
+    return advisories, [crop.id for crop, _ in skipped]
+
+
+def _hydro_advisories(db, crops, weather, cell_precision, hydro_inputs, dry_run):
+    if not crops:
+        return []
+    today = datetime.utcnow()
+    labels = [api.CROP_TRANSLATION.get(c.name.lower().strip(), c.name.lower().strip()) for c in crops]
+    climate = [weather[c.geohash[:cell_precision]] for c in crops]
+    inputs = [hydro_inputs.get(c.id, (DEFAULT_WATER_PH, DEFAULT_TANK_LITERS)) for c in crops]
+    weeks = [crop_week(c, today) for c in crops]
+
+    targets = api.predict_hydro_batch(
+        labels,
+        [w["temperature"] for w in climate],
+        [w["humidity"] for w in climate],
+        [ph for ph, _ in inputs],
+        weeks,
+    )
+
+    recipes = api.optimizer.calculate_recipes_batch(
+        [{"N": float(n), "P": float(p), "K": float(k), "EC": float(ec)} for n, p, k, ec in targets],
+        [liters for _, liters in inputs],
+    )
+
+    advisories = []
+    for crop, w, (ph_water, liters), week, (n, p, k, ec), items in zip(crops, climate, inputs, weeks, targets, recipes):
+        recipe = {
+            "mix_A": [item for item in items if item["tank_type"] == "A"],
+            "mix_B": [item for item in items if item["tank_type"] == "B"],
+        }
+        advisories.append({"crop_id": crop.id, "crop_type": "hydroponic", "week": week,
+                           "N": round(float(n), 2), "P": round(float(p), 2), "K": round(float(k), 2),
+                           "EC": round(float(ec), 3)})
+        if not dry_run:
+            db.add(HydroRecipe(
+                user_id=crop.user_id, crop_id=crop.id, crop_name=crop.name, week=week,
+                tank_liters=liters, ph_water=ph_water,
+                latitude=crop.location_lat, longitude=crop.location_long,
+                temperature=w["temperature"], humidity=w["humidity"],
+                target_nitrogen=float(n), target_phosphorus=float(p), target_potassium=float(k),
+                target_ec=float(ec), recipe_data=recipe,
+            ))
+    return advisories
+
+
+def run_advisories(db, crops, cell_precision=WEATHER_CELL_PRECISION, weather_workers=8, dry_run=False):
+    """Genera los avisos de `crops` (cultivos con ubicación). Devuelve un resumen."""
+    api.warm_start()
+    timings = {}
+
+    start = time.perf_counter()
+    crops = [c for c in crops if c.geohash]
+    cells = group_by_cell(crops, cell_precision)
+    weather = fetch_cell_weather(list(cells), workers=weather_workers) if cells else {}
+    timings["weather_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    soil_ph, hydro_inputs = latest_inputs(db, [c.id for c in crops])
+    soil_crops = [c for c in crops if c.crop_type == "soil"]
+    hydro_crops = [c for c in crops if c.crop_type == "hydroponic"]
+    soil, skipped = _soil_advisories(db, soil_crops, weather, cell_precision, soil_ph, dry_run)
+    hydro = _hydro_advisories(db, hydro_crops, weather, cell_precision, hydro_inputs, dry_run)
+    timings["inference_s"] = time.perf_counter() - start
+
+    if not dry_run:
+        db.commit()
+
+    return {
+        "crops": len(crops),
+        "weather_cells": len(cells),
+        "soil_advisories": len(soil),
+        "hydro_advisories": len(hydro),
+        "skipped_unknown_crop": skipped,
+        "dry_run": dry_run,
+        "timings_s": {k: round(v, 3) for k, v in timings.items()},
+        "advisories": soil + hydro,
+    }
+
+
+def crops_for_region(db, bbox=None, center=None, radius_km=None):
+    if bbox is not None:
+        return crops_in_bbox(db, *bbox)
+    return [crop for crop, _ in crops_within_radius(db, center[0], center[1], radius_km)]
+
+
+if __name__ == "__main__":
+    from database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Avisos de fertilización por región")
+    region = parser.add_mutually_exclusive_group(required=True)
+    region.add_argument("--bbox", nargs=4, type=float, metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"))
+    region.add_argument("--center", nargs=2, type=float, metavar=("LAT", "LON"))
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--cell-precision", type=int, default=WEATHER_CELL_PRECISION,
+                        help="Caracteres de geohash por celda de clima (5 ≈ 4.9 km)")
+    parser.add_argument("--weather-workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true", help="No guarda los avisos en la base de datos")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        crops = crops_for_region(db, args.bbox, args.center, args.radius_km)
+        print(f"🌍 {len(crops)} cultivos activos en la región")
+        summary = run_advisories(db, crops, args.cell_precision, args.weather_workers, args.dry_run)
+    finally:
+        db.close()
+
+    print(f"☁️  {summary['weather_cells']} celdas de clima consultadas")
+    print(f"🌱 Suelo: {summary['soil_advisories']}  💧 Hidroponía: {summary['hydro_advisories']}")
+    if summary["skipped_unknown_crop"]:
+        print(f"⚠️  Omitidos (cultivo desconocido para el modelo de suelo): {summary['skipped_unknown_crop']}")
+    print(f"⏱️  {summary['timings_s']}")
+    if args.dry_run:
+        print("(dry-run: no se guardó nada)")
@@ -0,0 +1,202 @@
+"""
+Evaluación en sombra y canario de una versión candidata (model/bundles.py).
+
+Sombra: una muestra (sample_rate) de las entradas de /generate-recipe y
+/predict se copia, junto con la salida que recibió el cliente, a una cola
+acotada. Un hilo aparte por sistema vacía la cola en lotes, pasa las entradas
+por el modelo candidato y acumula en streaming la diferencia candidato -
+actual: MAE, sesgo y error máximo por nutriente, en total y por cultivo. La
+petición no espera a nada de esto; si la cola está llena la muestra se
+descarta (agromind_shadow_dropped_total). En /predict solo se copian las
+peticiones que respondió la red: las del sustituto tabulado
+(model/surrogate.py) mezclarían su error de interpolación con la
+diferencia entre modelos.
+
+Canario: los clientes cuyo hash (user:<id> o ip:<dirección>, el mismo de
+model/rate_limit.py) cae por debajo de canary_percent reciben directamente la
+respuesta del candidato. La asignación es estable: un cliente no salta entre
+versiones de una petición a otra.
+
+La configuración está en training_models/bundles/<sistema>/CANDIDATE
+    {"version": "v2", "sample_rate": 0.1, "canary_percent": 5}
+La escribe la API de administración y el vigilante de cada worker la aplica,
+igual que CURRENT. Solo hydro y soil (la salida de imágenes es una clase).
+
+    AGROMIND_SHADOW_QUEUE (256)   muestras en espera por sistema
+    AGROMIND_SHADOW_BATCH (32)    muestras por llamada al candidato
+"""
+import os
+import zlib
+import queue
+import random
+import threading
+
+import numpy as np
+
+from model.metrics import REGISTRY, Counter, Gauge
+
+
+QUEUE_SIZE = int(os.getenv("AGROMIND_SHADOW_QUEUE", 256))
+BATCH_SIZE = int(os.getenv("AGROMIND_SHADOW_BATCH", 32))
+MAX_CROPS = 64  # cultivos con estadística propia; el resto se agrupa en "otros"
+
+OUTPUTS = {"hydro": ("N", "P", "K", "EC"), "soil": ("N", "P", "K")}
+
+SHADOW_SAMPLES = REGISTRY.register(Counter(
+    "agromind_shadow_samples_total", "Muestras evaluadas por el candidato", ["system", "version"]))
+SHADOW_DROPPED = REGISTRY.register(Counter(
+    "agromind_shadow_dropped_total", "Muestras descartadas por cola de sombra llena", ["system"]))
+SHADOW_ERRORS = REGISTRY.register(Counter(
+    "agromind_shadow_errors_total", "Lotes de sombra en los que falló el candidato", ["system", "version"]))
+SHADOW_MAE = REGISTRY.register(Gauge(
+    "agromind_shadow_mae", "Error absoluto medio candidato vs. actual por salida", ["system", "version", "output"]))
+CANARY_REQUESTS = REGISTRY.register(Counter(
+    "agromind_canary_requests_total", "Peticiones atendidas por la versión candidata", ["system", "version"]))
+
+# Candidato activo por sistema en este worker
+CANDIDATES = {"hydro": None, "soil": None}
+
+
+class ErrorStats:
+    """Diferencias candidato - actual acumuladas en streaming (memoria constante)."""
+
+    def __init__(self, n_outputs):
+        self.count = 0
+        self.abs_sum = np.zeros(n_outputs)
+        self.diff_sum = np.zeros(n_outputs)
+        self.max_abs = np.zeros(n_outputs)
+
+    def update(self, diff):
+        abs_diff = np.abs(diff)
+        self.count += len(diff)
+        self.abs_sum += abs_diff.sum(axis=0)
+        self.diff_sum += diff.sum(axis=0)
+        self.max_abs = np.maximum(self.max_abs, abs_diff.max(axis=0))
+
+    def mae(self):
+        return self.abs_sum / max(self.count, 1)
+
+    def summary(self, names):
+        count = max(self.count, 1)
+        return {
+            "samples": self.count,
+            "mae": {name: round(float(v), 4) for name, v in zip(names, self.abs_sum / count)},
+            "bias": {name: round(float(v), 4) for name, v in zip(names, self.diff_sum / count)},
+            "max_abs": {name: round(float(v), 4) for name, v in zip(names, self.max_abs)},
+        }
+
+
+class Shadow:
+    """
+    Versión candidata de un sistema: cola de muestras, hilo evaluador y
+    estadísticas. `predict(*columnas, bundle=...)` es la función por lotes del
+    sistema (predict_hydro_batch / predict_soil_batch).
+    """
+
+    def __init__(self, bundle, predict, sample_rate=0.0, canary_percent=0.0):
+        self.bundle = bundle
+        self.system = bundle.system
+        self.version = bundle.version
+        self.predict = predict
+        self.outputs = OUTPUTS[self.system]
+        self.configure(sample_rate, canary_percent)
+
+        self.overall = ErrorStats(len(self.outputs))
+        self.by_crop = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name=f"agromind-shadow-{self.system}", daemon=True)
+        self._thread.start()
+
+    def configure(self, sample_rate, canary_percent):
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        self.canary_percent = min(max(float(canary_percent), 0.0), 100.0)
+
+    def in_canary(self, client_key):
+        return zlib.crc32(client_key.encode()) % 10000 < self.canary_percent * 100
+
+    def offer(self, inputs, output):
+        """Copia (entradas, salida servida) a la cola con probabilidad sample_rate. No bloquea."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((inputs, output))
+        except queue.Full:
+            SHADOW_DROPPED.inc(system=self.system)
+
+    def stop(self):
+        self._stop.set()
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._score(batch)
+
+    def _score(self, batch):
+        columns = list(zip(*(inputs for inputs, _ in batch)))
+        served = np.array([output for _, output in batch], dtype=float)
+        try:
+            candidate = np.asarray(self.predict(*columns, bundle=self.bundle), dtype=float)
+        except Exception as e:
+            print(f"⚠️ Sombra {self.system}@{self.version}: {e}")
+            SHADOW_ERRORS.inc(system=self.system, version=self.version)
+            return
+        diff = candidate - served
+
+        crops = np.asarray(columns[0], dtype=object)
+        with self._lock:
+            self.overall.update(diff)
+            for crop in set(columns[0]):
+                key = crop if crop in self.by_crop or len(self.by_crop) < MAX_CROPS else "otros"
+                if key not in self.by_crop:
+                    self.by_crop[key] = ErrorStats(len(self.outputs))
+                self.by_crop[key].update(diff[crops == crop])
+        SHADOW_SAMPLES.inc(len(batch), system=self.system, version=self.version)
+
+    def summary(self, per_crop=False):
+        with self._lock:
+            body = {
+                "version": self.version,
+                "sample_rate": self.sample_rate,
+                "canary_percent": self.canary_percent,
+                "queued": self._queue.qsize(),
+                **self.overall.summary(self.outputs),
+            }
+            if per_crop:
+                body["by_crop"] = {crop: stats.summary(self.outputs)
+                                   for crop, stats in sorted(self.by_crop.items())}
+        return body
+
+
+def route(system, stable, client_key):
+    """
+    (paquete que atiende la petición, candidato al que copiar su entrada o None).
+    Los clientes del canario van al candidato y no se comparan consigo mismos.
+    """
+    candidate = CANDIDATES.get(system)
+    if candidate is None:
+        return stable, None
+    if candidate.in_canary(client_key):
+        CANARY_REQUESTS.inc(system=system, version=candidate.version)
+        return candidate.bundle, None
+    return stable, candidate
+
+
+def _update_shadow_gauges():
+    SHADOW_MAE.clear()
+    for system, candidate in list(CANDIDATES.items()):
+        if candidate is not None and candidate.overall.count:
+            for name, mae in zip(candidate.outputs, candidate.overall.mae()):
+                SHADOW_MAE.set(float(mae), system=system, version=candidate.version, output=name)
+
+
+REGISTRY.add_collector(_update_shadow_gauges)
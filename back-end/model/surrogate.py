@@ -0,0 +1,245 @@
+"""
+Sustituto tabulado del modelo de suelo: rejilla por cultivo + interpolación multilineal.
+
+El modelo de suelo es una función de cuatro entradas continuas
+(temperature, humidity, ph, rainfall) y el cultivo. Al construir el
+sustituto se evalúa el modelo (por lotes) en una rejilla densa para cada
+cultivo y se guardan las salidas ya desescaladas (N, P, K en kg/ha):
+
+    values float32 (n_cultivos, nT, nH, nPH, nR, 3) + un eje por entrada
+
+En la petición: un bisect por eje, el bloque 2x2x2x2 de la celda y cuatro
+interpolaciones lineales (~microsegundos, sin TensorFlow ni preprocesado).
+Fuera de la rejilla (rango de entrenamiento) o con un cultivo desconocido
+se devuelve None y la API usa la red.
+
+El sustituto está ligado a una versión del modelo (sha256 del modelo y de
+preprocessor_X y scaler_y en los metadatos, porque las salidas ya vienen
+desescaladas); si alguno no coincide se ignora. Al construirlo se mide
+el error frente a la red en puntos aleatorios de la rejilla y en las filas
+de entrenamiento (MAE, p99 y máximo por nutriente), y queda en los metadatos.
+
+Uso (desde back-end/):
+    python -m model.surrogate build                      # versión activa (legacy: Artifacts/soil_surrogate.agma)
+    python -m model.surrogate build --version v2 --points 24 24 12 24
+    python -m model.surrogate report
+
+Desactivado por defecto: AGROMIND_SOIL_SURROGATE=1 para usarlo en /predict.
+"""
+import os
+import time
+import argparse
+from bisect import bisect_right
+
+import numpy as np
+
+from model import array_artifacts
+
+
+ENABLED = os.getenv("AGROMIND_SOIL_SURROGATE", "0") == "1"
+FEATURES = ("temperature", "humidity", "ph", "rainfall")
+OUTPUTS = ("N", "P", "K")
+DEFAULT_POINTS = (20, 20, 12, 20)
+BUILD_BATCH = 65536
+
+
+class SoilSurrogate:
+    def __init__(self, axes, values, crops, meta):
+        self.axes = axes  # arrays de numpy (interpolación por lotes)
+        self._axes = [[float(x) for x in axis] for axis in axes]  # listas (bisect por petición)
+        self.values = values
+        self.crops = list(crops)
+        self._index = {crop: i for i, crop in enumerate(crops)}
+        self.meta = meta
+
+    @classmethod
+    def load(cls, path):
+        arrays, meta = array_artifacts.read(path)
+        axes = [arrays[f"axis.{name}"] for name in FEATURES]
+        return cls(axes, arrays["values"], meta["crops"], meta)
+
+    def _locate(self, axis, x):
+        """(índice inferior, fracción) de x en el eje, o None fuera de rango."""
+        if not axis[0] <= x <= axis[-1]:
+            return None
+        i = min(bisect_right(axis, x) - 1, len(axis) - 2)
+        return i, (x - axis[i]) / (axis[i + 1] - axis[i])
+
+    def predict_one(self, crop, temperature, humidity, ph, rainfall):
+        """Array (3,) con N, P, K, o None fuera de la rejilla."""
+        c = self._index.get(crop)
+        if c is None:
+            return None
+        located = []
+        for axis, x in zip(self._axes, (temperature, humidity, ph, rainfall)):
+            position = self._locate(axis, x)
+            if position is None:
+                return None
+            located.append(position)
+        (i, a), (j, b), (k, d), (m, e) = located
+        block = self.values[c, i:i + 2, j:j + 2, k:k + 2, m:m + 2]
+        # Interpolación lineal eje a eje: (2,2,2,2,3) -> (3,)
+        for t in (a, b, d, e):
+            block = block[0] + (block[1] - block[0]) * t
+        return block
+
+    def predict_batch(self, crops, temperature, humidity, ph, rainfall):
+        """(array (n, 3), máscara de filas dentro de la rejilla). Fuera: NaN."""
+        inputs = [np.asarray(v, dtype=float) for v in (temperature, humidity, ph, rainfall)]
+        n = len(inputs[0])
+        c = np.array([self._index.get(crop, -1) for crop in crops])
+        inside = c >= 0
+        lower, frac = [], []
+        for axis, x in zip(self.axes, inputs):
+            inside &= (x >= axis[0]) & (x <= axis[-1])
+            i = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, len(axis) - 2)
+            lower.append(i)
+            frac.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+        out = np.full((n, len(OUTPUTS)), np.nan)
+        rows = np.flatnonzero(inside)
+        if len(rows):
+            cr = c[rows]
+            lo = [i[rows] for i in lower]
+            fr = [f[rows] for f in frac]
+            acc = np.zeros((len(rows), len(OUTPUTS)))
+            for corner in range(16):
+                bits = [(corner >> axis) & 1 for axis in range(4)]
+                weight = np.ones(len(rows))
+                for bit, f in zip(bits, fr):
+                    weight *= f if bit else 1 - f
+                acc += weight[:, None] * self.values[cr, lo[0] + bits[0], lo[1] + bits[1],
+                                                     lo[2] + bits[2], lo[3] + bits[3]]
+            out[rows] = acc
+        return out, inside
+
+
+def surrogate_path(version, manifest=None):
+    """Legacy: Artifacts/soil_surrogate.agma; paquete: entrada "surrogate" del manifiesto."""
+    from model import bundles
+
+    if version == bundles.LEGACY_VERSION:
+        return os.path.join(bundles.BASE_DIR, "Artifacts", "soil_surrogate.agma")
+    filename = (manifest or {}).get("files", {}).get("surrogate", "soil_surrogate.agma")
+    return bundles.file_path("soil", version, filename)
+
+
+def _model_checksum(version, manifest):
+    from model import bundles
+
+    filename = manifest["files"]["model"]
+    return manifest["sha256"].get(filename) or bundles.sha256_file(bundles.file_path("soil", version, filename))
+
+
+def _checksums(version, manifest):
+    """sha256 de los ficheros de los que salen los valores de la rejilla."""
+    from model import bundles
+
+    return {"model_sha256": _model_checksum(version, manifest),
+            "sources_sha256": bundles.part_checksums("soil", version, manifest)}
+
+
+def load_for(version, manifest):
+    """Sustituto de soil@version si existe, está activado y corresponde a su modelo."""
+    if not ENABLED:
+        return None
+    path = surrogate_path(version, manifest)
+    if not os.path.exists(path):
+        print(f"⚠️ Sustituto de suelo activado pero no existe {path} (python -m model.surrogate build)")
+        return None
+    surrogate = SoilSurrogate.load(path)
+    expected = _checksums(version, manifest)
+    if any(surrogate.meta.get(key) != value for key, value in expected.items()):
+        print(f"⚠️ {path} se construyó con otro modelo o transformadores; se usa la red")
+        return None
+    return surrogate
+
+
+# ===== CONSTRUCCIÓN =====
+
+def _error_stats(errors):
+    errors = np.abs(errors)
+    return {name: {"mae": round(float(errors[:, i].mean()), 4),
+                   "p99": round(float(np.percentile(errors[:, i], 99)), 4),
+                   "max": round(float(errors[:, i].max()), 4)}
+            for i, name in enumerate(OUTPUTS)}
+
+
+def build(version=None, points=DEFAULT_POINTS, n_check=20000, seed=0):
+    """Evalúa soil@version en la rejilla, mide el error y guarda el sustituto."""
+    import model.integrate_all_api as api
+    from model import bundles
+    from model.preprocessing_data_normal import load_data, clean_outliers
+
+    version = version or bundles.current_version("soil")
+    bundle = bundles.load_bundle("soil", version)
+    df = clean_outliers(load_data())
+    crops = [str(c) for c in bundle.preprocessor.named_transformers_["cat"].categories_[0]]
+    axes = [np.linspace(df[name].min(), df[name].max(), n) for name, n in zip(FEATURES, points)]
+
+    start = time.perf_counter()
+    grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(FEATURES))
+    values = np.empty((len(crops), len(grid), len(OUTPUTS)), dtype=np.float32)
+    for c, crop in enumerate(crops):
+        for lo in range(0, len(grid), BUILD_BATCH):
+            chunk = grid[lo:lo + BUILD_BATCH]
+            values[c, lo:lo + len(chunk)] = api.predict_soil_batch(
+                [crop] * len(chunk), *chunk.T, bundle=bundle)
+    values = values.reshape(len(crops), *points, len(OUTPUTS))
+    build_seconds = time.perf_counter() - start
+
+    # Error frente a la red: puntos aleatorios de la rejilla y filas de entrenamiento
+    meta = {"system": "soil", "version": version, **_checksums(version, bundle.manifest),
+            "crops": crops, "points": list(points), "build_seconds": round(build_seconds, 1)}
+    surrogate = SoilSurrogate(axes, values, crops, meta)
+    rng = np.random.default_rng(seed)
+    samples = {
+        "random": ([crops[i] for i in rng.integers(0, len(crops), n_check)],
+                   *[rng.uniform(axis[0], axis[-1], n_check) for axis in axes]),
+        "training": (df["label"].astype(str).tolist(), *[df[name].to_numpy(dtype=float) for name in FEATURES]),
+    }
+    meta["error"] = {}
+    for name, sample in samples.items():
+        approx, inside = surrogate.predict_batch(*sample)
+        sample_crops, *columns = sample
+        rows = np.flatnonzero(inside)
+        exact = api.predict_soil_batch([sample_crops[r] for r in rows],
+                                       *(np.asarray(column)[rows] for column in columns), bundle=bundle)
+        meta["error"][name] = {"rows": int(inside.sum()), **_error_stats(approx[inside] - exact)}
+
+    path = surrogate_path(version)
+    arrays = {f"axis.{name}": axis for name, axis in zip(FEATURES, axes)}
+    arrays["values"] = values
+    array_artifacts.write(path, arrays, meta)
+    if version != bundles.LEGACY_VERSION:
+        bundles.add_file("soil", version, "surrogate", path)
+    return path, meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sustituto tabulado del modelo de suelo")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("build", help="Evaluar el modelo en la rejilla y guardar el sustituto")
+    p.add_argument("--version", help="Versión del paquete de suelo (por defecto, la activa)")
+    p.add_argument("--points", type=int, nargs=4, default=list(DEFAULT_POINTS),
+                   metavar=("T", "H", "PH", "R"), help="Puntos por eje")
+
+    p = commands.add_parser("report", help="Metadatos y error del sustituto")
+    p.add_argument("--version")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        path, meta = build(args.version, tuple(args.points))
+        print(f"✅ soil@{meta['version']}: {len(meta['crops'])} cultivos x {meta['points']} "
+              f"en {meta['build_seconds']} s -> {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    else:
+        from model import bundles
+
+        version = args.version or bundles.current_version("soil")
+        arrays, meta = array_artifacts.read(surrogate_path(version))
+        print(f"soil@{meta['version']}: {len(meta['crops'])} cultivos x {meta['points']}")
+    for sample, stats in meta["error"].items():
+        print(f"   error ({sample}, {stats['rows']} filas): "
+              + ", ".join(f"{n} mae={stats[n]['mae']} p99={stats[n]['p99']} max={stats[n]['max']}" for n in OUTPUTS))
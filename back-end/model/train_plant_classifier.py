@@ -0,0 +1,227 @@
+"""
+Entrenamiento reproducible del clasificador de enfermedades (detector_de_imagen.h5).
+
+Usa un backbone ligero para CPU (MobileNetV2, con ancho `alpha` y resolución
+de entrada reducibles) sobre las seis clases de imagenes_entrenamiento/. El
+modelo exportado recibe lo mismo que hoy envía plant_classifier.predict_disease
+(224x224x3 en [0, 1]); el redimensionado a la resolución reducida y la
+normalización que espera MobileNet van dentro del grafo.
+
+Entrena en dos fases (cabeza con el backbone congelado y luego ajuste fino de
+las últimas capas) sobre el caché de model/image_dataset.py, y al final mide la
+precisión en validación y las imágenes/segundo con batch 1 y batch 32.
+
+Uso (desde back-end/):
+    python -m model.train_plant_classifier
+    python -m model.train_plant_classifier --resolution 160 --alpha 0.5
+    python -m model.train_plant_classifier --weights none   # sin descargar pesos ImageNet
+"""
+import os
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+from model.image_dataset import build_store
+
+
+SERVING_PATH = os.path.join("training_models", "detector_de_imagen.h5")
+SERVING_SIZE = 224
+
+# Mismo orden que class_names en model/plant_classifier.py (carpetas en orden alfabético)
+EXPECTED_CLASSES = ['Papa_Sana', 'Papa_Tizon', 'Pimiento_Bacteria', 'Pimiento_Sano', 'Tomate_Bacteria', 'Tomate_Sano']
+
+
+def set_seed(seed):
+    import tensorflow as tf
+
+    os.environ["PYTHONHASHSEED"] = str(seed)
+    random.seed(seed)
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+
+def build_model(num_classes, resolution=SERVING_SIZE, alpha=1.0, weights="imagenet", dropout=0.2):
+    """Devuelve (modelo, backbone). La entrada es siempre 224x224x3 en [0, 1]."""
+    from tensorflow.keras import layers, models
+    from tensorflow.keras.applications import MobileNetV2
+
+    inputs = layers.Input(shape=(SERVING_SIZE, SERVING_SIZE, 3), name="imagen")
+    x = inputs
+    if resolution != SERVING_SIZE:
+        x = layers.Resizing(resolution, resolution, name="resolucion_reducida")(x)
+    # MobileNetV2 espera píxeles en [-1, 1]
+    x = layers.Rescaling(2.0, offset=-1.0, name="normalizacion_mobilenet")(x)
+
+    backbone = MobileNetV2(
+        input_shape=(resolution, resolution, 3),
+        alpha=alpha,
+        include_top=False,
+        weights=weights,
+        pooling="avg",
+    )
+    x = backbone(x)
+    x = layers.Dropout(dropout)(x)
+    outputs = layers.Dense(num_classes, activation="softmax", name="clases")(x)
+
+    return models.Model(inputs, outputs, name="detector_de_imagen"), backbone
+
+
+def class_weights(labels, num_classes):
+    """Pesos inversos a la frecuencia (Papa_Sana tiene ~10x menos imágenes)."""
+    counts = np.bincount(labels, minlength=num_classes).astype(float)
+    weights = len(labels) / (num_classes * np.maximum(counts, 1))
+    return {i: float(w) for i, w in enumerate(weights)}
+
+
+def _compile(model, learning_rate):
+    from tensorflow.keras.optimizers import Adam
+
+    model.compile(
+        optimizer=Adam(learning_rate=learning_rate),
+        loss="sparse_categorical_crossentropy",
+        metrics=["accuracy"],
+    )
+
+
+def train(store, train_idx, val_idx, resolution=SERVING_SIZE, alpha=1.0, weights="imagenet",
+          head_epochs=8, finetune_epochs=8, finetune_layers=30, batch_size=32, seed=42):
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+    model, backbone = build_model(len(store.classes), resolution, alpha, weights)
+    cw = class_weights(store.labels[train_idx], len(store.classes))
+
+    train_ds = store.as_tf_dataset(train_idx, batch_size, augment=True, shuffle=True, seed=seed)
+    val_ds = store.as_tf_dataset(val_idx, batch_size, augment=False, shuffle=False)
+    callbacks = [
+        EarlyStopping(monitor="val_loss", patience=3, restore_best_weights=True, verbose=1),
+        ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=2, min_lr=1e-6, verbose=1),
+    ]
+
+    # Fase 1: solo la cabeza (con pesos aleatorios se entrena todo desde el inicio)
+    backbone.trainable = weights is None
+    _compile(model, 1e-3)
+    print(f"\nFase 1: cabeza ({head_epochs} épocas)")
+    model.fit(train_ds, validation_data=val_ds, epochs=head_epochs, class_weight=cw, callbacks=callbacks, verbose=2)
+
+    # Fase 2: ajuste fino de las últimas capas del backbone (BatchNorm congelado)
+    if finetune_epochs > 0 and weights is not None:
+        backbone.trainable = True
+        for layer in backbone.layers[:-finetune_layers]:
+            layer.trainable = False
+        for layer in backbone.layers:
+            if layer.__class__.__name__ == "BatchNormalization":
+                layer.trainable = False
+        _compile(model, 1e-4)
+        print(f"\nFase 2: ajuste fino de {finetune_layers} capas ({finetune_epochs} épocas)")
+        model.fit(train_ds, validation_data=val_ds, epochs=finetune_epochs, class_weight=cw, callbacks=callbacks, verbose=2)
+
+    return model
+
+
+def evaluate(model, store, val_idx, batch_size=32):
+    y_true, y_pred = [], []
+    for x, y in store.batches(val_idx, batch_size, shuffle=False):
+        y_pred.append(np.argmax(model(x, training=False), axis=1))
+        y_true.append(y)
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+
+    per_class = {
+        cls: round(float(np.mean(y_pred[y_true == i] == i)), 4)
+        for i, cls in enumerate(store.classes) if np.any(y_true == i)
+    }
+    return {"accuracy": round(float(np.mean(y_pred == y_true)), 4), "per_class_accuracy": per_class}
+
+
+def images_per_second(model, store, batch_size, iterations=20):
+    """Throughput con llamada directa al modelo (sin la sobrecarga de model.predict)."""
+    x = store.images[:batch_size].astype(np.float32) / 255.0
+    for _ in range(3):
+        model(x, training=False)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        model(x, training=False)
+    elapsed = time.perf_counter() - start
+    return round(batch_size * iterations / elapsed, 2)
+
+
+def export(model, output):
+    if os.path.exists(output):
+        previous = output.replace(".h5", ".prev.h5")
+        os.replace(output, previous)
+        print(f"Modelo anterior conservado en {previous}")
+    model.save(output)
+    print(f"Modelo exportado en {output}")
+
+
+def run(resolution=SERVING_SIZE, alpha=1.0, weights="imagenet", head_epochs=8, finetune_epochs=8,
+        batch_size=32, val_fraction=0.2, seed=42, output=SERVING_PATH):
+    set_seed(seed)
+    store = build_store(size=SERVING_SIZE)
+    if store.classes != EXPECTED_CLASSES:
+        raise ValueError(f"Clases inesperadas {store.classes}; plant_classifier.class_names espera {EXPECTED_CLASSES}")
+
+    train_idx, val_idx = store.split(val_fraction, seed=seed)
+    print(f"Entrenamiento: {len(train_idx)} imágenes, validación: {len(val_idx)}")
+
+    start = time.perf_counter()
+    model = train(store, train_idx, val_idx, resolution, alpha, weights, head_epochs, finetune_epochs,
+                  batch_size=batch_size, seed=seed)
+    train_seconds = time.perf_counter() - start
+
+    report = {
+        "backbone": "MobileNetV2",
+        "alpha": alpha,
+        "resolution": resolution,
+        "pretrained": weights,
+        "params": int(model.count_params()),
+        **evaluate(model, store, val_idx, batch_size),
+        "images_per_second_batch1": images_per_second(model, store, 1, iterations=50),
+        "images_per_second_batch32": images_per_second(model, store, 32),
+        "train_seconds": round(train_seconds, 1),
+        "seed": seed,
+    }
+
+    export(model, output)
+    report_path = output.rsplit(".", 1)[0] + ".report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\nResultados:")
+    print(f"  Precisión validación:  {report['accuracy'] * 100:.2f}%")
+    for cls, acc in report["per_class_accuracy"].items():
+        print(f"    {cls:<20} {acc * 100:.2f}%")
+    print(f"  Imágenes/s (batch 1):  {report['images_per_second_batch1']}")
+    print(f"  Imágenes/s (batch 32): {report['images_per_second_batch32']}")
+    print(f"  Parámetros:            {report['params']:,}")
+    print(f"Reporte guardado en {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de enfermedades con MobileNetV2")
+    parser.add_argument("--resolution", type=int, default=SERVING_SIZE, help="Resolución interna (p. ej. 160 o 128)")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Ancho de MobileNetV2 (0.35, 0.5, 0.75, 1.0)")
+    parser.add_argument("--weights", default="imagenet", help="'imagenet' o 'none'")
+    parser.add_argument("--head-epochs", type=int, default=8)
+    parser.add_argument("--finetune-epochs", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=SERVING_PATH)
+    args = parser.parse_args()
+
+    run(
+        resolution=args.resolution,
+        alpha=args.alpha,
+        weights=None if args.weights.lower() == "none" else args.weights,
+        head_epochs=args.head_epochs,
+        finetune_epochs=args.finetune_epochs,
+        batch_size=args.batch_size,
+        val_fraction=args.val_fraction,
+        seed=args.seed,
+        output=args.output,
+    )
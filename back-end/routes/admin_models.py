@@ -0,0 +1,120 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+
+from database.models import User
+from auth.utils import get_current_admin_user
+from model import bundles, shadow
+import model.integrate_all_api as api
+
+router = APIRouter(prefix="/admin/models", tags=["Modelos"])
+
+
+class ReloadRequest(BaseModel):
+    """Versión a cargar (por defecto, la indicada en CURRENT)"""
+    version: Optional[str] = None
+    activate: bool = True  # Escribir CURRENT para que el resto de workers también la carguen
+
+
+class CandidateRequest(BaseModel):
+    """Versión a evaluar en sombra y, opcionalmente, en canario"""
+    version: str
+    sample_rate: float = Field(0.1, ge=0, le=1)  # fracción de peticiones copiadas al candidato
+    canary_percent: float = Field(0, ge=0, le=100)  # % de clientes atendidos por el candidato
+
+
+def _check_candidate_system(system):
+    if system not in shadow.CANDIDATES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Sin evaluación en sombra para: {system}")
+
+
+@router.get("")
+def get_model_versions(current_user: User = Depends(get_current_admin_user)):
+    """
+    Versión activa en este worker, versión marcada en CURRENT, versiones
+    disponibles y estado de la última recarga de cada sistema.
+    """
+    return {
+        system: {
+            "active": bundle.version if bundle else None,
+            "current": bundles.current_version(system),
+            "available": [bundles.LEGACY_VERSION] + bundles.list_versions(system),
+            "reload": api.RELOADS.get(system),
+            "candidate": _candidate_summary(system),
+            # Error del sustituto tabulado frente a la red, medido al construirlo
+            "surrogate": bundle.surrogate.meta["error"] if bundle and bundle.surrogate else None,
+        }
+        for system, bundle in api.BUNDLES.items()
+    }
+
+
+def _candidate_summary(system, per_crop=False):
+    candidate = shadow.CANDIDATES.get(system)
+    if candidate is not None:
+        return candidate.summary(per_crop=per_crop)
+    return api.CANDIDATE_STATUS.get(system) if system in shadow.CANDIDATES else None
+
+
+@router.get("/{system}/candidate")
+def get_candidate(system: str, current_user: User = Depends(get_current_admin_user)):
+    """MAE, sesgo y error máximo candidato vs. actual por nutriente, en total y por cultivo (este worker)."""
+    _check_candidate_system(system)
+    return {"config": bundles.candidate_config(system), "stats": _candidate_summary(system, per_crop=True)}
+
+
+@router.put("/{system}/candidate", status_code=status.HTTP_202_ACCEPTED)
+def set_candidate(
+    system: str,
+    request: CandidateRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Pone una versión en sombra (y canario si canary_percent > 0). Se escribe
+    CANDIDATE y cada worker la carga en segundo plano. Para promoverla:
+    POST /admin/models/{system}/reload con esa versión.
+    """
+    _check_candidate_system(system)
+    try:
+        bundles.read_manifest(system, request.version)
+    except bundles.BundleError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    config = request.model_dump()
+    bundles.set_candidate(system, config)
+    api.start_candidate(system, config)
+    return {"system": system, **config, "status": "loading"}
+
+
+@router.delete("/{system}/candidate")
+def delete_candidate(system: str, current_user: User = Depends(get_current_admin_user)):
+    """Retira el candidato: deja de recibir copias y tráfico de canario."""
+    _check_candidate_system(system)
+    bundles.set_candidate(system, None)
+    api.apply_candidate(system, None)
+    return {"system": system, "candidate": None}
+
+
+@router.post("/{system}/reload", status_code=status.HTTP_202_ACCEPTED)
+def reload_model(
+    system: str,
+    request: ReloadRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Carga y calienta la versión en segundo plano y la pone en servicio con un
+    intercambio atómico; las peticiones en curso terminan con la anterior.
+    Consultar GET /admin/models para ver el resultado.
+    """
+    if system not in bundles.SYSTEMS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Sistema desconocido: {system}")
+
+    version = request.version or bundles.current_version(system)
+    try:
+        bundles.read_manifest(system, version)
+    except bundles.BundleError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    if not api.start_reload(system, version, activate=request.activate):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Ya hay una recarga de '{system}' en curso")
+    return {"system": system, "version": version, "status": "loading"}
@@ -1,17 +1,47 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from database.database import get_db
 from database.models import User, Crop, Prediction, HydroRecipe, ImagePrediction
 from schemas.crops import (
     CropCreate, CropUpdate, CropResponse,
-    PredictionResponse, HydroRecipeResponse, ImagePredictionResponse
+    PredictionResponse, HydroRecipeResponse, ImagePredictionResponse, ProcurementRequest
 )
 from auth.utils import get_current_user
 
 router = APIRouter(prefix="/crops", tags=["Cultivos"])
 
+# ===== GET CONDICIONAL (ETag) =====
+
+def _etag(user: User) -> str:
+    return f'W/"{user.id}-{user.data_version}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Comparación débil: se ignora el prefijo W/
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    Usuario actual + validación condicional para las rutas GET.
+    El ETag es la versión de datos del usuario (users.data_version), que ya
+    viene en la consulta de autenticación: si coincide con If-None-Match se
+    responde 304 sin ejecutar las consultas de la ruta.
+    """
+    etag = _etag(current_user)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return current_user
+
 # ===== CRUD DE CULTIVOS =====
 
 @router.post("", response_model=CropResponse, status_code=status.HTTP_201_CREATED)
@@ -46,7 +76,7 @@ def create_crop(
 def get_my_crops(
     status_filter: Optional[str] = Query(None, regex="^(active|harvested|abandoned)$"),
     crop_type: Optional[str] = Query(None, regex="^(hydroponic|soil)$"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(conditional_get),
     db: Session = Depends(get_db)
 ):
     """
@@ -67,7 +97,7 @@ def get_my_crops(
 @router.get("/{crop_id}", response_model=CropResponse)
 def get_crop(
     crop_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(conditional_get),
     db: Session = Depends(get_db)
 ):
     """
@@ -147,7 +177,7 @@ def delete_crop(
 @router.get("/{crop_id}/predictions", response_model=List[PredictionResponse])
 def get_crop_predictions(
     crop_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(conditional_get),
     db: Session = Depends(get_db)
 ):
     """
@@ -174,7 +204,7 @@ def get_crop_predictions(
 @router.get("/{crop_id}/hydro-recipes", response_model=List[HydroRecipeResponse])
 def get_crop_hydro_recipes(
     crop_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(conditional_get),
     db: Session = Depends(get_db)
 ):
     """
@@ -198,10 +228,40 @@ def get_crop_hydro_recipes(
     
     return recipes
 
+@router.get("/{crop_id}/scheduled-recipe", response_model=HydroRecipeResponse)
+def get_crop_scheduled_recipe(
+    crop_id: int,
+    week: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(conditional_get),
+    db: Session = Depends(get_db)
+):
+    """
+    Receta hidropónica precalculada por el programador nocturno.
+    Sin `week` devuelve la de la semana más reciente programada.
+    Una sola consulta sobre el índice (crop_id, scheduled, week).
+    """
+    query = db.query(HydroRecipe).filter(
+        HydroRecipe.crop_id == crop_id,
+        HydroRecipe.scheduled.is_(True),
+        HydroRecipe.user_id == current_user.id
+    )
+    if week is not None:
+        query = query.filter(HydroRecipe.week == week)
+
+    recipe = query.order_by(HydroRecipe.week.desc(), HydroRecipe.created_at.desc()).first()
+
+    if not recipe:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No hay receta programada para este cultivo"
+        )
+
+    return recipe
+
 @router.get("/{crop_id}/image-predictions", response_model=List[ImagePredictionResponse])
 def get_crop_image_predictions(
     crop_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(conditional_get),
     db: Session = Depends(get_db)
 ):
     """
@@ -230,7 +290,7 @@ def get_crop_image_predictions(
 @router.get("/{crop_id}/stats")
 def get_crop_stats(
     crop_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(conditional_get),
     db: Session = Depends(get_db)
 ):
     """
@@ -264,3 +324,28 @@ def get_crop_stats(
         "created_at": crop.created_at,
         "updated_at": crop.updated_at
     }
+
+
+# ===== PLAN DE COMPRA =====
+
+@router.post("/procurement")
+def create_procurement_plan(
+    request: ProcurementRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Compra de fertilizantes de bajo costo (heurística, ver model/procurement.py)
+    para todos los cultivos activos del usuario: necesidades de la última
+    predicción de cada campo por su área, inventario compartido, precios por
+    volumen y sacos enteros.
+    """
+    from model.procurement import active_crops, run_procurement
+
+    try:
+        return run_procurement(db, active_crops(db, current_user.id), request.inventory, request.area_unit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        # El modelo siempre es factible (holguras): sin solución = límite de tiempo del solver
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from database.database import get_db
+from database.models import User
+from database.spatial import crops_in_bbox, crops_within_radius
+from schemas.crops import CropResponse
+from auth.utils import get_current_admin_user
+
+router = APIRouter(prefix="/regions", tags=["Regiones"])
+
+
+class RegionAdvisoryRequest(BaseModel):
+    """Región por rectángulo (bbox) o por centro + radio"""
+    bbox: Optional[List[float]] = Field(None, min_length=4, max_length=4,
+                                        description="[min_lat, min_lon, max_lat, max_lon]")
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    radius_km: Optional[float] = Field(None, gt=0, le=500)
+    cell_precision: int = Field(5, ge=3, le=7)
+    dry_run: bool = False
+
+
+class RegionProcurementRequest(BaseModel):
+    """Región como en RegionAdvisoryRequest + inventario {producto: kg} y unidad de Crop.area"""
+    bbox: Optional[List[float]] = Field(None, min_length=4, max_length=4,
+                                        description="[min_lat, min_lon, max_lat, max_lon]")
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    radius_km: Optional[float] = Field(None, gt=0, le=500)
+    inventory: Dict[str, float] = Field(default_factory=dict)
+    area_unit: str = Field("ha", pattern="^(ha|m2)$")
+
+
+def _region_crops(db, bbox, lat, lon, radius_km, crop_type=None):
+    if bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        if min_lat > max_lat or min_lon > max_lon:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="bbox inválido")
+        return crops_in_bbox(db, min_lat, min_lon, max_lat, max_lon, crop_type=crop_type)
+    if lat is not None and lon is not None and radius_km:
+        return [crop for crop, _ in crops_within_radius(db, lat, lon, radius_km, crop_type=crop_type)]
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Indica bbox=[min_lat, min_lon, max_lat, max_lon] o lat, lon y radius_km"
+    )
+
+
+# ===== CONSULTAS ESPACIALES =====
+
+@router.get("/crops", response_model=List[CropResponse])
+def get_region_crops(
+    min_lat: Optional[float] = None,
+    min_lon: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lon: Optional[float] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
+    crop_type: Optional[str] = Query(None, pattern="^(hydroponic|soil)$"),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cultivos activos de una región (solo administradores).
+    Por rectángulo (min_lat, min_lon, max_lat, max_lon) o por radio (lat, lon, radius_km).
+    """
+    bbox = None
+    if None not in (min_lat, min_lon, max_lat, max_lon):
+        bbox = [min_lat, min_lon, max_lat, max_lon]
+    return _region_crops(db, bbox, lat, lon, radius_km, crop_type)
+
+
+# ===== AVISOS REGIONALES =====
+
+@router.post("/advisories")
+def create_region_advisories(
+    request: RegionAdvisoryRequest,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Genera avisos de fertilización para todos los cultivos activos de la región:
+    clima una vez por celda y una inferencia por lotes por modelo.
+    """
+    from model.regional_advisories import run_advisories
+
+    crops = _region_crops(db, request.bbox, request.lat, request.lon, request.radius_km)
+    return run_advisories(db, crops, cell_precision=request.cell_precision, dry_run=request.dry_run)
+
+
+# ===== PLAN DE COMPRA REGIONAL =====
+
+@router.post("/procurement")
+def create_region_procurement(
+    request: RegionProcurementRequest,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Compra conjunta de fertilizantes para todos los cultivos activos de la
+    región (p. ej. una cooperativa): un solo plan con inventario compartido,
+    precios por volumen y sacos enteros.
+    """
+    from model.procurement import run_procurement
+
+    crops = _region_crops(db, request.bbox, request.lat, request.lon, request.radius_km)
+    try:
+        return run_procurement(db, crops, request.inventory, request.area_unit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        # El modelo siempre es factible (holguras): sin solución = límite de tiempo del solver
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
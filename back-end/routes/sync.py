@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from database.database import get_db
+from database.models import User, Crop, Prediction, HydroRecipe, ImagePrediction, ChangeLog
+from schemas.crops import SyncResponse
+from routes.crops import conditional_get
+
+router = APIRouter(prefix="/sync", tags=["Sincronización"])
+
+# Tabla del registro de cambios -> modelo
+SYNC_MODELS = {
+    "crops": Crop,
+    "predictions": Prediction,
+    "hydro_recipes": HydroRecipe,
+    "image_predictions": ImagePrediction,
+}
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+@router.get("", response_model=SyncResponse)
+def sync_changes(
+    since: int = Query(0, ge=0, description="Marca de agua devuelta por la llamada anterior (0 = todo)"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    current_user: User = Depends(conditional_get),
+    db: Session = Depends(get_db)
+):
+    """
+    Cambios del usuario desde `since` en cultivos, predicciones, recetas
+    hidropónicas y predicciones de imagen, para la app sin conexión.
+
+    Lee hasta `limit` entradas del registro de cambios (rango del índice
+    (user_id, id)), se queda con la última operación de cada fila y carga solo
+    las filas que siguen existiendo. Las eliminadas llegan en `deleted`.
+    Con has_more=true hay que volver a llamar con since=watermark.
+    El ETag es el mismo que el de /crops: sin cambios responde 304.
+    """
+    entries = db.query(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op).filter(
+        ChangeLog.user_id == current_user.id,
+        ChangeLog.id > since
+    ).order_by(ChangeLog.id).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Última operación por fila dentro de la página
+    latest = {}
+    for _, entity, entity_id, op in entries:
+        latest[(entity, entity_id)] = op
+
+    changes = {entity: [] for entity in SYNC_MODELS}
+    deleted = {entity: [] for entity in SYNC_MODELS}
+    for entity, model in SYNC_MODELS.items():
+        upserts = [entity_id for (e, entity_id), op in latest.items() if e == entity and op == "upsert"]
+        rows = []
+        if upserts:
+            rows = db.query(model).filter(
+                model.id.in_(upserts),
+                model.user_id == current_user.id
+            ).order_by(model.id).all()
+        changes[entity] = rows
+
+        # Filas registradas como cambiadas que ya no existen: también son bajas
+        found = {row.id for row in rows}
+        deleted[entity] = sorted(
+            [entity_id for (e, entity_id), op in latest.items() if e == entity and op == "delete"]
+            + [entity_id for entity_id in upserts if entity_id not in found]
+        )
+
+    return {
+        "since": since,
+        "watermark": entries[-1].id if entries else since,
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 # ===== ESQUEMAS DE CULTIVOS =====
@@ -107,6 +107,8 @@ class HydroRecipeResponse(BaseModel):
     target_potassium: float
     target_ec: float
     recipe_data: dict
+    scheduled: bool = False
+    valid_from: Optional[datetime] = None
     created_at: datetime
     
     class Config:
@@ -126,3 +128,34 @@ class ImagePredictionResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+# ===== SINCRONIZACIÓN INCREMENTAL =====
+
+class SyncChanges(BaseModel):
+    """Filas creadas o modificadas desde la marca de agua"""
+    crops: List[CropResponse] = []
+    predictions: List[PredictionResponse] = []
+    hydro_recipes: List[HydroRecipeResponse] = []
+    image_predictions: List[ImagePredictionResponse] = []
+
+class SyncDeleted(BaseModel):
+    """Ids eliminados desde la marca de agua (tombstones)"""
+    crops: List[int] = []
+    predictions: List[int] = []
+    hydro_recipes: List[int] = []
+    image_predictions: List[int] = []
+
+class SyncResponse(BaseModel):
+    """Respuesta de GET /sync"""
+    since: int
+    watermark: int  # Enviar como `since` en la siguiente llamada
+    has_more: bool
+    changes: SyncChanges
+    deleted: SyncDeleted
+
+# ===== PLAN DE COMPRA =====
+
+class ProcurementRequest(BaseModel):
+    """Inventario disponible {producto del catálogo: kg} y unidad de Crop.area"""
+    inventory: Dict[str, float] = Field(default_factory=dict)
+    area_unit: str = Field("ha", pattern="^(ha|m2)$")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Lanzador de producción de AgroMind con varios workers (modelo pre-fork).
+
+El proceso maestro:
+  1. Fija los límites de hilos (OMP/MKL/OpenBLAS y TensorFlow intra/inter-op)
+     antes de importar numpy o TensorFlow.
+  2. Importa la aplicación y llama a su preload(): TensorFlow, pandas,
+     scikit-learn y los artefactos joblib quedan cargados una sola vez.
+  3. Precalienta en la caché de páginas los .tflite de las variantes elegidas
+     (AGROMIND_*_VARIANT). El intérprete TFLite los mapea con mmap, así que
+     todos los workers comparten las mismas páginas de pesos.
+  4. Congela el heap (gc.freeze; el recolector está desactivado desde antes
+     del preload) y abre el socket de escucha.
+  5. Hace fork() de N workers, que comparten copy-on-write todo lo anterior.
+
+Cada worker carga sus modelos Keras/TFLite al arrancar (evento startup):
+TensorFlow no es seguro ante fork() una vez inicializado su runtime. Con
+variantes TFLite los pesos se comparten vía mmap; con Keras float32 cada
+worker tiene su copia.
+
+El maestro reinicia los workers que mueran y muestra periódicamente RSS/PSS
+por worker. PSS reparte las páginas compartidas entre procesos y es la medida
+que suma la memoria real del servidor.
+
+Uso (desde back-end/):
+    python serve.py --workers 4
+    python serve.py --workers 2 --threads 2 --host 0.0.0.0 --port 8000
+    AGROMIND_SOIL_VARIANT=int8 AGROMIND_HYDRO_VARIANT=int8 python serve.py -w 4
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import importlib
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS")
+
+
+def set_thread_limits(threads, inter_op):
+    """Debe llamarse antes de importar numpy/TensorFlow para que tenga efecto."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op)
+
+
+def preload(app_path):
+    """Importa la app en el maestro y devuelve el objeto ASGI."""
+    module_name, attr = app_path.split(":", 1)
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    app = getattr(module, attr)
+    # La app importa poco por sí misma; preload() trae TensorFlow, pandas,
+    # scikit-learn y los artefactos para que los workers los hereden
+    if hasattr(module, "preload"):
+        module.preload()
+
+    from model.model_variants import MODEL_NAMES, selected_variant, variant_path
+
+    for name in MODEL_NAMES:
+        path = variant_path(name, selected_variant(name))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+
+    print(f"📦 Aplicación precargada en {time.perf_counter() - start:.1f} s")
+    return app
+
+
+def memory_table(pids):
+    from model.metrics import process_memory
+
+    rows = []
+    for label, pid in pids:
+        mem = process_memory(pid)
+        if mem:
+            rows.append((label, pid, mem))
+    if not rows:
+        return "(memoria no disponible: se necesita /proc/<pid>/smaps_rollup)"
+
+    mb = lambda b: f"{b / 1024 ** 2:8.1f}"
+    lines = [f"{'proceso':<10} {'pid':>7} {'RSS MB':>8} {'PSS MB':>8} {'Compart.':>8} {'Privada':>8}"]
+    for label, pid, mem in rows:
+        lines.append(f"{label:<10} {pid:>7} {mb(mem['rss'])} {mb(mem['pss'])} {mb(mem['shared'])} {mb(mem['private'])}")
+    total_pss = sum(mem["pss"] for _, _, mem in rows)
+    lines.append(f"{'total PSS':<10} {'':>7} {'':>8} {mb(total_pss)}")
+    return "\n".join(lines)
+
+
+class Master:
+    def __init__(self, app, sock, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> índice
+        self.stopping = False
+
+    # ===== WORKERS =====
+
+    def spawn(self, index):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = index
+            return
+
+        # --- Proceso hijo ---
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # Sin unfreeze: lo congelado en el maestro sigue fuera de las pasadas del worker
+        gc.enable()
+        code = 0
+        try:
+            self._run_worker(index)
+        except Exception as e:
+            print(f"❌ Worker {index} terminó con error: {e}")
+            code = 1
+        finally:
+            sys.stdout.flush()
+            os._exit(code)
+
+    def _run_worker(self, index):
+        import uvicorn
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(self.args.threads)
+        tf.config.threading.set_inter_op_parallelism_threads(self.args.inter_op)
+
+        config = uvicorn.Config(
+            self.app,
+            log_level=self.args.log_level,
+            timeout_keep_alive=self.args.keep_alive,
+        )
+        print(f"👷 Worker {index} (pid {os.getpid()}) arrancando")
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self.workers.pop(pid, None)
+            if index is None:
+                continue
+            if not self.stopping:
+                print(f"⚠️  Worker {index} (pid {pid}) terminó con estado {status}; reiniciando")
+                self.spawn(index)
+
+    # ===== CICLO PRINCIPAL =====
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for index in range(self.args.workers):
+            self.spawn(index)
+
+        next_report = time.monotonic() + self.args.report_interval
+        while not self.stopping:
+            time.sleep(0.5)
+            self.reap()
+            if self.args.report_interval > 0 and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.args.report_interval
+
+        self.shutdown()
+
+    def report(self):
+        pids = [("maestro", os.getpid())]
+        pids += [(f"worker {index}", pid) for pid, index in sorted(self.workers.items(), key=lambda x: x[1])]
+        print("\n📊 Memoria por proceso\n" + memory_table(pids) + "\n", flush=True)
+
+    def shutdown(self):
+        print("\n🛑 Deteniendo workers...")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+
+        for pid in list(self.workers):
+            print(f"⚠️  Worker pid {pid} no terminó a tiempo; SIGKILL")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor AgroMind multi-worker (pre-fork)")
+    parser.add_argument("--app", default="model.integrate_all_api:app", help="módulo:atributo de la app ASGI")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("-w", "--workers", type=int, default=int(os.getenv("AGROMIND_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("AGROMIND_WORKER_THREADS", 1)),
+                        help="Hilos intra-op por worker (OMP/MKL/OpenBLAS/TensorFlow)")
+    parser.add_argument("--inter-op", type=int, default=int(os.getenv("AGROMIND_WORKER_INTER_OP", 1)),
+                        help="Hilos inter-op de TensorFlow por worker")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--report-interval", type=float, default=60.0,
+                        help="Segundos entre informes de memoria (0 = desactivado)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("❌ serve.py necesita fork() (Linux/macOS). En Windows usa run_server.py.")
+        sys.exit(1)
+
+    set_thread_limits(args.threads, args.inter_op)
+    # Los workers heredan stdout: salida por líneas para que no se mezcle
+    sys.stdout.reconfigure(line_buffering=True)
+
+    print("\n" + "=" * 60)
+    print("🚀 INICIANDO SERVIDOR AGROMIND IA (pre-fork)")
+    print("=" * 60)
+    print(f"URL:        http://{args.host}:{args.port}")
+    print(f"Workers:    {args.workers}")
+    print(f"Hilos:      intra-op {args.threads}, inter-op {args.inter_op} por worker")
+    print("=" * 60 + "\n")
+
+    # Sin recolecciones durante el preload: dejarían huecos en páginas que luego
+    # se llenan con objetos nuevos tras el fork (ver la documentación de gc.freeze)
+    gc.disable()
+    app = preload(args.app)
+
+    # Lo importado hasta aquí no cambiará: se saca del recolector para que sus
+    # pasadas no escriban en esas páginas y rompan el copy-on-write
+    gc.freeze()
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+
+    master = Master(app, sock, args)
+    master.run()
+
+
+if __name__ == "__main__":
+    main()
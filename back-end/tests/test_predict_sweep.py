@@ -0,0 +1,65 @@
+"""
+/predict-sweep en NDJSON cuando el executor del modelo de suelo rechaza bloques.
+
+Desde back-end/:
+    python -m pytest -q tests
+"""
+import os
+import json
+import tempfile
+
+os.environ.setdefault("BENCH_DB_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("AGROMIND_BLOCKING_STARTUP", "1")
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_app import app
+import model.integrate_all_api as api
+
+
+# 2 x 100 x 100 = 20 000 puntos: dos bloques de SWEEP_CHUNK
+SWEEP = {"crop": "maiz", "ph": [6.0, 7.0], "temperature": {"start": 10, "stop": 35, "num": 100},
+         "humidity": {"start": 30, "stop": 90, "num": 100}, "rainfall": [120.0], "stream": True}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def _executor(reject_from):
+    """SOIL_EXECUTOR.run que rechaza (503) a partir de la llamada `reject_from`."""
+    calls = []
+
+    async def run(fn, bundle, crop, grid, lo, hi, tenant="anonymous", weight=1.0):
+        calls.append(lo)
+        if len(calls) > reject_from:
+            raise HTTPException(status_code=503, detail="Servicio 'soil' saturado, reintenta más tarde.",
+                                headers={"Retry-After": "2"})
+        return np.zeros((hi - lo, 3), dtype=np.float32)
+
+    return run
+
+
+def test_rejection_mid_stream_ends_with_error_line(client, monkeypatch):
+    monkeypatch.setattr(api.SOIL_EXECUTOR, "run", _executor(reject_from=1))
+    response = client.post("/predict-sweep", json=SWEEP)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["points"] == 20_000
+    assert lines[1]["offset"] == 0 and len(lines[1]["values"]) == api.SWEEP_CHUNK
+    assert lines[-1] == {"error": "Servicio 'soil' saturado, reintenta más tarde.", "status": 503,
+                         "offset": api.SWEEP_CHUNK, "retry_after": "2"}
+
+
+def test_rejection_before_first_block_is_503(client, monkeypatch):
+    monkeypatch.setattr(api.SOIL_EXECUTOR, "run", _executor(reject_from=0))
+    response = client.post("/predict-sweep", json=SWEEP)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"